@@ -1,6 +1,78 @@
-import liberalguardians.ui.scene.strategic as strategic
-import liberalguardians.ui.scene.charactercreation as charactercreation
+from concurrent.futures import Future
+import logging.config
+from typing import List
+import yaml
+import tcod
+
+from tcodplus.canvas import RootCanvas
+from tcodplus.scene import Scene, SceneManager
+from tcodplus.runner import AsyncRunner
+
+from liberalguardians.characters import Character
+from liberalguardians.country import Country
+from liberalguardians.ui.scene.charactercreation import CharacterCreationScene
+from liberalguardians.ui.scene.strategic import StrategicScene
+
+# the party, with the character created
+PARTY_SIZE = 6
+
+
+def strategic_scene() -> StrategicScene:
+    companions = [Character() for _ in range(PARTY_SIZE - 1)]
+    return StrategicScene(Country("BlueLand", mood=-200), companions)
+
+
+class Handoff:
+    """The strategic Scene, built while the character is created
+
+    Args:
+        prepared: Future: the StrategicScene, see SceneManager.prepare()
+        taken: bool: whether the Scene was handed to the SceneManager
+    """
+
+    def __init__(self, prepared: Future) -> None:
+        self.prepared = prepared
+        self.taken = False
+
+    def __call__(self, character: Character) -> Scene:
+        # only waits if the report is sent before the Scene is ready, on a
+        # worker of the AsyncRunner
+        scene = self.prepared.result()
+        party: List[Character] = [character] + scene.party
+        scene.party = party
+        self.taken = True
+        return scene
+
+    def discard(self) -> None:
+        """release the Scene if the game ended before it was shown, it is
+        not autosaved then
+
+        If preparing it failed, the exception is left to whoever gets the
+        result, it is not raised again here.
+        """
+        if self.taken or self.prepared.cancel():
+            return
+        if self.prepared.exception() is None:
+            self.prepared.result().on_exit()
+
+
+def main() -> None:
+    with open("logconfig.yml") as f:
+        configdict = yaml.load(f, Loader=yaml.FullLoader)
+    logging.config.dictConfig(configdict)
+
+    # a single window for all the scenes
+    root_canvas = RootCanvas(100, 70, "Liberal Guardians",
+                             "data/fonts/dejavu10x10_gs_tc.png",
+                             renderer=tcod.RENDERER_OPENGL2)
+    scenes = SceneManager(root_canvas)
+    handoff = Handoff(scenes.prepare(strategic_scene))
+    scenes.push(CharacterCreationScene(next_scene=handoff))
+    try:
+        AsyncRunner(scenes).run()
+    finally:
+        handoff.discard()
+
 
 if __name__ == "__main__":
-    charactercreation.main()
-    strategic.main()
+    main()
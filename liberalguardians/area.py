@@ -1,61 +1,126 @@
 from __future__ import annotations
 import logging
-from typing import Tuple, List, TYPE_CHECKING
+from typing import Tuple, List, Dict, Optional, TYPE_CHECKING
 import random as rnd
+import numpy as np
 
 from liberalguardians.common.logging import StyleAdapter
 import liberalguardians.common.data as data
+from liberalguardians.common.sampling import encounter_tables
 from liberalguardians.characters import Character
-# import numpy as np
 
 if TYPE_CHECKING:
     from location import Location
 
 logger = StyleAdapter(logging.getLogger(__name__))
-_professions_list = list(data.professions)
+_professions_list = encounter_tables.labels
+
+
+def populate(areas: List[Area]) -> None:
+    """draw the crowd of every Area in areas with a single table lookup
+
+    Each Area still draws its random numbers from its own seed, so its crowd
+    does not depend on which other Areas are populated with it.
+    """
+    if not areas:
+        return
+    prof_cnt = len(_professions_list)
+    counts, uniforms = [], []
+    for area in areas:
+        rng = np.random.default_rng(area.seed)
+        encounter_cnt = rng.integers(10, 20)
+        counts.append(encounter_cnt)
+        uniforms.append(rng.random(encounter_cnt))
+
+    owners = np.repeat(np.arange(len(areas)), counts)
+    tables = np.array([encounter_tables.index[a.area_name] for a in areas])
+    encounters = encounter_tables.resolve(tables[owners],
+                                          np.concatenate(uniforms))
+    crowds = np.bincount(owners * prof_cnt + encounters,
+                         minlength=len(areas) * prof_cnt)
+    crowds = crowds.reshape(len(areas), prof_cnt)
+
+    for area, crowd in zip(areas, crowds):
+        area.mood_mod = area.location.country.mood_modifier
+        area._characters = {}
+        area._crowd = crowd
+        logger.debug("{} randomized".format(repr(area)))
 
 
 class Area:
+    """A room of a Location.
+
+    The crowd of an Area is only kept as a number of people per profession,
+    drawn the first time it is needed. Individual Characters are built on
+    demand with character(), deterministically from the seed of the Area.
+    See Location.prefetch() to draw the crowd ahead of time.
+    """
+
     def __init__(self, location: Location, coordinates: Tuple[int, int],
-                 area_name: str, characters: List[Character] = list()) -> None:
+                 area_name: str, crowd: Optional[np.ndarray] = None,
+                 seed: Optional[int] = None) -> None:
         self.location = location
         self.coordinates = coordinates
 
         self.area_name = area_name
-        self.characters = characters
+        self.seed = seed if seed is not None else rnd.getrandbits(32)
+        self.mood_mod: Dict[str, Tuple[int, int]] = {}
+        self._crowd = crowd
+        self._characters: Dict[int, Character] = {}
+
+    @property
+    def is_populated(self) -> bool:
+        return self._crowd is not None
+
+    @property
+    def crowd(self) -> np.ndarray:
+        """the number of people per profession, in _professions_list order"""
+        if self._crowd is None:
+            self.randomize()
+        return self._crowd
+
+    @property
+    def population(self) -> int:
+        return int(self.crowd.sum())
+
+    @property
+    def professions(self) -> Dict[str, int]:
+        """the number of people per profession, for professions present"""
+        crowd = self.crowd
+        return {_professions_list[i]: int(crowd[i])
+                for i in np.flatnonzero(crowd)}
+
+    @property
+    def characters(self) -> List[Character]:
+        """OBSOLETE: build the whole crowd. Prefer character()"""
+        return [self.character(i) for i in range(self.population)]
+
+    def character(self, index: int) -> Character:
+        """build, or get back, the index-th person of the crowd"""
+        if index in self._characters:
+            return self._characters[index]
+        if not 0 <= index < self.population:
+            raise IndexError(f"{repr(self)} has no person {index}")
+
+        prof_ind = int(np.searchsorted(np.cumsum(self.crowd), index,
+                                       side="right"))
+        c_rng = rnd.Random(self.seed ^ (index << 32))
+        character = Character(prof_name=_professions_list[prof_ind],
+                              mood_mod=self.mood_mod, rng=c_rng)
+        self._characters[index] = character
+        return character
 
     def randomize(self) -> None:
-        country = self.location.country
-        encounter_cnt = rnd.randrange(10, 20)
-
-        characters = []
-        for _ in range(encounter_cnt):
-            encounter = data.areas[self.area_name]["encounter"]
-            weight_sum = sum(encounter.values())
-            any_weight = 10 - weight_sum
-            if any_weight > 0:
-                encounter["any"] = any_weight
-            encounter_choice = rnd.choices(*zip(*encounter.items()))[0]
-            if encounter_choice == "any":
-                encounter_choice = rnd.choice(_professions_list)
-            characters.append(Character(prof_name=encounter_choice,
-                                        mood_mod=country.mood_modifier))
-        self.characters = characters
-        logger.debug("{} randomized".format(repr(self)))
-
-    # @classmethod
-    # def random(cls, area_name: str) -> Area:
-    #     area = cls(area_name)
-    #     area.randomize()
-
-    #     return area
+        populate([self])
 
     def __repr__(self):
+        people = self.population if self.is_populated else "unknown"
         s = (f"{data.areas[self.area_name]['short_desc'].title()} with "
-             f"{len(self.characters)} people")
+             f"{people} people")
         return s
 
     def __str__(self):
-        characters_str = '\n\t'.join(repr(c) for c in self.characters)
-        s = f"{repr(self)} :\n\t{characters_str}"
+        crowd_str = '\n\t'.join(f"{cnt} {data.professions[p]['short_desc']}"
+                                for p, cnt in self.professions.items())
+        s = f"{repr(self)} :\n\t{crowd_str}"
         return s
@@ -1,12 +1,18 @@
 from __future__ import annotations
 import os
-import json
+import sys
+from bisect import bisect_right
 from enum import Enum, IntFlag, auto
-from typing import Tuple, Dict, Any
+from types import MappingProxyType
+from typing import Tuple, Dict, Any, List, Iterable, Iterator, Union, Optional
+from typing import NamedTuple, Mapping
 import random as rnd
-import tcod
+import numpy as np
 
 import liberalguardians.common.data as data
+import liberalguardians.common.wire as wire
+from liberalguardians.common.sampling import professions_list
+from liberalguardians.common.namegen import namegen
 from liberalguardians.common.alignment import Alignment, align_index
 from liberalguardians.common.alignment import colored_alignment_str
 
@@ -17,29 +23,84 @@ class Wound(IntFlag):
     DISABLE = auto()
 
 
+#######################
+# METADATA FLYWEIGHTS #
+#######################
+
+# Game data is loaded once into these immutable records, shared by every
+# Character.
+
+
+class AttributeMeta(NamedTuple):
+    name: str
+    short_desc: str
+    long_desc: str
+    abbrev: str
+
+
+class ProfessionMeta(NamedTuple):
+    name: str
+    short_desc: str
+    alignment: Alignment
+    juice: Union[int, Tuple[int, int]]
+    attrs_mod: Mapping[str, Tuple[int, int]]
+
+
+class RankMeta(NamedTuple):
+    name: str
+    ind: int
+    short_desc: Tuple[str, str, str]
+    preposition: Tuple[str, str, str]
+    bounds: Tuple[Optional[int], Optional[int]]
+
+
+ATTRIBUTES = ("hp", "heart", "wisdom", "intel", "strength", "agility",
+              "charisma")
+
+attributes_meta: Mapping[str, AttributeMeta] = MappingProxyType({
+    k: AttributeMeta(k, v["short_desc"], v["long_desc"], v["abbrev"])
+    for k, v in data.attributes.items()})
+
+professions_meta: Mapping[str, ProfessionMeta] = MappingProxyType({
+    sys.intern(k): ProfessionMeta(
+        sys.intern(k), v["short_desc"], Alignment[v["alignment"].upper()],
+        tuple(v["juice"]) if isinstance(v.get("juice"), list)
+        else v.get("juice", 0),
+        MappingProxyType({a: tuple(m) for a, m in v.get("attrs_mod", {}).items()}))
+    for k, v in data.professions.items()})
+
+ranks_meta: Mapping[str, RankMeta] = MappingProxyType({
+    k: RankMeta(k, v["ind"], tuple(v["short_desc"]), tuple(v["preposition"]),
+                tuple(v["bounds"]))
+    for k, v in data.ranks.items()})
+
+
 ################
 # RANKS HELPER #
 ################
 
 
-def get_rank(juice: int) -> Dict[str, Any]:
-    for k, v in data.ranks.items():
-        lower, upper = v["bounds"]
-        if lower is None:
-            if juice < upper:
-                return v
-        elif upper is None:
-            if juice >= lower:
-                return v
-        elif lower <= juice < upper:
-            return v
+# lower bounds of every rank but the first one, in rank order
+_rank_bounds = np.array(sorted(v.bounds[0] for v in ranks_meta.values()
+                               if v.bounds[0] is not None))
+_rank_bounds_list = _rank_bounds.tolist()
+_ranks_by_ind = tuple(sorted(ranks_meta.values(), key=lambda v: v.ind))
+
+
+def get_rank(juice: int) -> RankMeta:
+    return _ranks_by_ind[bisect_right(_rank_bounds_list, juice)]
+
+
+def rank_indices(juice: np.ndarray) -> np.ndarray:
+    """vectorized get_rank(juice).ind"""
+    return np.searchsorted(_rank_bounds, juice, side="right")
 
 
 def rank_str(juice: int, alignment: Alignment) -> str:
     align = align_index(alignment)
     rank = get_rank(juice)
-    return " ".join(w for w in [rank["preposition"][align],
-                                rank["short_desc"][align]] if w)
+    return " ".join(w for w in [rank.preposition[align],
+                                rank.short_desc[align]] if w)
 
 
 ####################
@@ -66,6 +127,14 @@ def alignment_mod(alignment: Alignment) -> Dict[str, Tuple[int, int]]:
     return a_mod
 
 
+def alignments(heart: np.ndarray, wisdom: np.ndarray) -> np.ndarray:
+    """vectorized real_alignment(), as Alignment values"""
+    balance = np.asarray(heart) - np.asarray(wisdom)
+    return np.select([balance < -2, balance > 2],
+                     [Alignment.CONSERVATIVE, Alignment.LIBERAL],
+                     Alignment.MODERATE).astype(np.int8)
+
+
 def real_alignment(attrs: Attributes) -> Alignment:
     heart, wisdom = attrs.heart, attrs.wisdom
     balance = heart-wisdom
@@ -82,26 +151,20 @@ def real_alignment(attrs: Attributes) -> Alignment:
 ######################
 
 
-def profession_mod(prof_name: str) -> Dict[str, Tuple[int, int]]:
-    if "attrs_mod" in data.professions[prof_name]:
-        return data.professions[prof_name]["attrs_mod"]
-    return {}
+def profession_mod(prof_name: str) -> Mapping[str, Tuple[int, int]]:
+    return professions_meta[prof_name].attrs_mod
 
 
 def profession_align(prof_name: str) -> Alignment:
-    return Alignment[data.professions[prof_name]["alignment"].upper()]
-
+    return professions_meta[prof_name].alignment
 
-def profession_juice(prof_name: str) -> int:
 
-    if "juice" not in data.professions[prof_name]:
-        return 0
-    juice = data.professions[prof_name]["juice"]
+def profession_juice(prof_name: str, rng: rnd.Random = rnd) -> int:
+    juice = professions_meta[prof_name].juice
     if isinstance(juice, int):
         return juice
-    # assume list here
     lower, upper = juice
-    return rnd.randrange(lower, upper)
+    return rng.randrange(lower, upper)
 
 
 class Sex(Enum):
@@ -111,29 +174,45 @@ class Sex(Enum):
 
 
 class Attributes:
+    """The attributes of a Character.
+
+    version is bumped on every assignment, so that what is derived from the
+    attributes can be cached until they change.
+    """
+    __slots__ = ATTRIBUTES + ("version",)
+    _meta = attributes_meta
+
     def __init__(self, attributes={}, **kwargs):
-        self.hp = 1,
-        self.heart = 1,
-        self.wisdom = 1,
-        self.intel = 1,
-        self.strength = 1,
-        self.agility = 1,
+        object.__setattr__(self, "version", 0)
+        self.hp = 1
+        self.heart = 1
+        self.wisdom = 1
+        self.intel = 1
+        self.strength = 1
+        self.agility = 1
         self.charisma = 1
-        with open("data/attributes.json") as f:
-            self._meta = json.load(f)
         attributes = {**attributes, **kwargs}
         for k, v in attributes.items():
-            if k not in self.__dict__:
+            if k not in ATTRIBUTES:
                 raise KeyError(f"{k} is not a valid attribute")
             setattr(self, k, v)
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "version", self.version + 1)
+
+    def __setstate__(self, state: Tuple[None, Dict[str, Any]]) -> None:
+        # unpickled slots, version included, are restored as they were
+        for k, v in state[1].items():
+            object.__setattr__(self, k, v)
+
     def __str__(self):
-        return "\n".join(f"{self._meta[k]['short_desc']:<13}:{v:>3}"
-                         for k, v in self.__dict__.items() if k[0] != "_")
+        return "\n".join(f"{self._meta[k].short_desc:<13}:{getattr(self, k):>3}"
+                         for k in ATTRIBUTES)
 
     def juicy(self, juice: int, align: Alignment) -> Attributes:
         rank = get_rank(juice)
-        ind = rank["ind"]
+        ind = rank.ind
         if ind == 0:
             return Attributes()
         base_rank = 3
@@ -143,9 +222,8 @@ class Attributes:
             juice_mod = 1/6
 
         d = {}
-        for k, attr in self.__dict__.items():
-            if k[0] != "_":
-                d[k] = max(1, int(attr*(1+(ind-base_rank)*juice_mod)))
+        for k in ATTRIBUTES:
+            d[k] = max(1, int(getattr(self, k)*(1+(ind-base_rank)*juice_mod)))
         if align == Alignment.CONSERVATIVE:
             d["heart"] = self.heart
         elif align == Alignment.LIBERAL:
@@ -156,7 +234,8 @@ class Attributes:
     @classmethod
     def random(cls, align_mod: Dict[str, Tuple[int, int]] = {},
                prof_mod: Dict[str, Tuple[int, int]] = {},
-               mood_mod: Dict[str, Tuple[int, int]] = {}) -> Attributes:
+               mood_mod: Dict[str, Tuple[int, int]] = {},
+               rng: rnd.Random = rnd) -> Attributes:
         default = dict(
             hp=(0, 10),
             heart=(0, 10),
@@ -175,86 +254,132 @@ class Attributes:
         for k, v in prof_mod.items():
             attrs_range[k] = tuple(a+b for a, b in zip(attrs_range[k], v))
 
-        attributes = {k: rnd.randrange(max(1, v[0]), max(2, v[0]+1, v[1]))
+        attributes = {k: rng.randrange(max(1, v[0]), max(2, v[0]+1, v[1]))
                       for k, v in attrs_range.items()}
 
         return cls(attributes)
 
 
-tcod.namegen_parse('data/names/name_tcod_structures.dat')
+def _derived_stat(func):
+    """a Character property cached until its attributes or juice change"""
+    name = func.__name__
+
+    def fget(self):
+        stats = self._derived_stats()
+        try:
+            return stats[name]
+        except KeyError:
+            value = stats[name] = func(self)
+            return value
+
+    return property(fget, doc=func.__doc__)
 
 
 class Character:
+    __slots__ = ("sex", "name", "surname", "nickname", "age", "img",
+                 "profession", "attributes", "inventory", "juice", "offence",
+                 "wounds", "followers", "_stats", "_stats_key")
+
     def __init__(self, name: str = "", surname: str = "", nickname: str = "",
                  sex: Sex = None, img="", attributes=None, alignment: Alignment = None,
                  prof_name="civilian", juice: int = 0, mood_mod: Dict[str, int] = {},
-                 inventory=()) -> None:
-        self.sex = sex or rnd.choice(
+                 inventory=(), rng: rnd.Random = rnd) -> None:
+        self.sex = sex or rng.choice(
             [Sex.MALE.value, Sex.FEMALE.value])
-        tmp_sex = self.sex if self.sex != Sex.UNKNOWN else rnd.choice(
+        tmp_sex = self.sex if Sex(self.sex) != Sex.UNKNOWN else rng.choice(
             [Sex.MALE.value, Sex.FEMALE.value])
-        self.name = name or tcod.namegen_generate_custom(tmp_sex, "$s")
-        self.surname = surname or tcod.namegen_generate_custom(tmp_sex, "$e")
-        self.nickname = nickname or tcod.namegen_generate("animal").title()
-        self.age = rnd.choices([rnd.randrange(16, 21), rnd.randrange(21, 40),
-                                rnd.randrange(40, 80)], [15, 70, 15])[0]
-        self.img = img or rnd.choice(os.listdir(f"data/img/{self.sex}"))
-        self.profession = prof_name
+        self.name = sys.intern(
+            name or namegen.generate_one(tmp_sex, rng, "$s"))
+        self.surname = sys.intern(
+            surname or namegen.generate_one(tmp_sex, rng, "$e"))
+        self.nickname = sys.intern(
+            nickname or namegen.generate_one("animal", rng).title())
+        self.age = rng.choices([rng.randrange(16, 21), rng.randrange(21, 40),
+                                rng.randrange(40, 80)], [15, 70, 15])[0]
+        self.img = sys.intern(img or rng.choice(_imgs[self.sex]))
+        self.profession = professions_meta[prof_name].name
         p_mod = profession_mod(self.profession)
         # self.alignment = alignment or profession_align(self.profession)
         born_align = alignment or profession_align(self.profession)
         a_mod = alignment_mod(born_align)
         self.attributes = attributes or Attributes.random(a_mod, p_mod,
-                                                          mood_mod)
+                                                          mood_mod, rng)
         self.inventory = inventory
-        self.juice = juice or profession_juice(self.profession)
+        self.juice = juice or profession_juice(self.profession, rng)
         self.offence = {}
         self.wounds = {}
         self.followers = []
+        self._stats = {}
+        self._stats_key = None
+
+    def _stats_version(self) -> Tuple:
+        """what the derived stats depend on"""
+        attributes = self.attributes
+        return (self.juice, attributes, attributes.version, self.profession)
+
+    def _derived_stats(self) -> Dict[str, Any]:
+        """the derived stats cache, emptied if _stats_version changed"""
+        key = self._stats_version()
+        if key != self._stats_key:
+            self._stats_key = key
+            self._stats = {}
+        return self._stats
 
     @property
     def fullname(self) -> str:
         return " ".join([self.name, self.surname])
 
-    @property
+    @_derived_stat
     def alignment(self) -> Alignment:
-        heart, wisdom = self.attributes.heart, self.attributes.wisdom
-        balance = heart-wisdom
-        if balance < -2:
-            return Alignment.CONSERVATIVE
-        elif balance > 2:
-            return Alignment.LIBERAL
-        else:
-            return Alignment.MODERATE
+        return real_alignment(self.attributes)
+
+    @_derived_stat
+    def rank(self) -> RankMeta:
+        return get_rank(self.juice)
+
+    @_derived_stat
+    def juicy_attributes(self) -> Attributes:
+        """the attributes, boosted by the rank"""
+        return self.attributes.juicy(self.juice, self.alignment)
 
     @property
     def img_path(self) -> str:
         return f"{data.img_dir}/{self.sex}/{self.img}"
 
     @property
-    def description(self) -> Dict[str, str]:
-        rank_str = f"{get_rank(self.juice)['short_desc'][align_index(self.alignment)].upper()}"
+    def description(self) -> Mapping[str, str]:
+        """read-only, cached until the character changes"""
+        stats = self._derived_stats()
+        key = (self.name, self.surname, self.nickname, self.age, self.sex,
+               self.img)
+        if stats.get("description_key") != key:
+            stats["description_key"] = key
+            stats["description"] = MappingProxyType(self._description())
+        return stats["description"]
+
+    def _description(self) -> Dict[str, str]:
+        rank_str = f"{self.rank.short_desc[align_index(self.alignment)].upper()}"
         rank_str = colored_alignment_str(self.alignment, rank_str)
         prof_str = f"{self.profession.capitalize()}"
         age_str = f"Age {self.age}, {self.sex.capitalize()}"
         juice_str = f"Juice: {self.juice}"
 
-        attrs_str = str(self.attributes.juicy(self.juice, self.alignment))
+        attrs_str = str(self.juicy_attributes)
         text = f"{age_str}\n{prof_str}\n\n{rank_str}\n{juice_str}\n\n{attrs_str}"
         nick = "aka "+self.nickname if self.nickname else ""
 
         return dict(title=self.fullname, subtitle=nick, text=text,
                     img=self.img_path)
 
-    @property
+    @_derived_stat
     def colored_profession(self) -> str:
         return colored_alignment_str(self.alignment, self.profession)
 
     def __repr__(self):
-        return data.professions[self.profession]["short_desc"]
+        return professions_meta[self.profession].short_desc
 
     def __str__(self):
-        true_align = real_alignment(self.attributes)
+        true_align = self.alignment
         true_align_str = alignment_str[true_align]
         prof_align_str = alignment_str[profession_align(self.profession)]
         align_str = (f"Was born {prof_align_str.upper()}, but "
@@ -263,7 +388,7 @@ class Character:
         juice_str = (f"He/She has {self.juice} juice and is therefore considered"
                      f" {rank_str(self.juice, true_align).upper()} by society.")
         attrs_str = '\n\t'.join(
-            str(self.attributes.juicy(self.juice, self.alignment)).split('\n'))
+            str(self.juicy_attributes).split('\n'))
 
         return (f"{type(self).__name__} {self.fullname} is a {self.age} y.o. {self.sex}:\n"
                 f"\t{self.img}\n"
@@ -273,6 +398,609 @@ class Character:
                 f"\t{attrs_str}")
 
 
+##############
+# POPULATION #
+##############
+
+
+SEXES = (Sex.MALE.value, Sex.FEMALE.value, Sex.UNKNOWN.value)
+
+Rows = Union[int, slice, np.ndarray]
+
+
+class Population:
+    """A columnar store of Characters, meant for large crowds.
+
+    Numeric data lives in NumPy arrays, one row per Character, so that
+    questions about the whole crowd are answered with array operations.
+    Use population[row] to get a CharacterView on a row.
+
+    The alignment column is derived from heart and wisdom. It is kept up to
+    date by add_attributes() and CharacterView, call refresh_alignment()
+    after writing to the attributes column directly.
+
+    Args:
+        characters: Iterable[Character]: the initial Characters
+        capacity: int: the number of rows to allocate up front
+    """
+
+    def __init__(self, characters: Iterable[Character] = (),
+                 capacity: int = 64) -> None:
+        capacity = max(1, capacity)
+        self._size = 0
+        self._attributes = np.zeros((capacity, len(ATTRIBUTES)), np.int16)
+        self._juice = np.zeros(capacity, np.int32)
+        self._age = np.zeros(capacity, np.int16)
+        self._sex = np.zeros(capacity, np.int8)
+        self._profession = np.zeros(capacity, np.int16)
+        self._alignment = np.zeros(capacity, np.int8)
+
+        self.names: List[str] = []
+        self.surnames: List[str] = []
+        self.nicknames: List[str] = []
+        self.imgs: List[str] = []
+        # created on first access by CharacterView, None until then
+        self.inventories: List[Any] = []
+        self.offences: List[Optional[Dict]] = []
+        self.wounds: List[Optional[Dict]] = []
+        self.followers: List[Optional[List]] = []
+
+        self.extend(characters)
+
+    #################
+    # COLUMNS VIEWS #
+    #################
+
+    @property
+    def attributes(self) -> np.ndarray:
+        """(len, len(ATTRIBUTES)) array, columns in ATTRIBUTES order"""
+        return self._attributes[:self._size]
+
+    @property
+    def juice(self) -> np.ndarray:
+        return self._juice[:self._size]
+
+    @property
+    def age(self) -> np.ndarray:
+        return self._age[:self._size]
+
+    @property
+    def sex(self) -> np.ndarray:
+        """index in SEXES"""
+        return self._sex[:self._size]
+
+    @property
+    def profession(self) -> np.ndarray:
+        """index in professions_list"""
+        return self._profession[:self._size]
+
+    @property
+    def alignment(self) -> np.ndarray:
+        """Alignment values"""
+        return self._alignment[:self._size]
+
+    def attribute(self, name: str) -> np.ndarray:
+        return self.attributes[:, ATTRIBUTES.index(name)]
+
+    ###########
+    # STORAGE #
+    ###########
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, row: int) -> CharacterView:
+        if not -self._size <= row < self._size:
+            raise IndexError(f"no row {row} in {repr(self)}")
+        return CharacterView(self, row % self._size)
+
+    def __iter__(self) -> Iterator[CharacterView]:
+        return (CharacterView(self, row) for row in range(self._size))
+
+    def reserve(self, capacity: int) -> None:
+        """make room for at least capacity rows"""
+        old_capacity = len(self._juice)
+        if capacity <= old_capacity:
+            return
+        capacity = max(capacity, 2*old_capacity)
+        for k in ("_attributes", "_juice", "_age", "_sex", "_profession",
+                  "_alignment"):
+            old = getattr(self, k)
+            new = np.zeros((capacity, *old.shape[1:]), old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, k, new)
+
+    def append(self, character: Character) -> int:
+        """copy character in a new row
+
+        Returns:
+            int: the new row
+        """
+        return int(self.extend([character])[0])
+
+    def extend(self, characters: Iterable[Character]) -> np.ndarray:
+        """copy characters in new rows
+
+        Returns:
+            np.ndarray: the new rows
+        """
+        characters = list(characters)
+        rows = self.extend_columns(
+            attributes=[[getattr(c.attributes, k) for k in ATTRIBUTES]
+                        for c in characters],
+            juice=[c.juice for c in characters],
+            age=[c.age for c in characters],
+            sex=[SEXES.index(c.sex) for c in characters],
+            profession=[professions_list.index(c.profession)
+                        for c in characters],
+            names=[c.name for c in characters],
+            surnames=[c.surname for c in characters],
+            nicknames=[c.nickname for c in characters],
+            imgs=[c.img for c in characters])
+        for row, c in zip(rows, characters):
+            self.inventories[row] = c.inventory
+            self.offences[row] = c.offence or None
+            self.wounds[row] = c.wounds or None
+            self.followers[row] = c.followers or None
+        return rows
+
+    def extend_columns(self, attributes: np.ndarray, juice: np.ndarray,
+                       age: np.ndarray, sex: np.ndarray,
+                       profession: np.ndarray, names: List[str],
+                       surnames: List[str], nicknames: List[str],
+                       imgs: List[str]) -> np.ndarray:
+        """add new rows, given column-wise
+
+        Returns:
+            np.ndarray: the new rows
+        """
+        start, stop = self._size, self._size + len(names)
+        self.reserve(stop)
+        self._attributes[start:stop] = np.reshape(attributes,
+                                                  (-1, len(ATTRIBUTES)))
+        self._juice[start:stop] = juice
+        self._age[start:stop] = age
+        self._sex[start:stop] = sex
+        self._profession[start:stop] = profession
+        self.names += names
+        self.surnames += surnames
+        self.nicknames += nicknames
+        self.imgs += imgs
+        empty = [None] * (stop - start)
+        self.inventories += [()] * (stop - start)
+        self.offences += empty
+        self.wounds += empty
+        self.followers += empty
+        self._size = stop
+        self.refresh_alignment(slice(start, stop))
+        return np.arange(start, stop)
+
+    @classmethod
+    def from_columns(cls, attributes: np.ndarray, juice: np.ndarray,
+                     age: np.ndarray, sex: np.ndarray, profession: np.ndarray,
+                     names: List[str], surnames: List[str],
+                     nicknames: List[str], imgs: List[str]) -> Population:
+        """a Population using the given arrays as its columns, not copied
+
+        The arrays may be memory-mapped: they are only copied once the
+        Population grows past their length.
+        """
+        population = cls(capacity=1)
+        population._size = len(names)
+        population._attributes = attributes
+        population._juice = juice
+        population._age = age
+        population._sex = sex
+        population._profession = profession
+        population._alignment = np.zeros(len(names), np.int8)
+        population.names = names
+        population.surnames = surnames
+        population.nicknames = nicknames
+        population.imgs = imgs
+        empty = [None] * len(names)
+        population.inventories = [()] * len(names)
+        population.offences = list(empty)
+        population.wounds = list(empty)
+        population.followers = list(empty)
+        population.refresh_alignment()
+        return population
+
+    def to_bytes(self) -> bytearray:
+        """the Population encoded with common.wire
+
+        The columns are arrays, the strings ids in a table. It is a bit
+        smaller than a pickle but slower to encode, the strings are looked
+        up one by one, see common.wire.main().
+        """
+        size = self._size
+        arrays = dict(attributes=self._attributes[:size],
+                      juice=self._juice[:size], age=self._age[:size],
+                      sex=self._sex[:size],
+                      profession=self._profession[:size])
+        meta = dict(extras=encode_extras({k: getattr(self, k)
+                                          for k in EXTRA_FIELDS}))
+        meta["strings"], ids = wire.encode_strings(
+            {k: getattr(self, k) for k in STRING_COLUMNS})
+        arrays.update(ids)
+        return wire.pack(meta, arrays)
+
+    @classmethod
+    def from_bytes(cls, buffer: wire.Buffer) -> Population:
+        """the Population of to_bytes(), whose numeric columns are views of
+        buffer, read-only unless buffer is writable. The string columns and
+        the extras are rebuilt as lists.
+        """
+        meta, arrays = wire.unpack(buffer)
+        table = [sys.intern(s) for s in meta["strings"]]
+        strings = {k: wire.decode_strings(table, arrays.pop(k))
+                   for k in STRING_COLUMNS}
+        population = cls.from_columns(**arrays, **strings)
+        decode_extras(population, meta["extras"])
+        return population
+
+    ###########
+    # UPDATES #
+    ###########
+
+    def refresh_alignment(self, rows: Rows = slice(None)) -> None:
+        attributes = self.attributes[rows]
+        self.alignment[rows] = alignments(
+            attributes[..., ATTRIBUTES.index("heart")],
+            attributes[..., ATTRIBUTES.index("wisdom")])
+
+    def add_attributes(self, rows: Rows, deltas: np.ndarray) -> None:
+        """add deltas to the attributes of rows, keeping them at least 1
+
+        Args:
+            rows: Rows: the rows to update
+            deltas: np.ndarray: broadcastable to (len(rows), len(ATTRIBUTES))
+        """
+        attributes = self.attributes
+        attributes[rows] = np.maximum(1, attributes[rows] + deltas)
+        self.refresh_alignment(rows)
+
+    def add_juice(self, rows: Rows, deltas: Union[int, np.ndarray]) -> None:
+        self.juice[rows] += deltas
+
+    ###########
+    # QUERIES #
+    ###########
+
+    def ranks(self) -> np.ndarray:
+        """rank index of every row, see data.ranks"""
+        return rank_indices(self.juice)
+
+    def juicy_attributes(self) -> np.ndarray:
+        """vectorized Attributes.juicy() of every row"""
+        ranks = self.ranks()[:, None]
+        base_rank = 3
+        juice_mod = np.where(ranks < base_rank, 1/4, 1/6)
+        juicy = (self.attributes * (1+(ranks-base_rank)*juice_mod)).astype(int)
+        juicy = np.maximum(1, juicy)
+        juicy[ranks[:, 0] == 0] = 1
+
+        heart, wisdom = ATTRIBUTES.index("heart"), ATTRIBUTES.index("wisdom")
+        conservative = self.alignment == Alignment.CONSERVATIVE
+        liberal = self.alignment == Alignment.LIBERAL
+        juicy[conservative, heart] = self.attributes[conservative, heart]
+        juicy[liberal, wisdom] = self.attributes[liberal, wisdom]
+        return juicy
+
+    def follower_counts(self) -> np.ndarray:
+        """the number of followers of every row"""
+        if not any(self.followers):
+            return np.zeros(len(self), np.int32)
+        return np.fromiter((len(f) if f else 0 for f in self.followers),
+                           np.int32, len(self))
+
+    def alignment_mix(self) -> Dict[Alignment, int]:
+        """the number of Characters of each alignment"""
+        counts = np.bincount(self.alignment, minlength=Alignment.LIBERAL+1)
+        return {a: int(counts[a]) for a in (Alignment.CONSERVATIVE,
+                                            Alignment.MODERATE,
+                                            Alignment.LIBERAL)}
+
+    def profession_mix(self) -> Dict[str, int]:
+        """the number of Characters of each profession present"""
+        counts = np.bincount(self.profession, minlength=len(professions_list))
+        return {professions_list[i]: int(counts[i])
+                for i in np.flatnonzero(counts)}
+
+    def attributes_mean(self) -> Dict[str, float]:
+        if not len(self):
+            return {k: 0. for k in ATTRIBUTES}
+        means = self.attributes.mean(axis=0)
+        return {k: float(m) for k, m in zip(ATTRIBUTES, means)}
+
+    def best_recruit(self, rows: Optional[np.ndarray] = None) -> int:
+        """the most liberal non-conservative Character, charisma breaking ties
+
+        Args:
+            rows: np.ndarray: the candidate rows, every row if None
+
+        Returns:
+            int: the row of the best candidate, -1 if there is none
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        rows = rows[self.alignment[rows] != Alignment.CONSERVATIVE]
+        if not len(rows):
+            return -1
+        attributes = self.attributes[rows].astype(np.int32)
+        balance = (attributes[:, ATTRIBUTES.index("heart")]
+                   - attributes[:, ATTRIBUTES.index("wisdom")])
+        score = balance * 1000 + attributes[:, ATTRIBUTES.index("charisma")]
+        return int(rows[np.argmax(score)])
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__} of {len(self)} characters"
+
+
+# Population lists of strings
+STRING_COLUMNS = ("names", "surnames", "nicknames", "imgs")
+# Population lists not in the columns, mostly empty
+EXTRA_FIELDS = ("inventories", "offences", "wounds", "followers")
+
+
+def encode_extras(extras: Dict[str, List[Any]]) -> Dict[str, Dict[int, Any]]:
+    """the non-empty values of EXTRA_FIELDS lists by row, JSON serializable
+
+    Followers are CharacterViews of the same Population, encoded as rows.
+    """
+    encoded = {}
+    for k, values in extras.items():
+        rows = np.flatnonzero(np.fromiter(map(bool, values), bool,
+                                          len(values))).tolist()
+        if k == "followers":
+            encoded[k] = {row: [f.row for f in values[row]] for row in rows}
+        else:
+            encoded[k] = {row: values[row] if isinstance(values[row], dict)
+                          else list(values[row]) for row in rows}
+    return encoded
+
+
+def decode_extras(population: Population,
+                  extras: Dict[str, Dict[Any, Any]]) -> None:
+    """set the lists of population from encode_extras()"""
+    for k, values in extras.items():
+        column = getattr(population, k)
+        for row, value in values.items():
+            row = int(row)
+            if k == "followers":
+                column[row] = [population[r] for r in value]
+            elif k == "inventories":
+                column[row] = tuple(value)
+            else:
+                column[row] = value
+
+
+def _row_column(name: str, values: Optional[tuple] = None) -> property:
+    """a CharacterView property backed by a Population array"""
+    def fget(self: CharacterView) -> Any:
+        value = getattr(self.population, name)[self.row]
+        return values[value] if values else int(value)
+
+    def fset(self: CharacterView, value: Any) -> None:
+        column = getattr(self.population, name)
+        column[self.row] = values.index(value) if values else value
+    return property(fget, fset)
+
+
+def _row_field(name: str, factory=None) -> property:
+    """a CharacterView property backed by a Population list
+
+    If factory is set, a None value is replaced by factory() when read.
+    """
+    def fget(self: CharacterView) -> Any:
+        values = getattr(self.population, name)
+        if values[self.row] is None and factory is not None:
+            values[self.row] = factory()
+        return values[self.row]
+
+    def fset(self: CharacterView, value: Any) -> None:
+        getattr(self.population, name)[self.row] = value
+    return property(fget, fset)
+
+
+class CharacterView(Character):
+    """A Character backed by a row of a Population.
+
+    Reading a field reads the row, assigning a field writes it. Note that
+    attributes is a copy: assign a new Attributes to change them.
+    """
+    __slots__ = ("population", "row")
+
+    def __init__(self, population: Population, row: int) -> None:
+        self.population = population
+        self.row = row
+        self._stats = {}
+        self._stats_key = None
+
+    juice = _row_column("juice")
+    age = _row_column("age")
+    sex = _row_column("sex", values=SEXES)
+    profession = _row_column("profession", values=professions_list)
+    name = _row_field("names")
+    surname = _row_field("surnames")
+    nickname = _row_field("nicknames")
+    img = _row_field("imgs")
+    inventory = _row_field("inventories")
+    offence = _row_field("offences", dict)
+    wounds = _row_field("wounds", dict)
+    followers = _row_field("followers", list)
+
+    @property
+    def attributes(self) -> Attributes:
+        row = self.population.attributes[self.row]
+        return Attributes({k: int(v) for k, v in zip(ATTRIBUTES, row)})
+
+    @attributes.setter
+    def attributes(self, value: Attributes) -> None:
+        self.population.attributes[self.row] = [getattr(value, k)
+                                                for k in ATTRIBUTES]
+        self.population.refresh_alignment(self.row)
+
+    @property
+    def alignment(self) -> Alignment:
+        return Alignment(int(self.population.alignment[self.row]))
+
+    def _stats_version(self) -> Tuple:
+        population, row = self.population, self.row
+        return (int(population.juice[row]),
+                population.attributes[row].tobytes(),
+                int(population.alignment[row]), int(population.profession[row]))
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, CharacterView)
+                and other.population is self.population
+                and other.row == self.row)
+
+    def __hash__(self) -> int:
+        return hash((id(self.population), self.row))
+
+    def __reduce__(self) -> Tuple:
+        # a row of its Population, the cached stats are not worth pickling
+        return type(self), (self.population, self.row)
+
+
+######################
+# BATCHED GENERATION #
+######################
+
+
+def _attrs_mod_array(mod: Dict[str, Tuple[int, int]]) -> np.ndarray:
+    """(len(ATTRIBUTES), 2) array of an attributes modifier dict"""
+    array = np.zeros((len(ATTRIBUTES), 2), np.int32)
+    for k, v in mod.items():
+        array[ATTRIBUTES.index(k)] = v
+    return array
+
+
+def _profession_tables() -> Dict[str, np.ndarray]:
+    """per profession arrays, in professions_list order"""
+    juice = np.zeros((len(professions_list), 2), np.int32)
+    for i, p in enumerate(professions_list):
+        p_juice = professions_meta[p].juice
+        juice[i] = p_juice if isinstance(p_juice, tuple) \
+            else (p_juice, p_juice+1)
+    return dict(
+        attrs_mod=np.stack([_attrs_mod_array(profession_mod(p))
+                            for p in professions_list]),
+        align_mod=np.stack([_attrs_mod_array(alignment_mod(profession_align(p)))
+                            for p in professions_list]),
+        juice=juice)
+
+
+_profession_arrays = _profession_tables()
+_default_attrs_range = np.tile([0, 10], (len(ATTRIBUTES), 1))
+_age_ranges = np.array([[16, 21], [21, 40], [40, 80]])
+_age_weights = np.array([15, 70, 15]) / 100
+_imgs = {sex: [sys.intern(img)
+               for img in sorted(os.listdir(f"{data.img_dir}/{sex}"))]
+         for sex in SEXES}
+
+
+def generate_names(sexes: np.ndarray, rng: np.random.Generator
+                   ) -> Tuple[List[str], List[str], List[str]]:
+    """first names, surnames and nicknames for characters of given sexes
+
+    Args:
+        sexes: np.ndarray: the SEXES index of each character, male or female
+        rng: np.random.Generator: the random stream to use
+    """
+    n = len(sexes)
+    names, surnames = [None] * n, [None] * n
+    for i, s in enumerate(SEXES[:2]):
+        rows = np.flatnonzero(sexes == i).tolist()
+        if rows:
+            for row, name, surname in zip(
+                    rows, namegen.generate(s, len(rows), rng, "$s"),
+                    namegen.generate(s, len(rows), rng, "$e")):
+                names[row] = sys.intern(name)
+                surnames[row] = sys.intern(surname)
+    nicknames = [sys.intern(nickname.title())
+                 for nickname in namegen.generate("animal", n, rng)]
+    return names, surnames, nicknames
+
+
+def generate_characters(n: int,
+                        prof_names: Union[str, List[str]] = "civilian",
+                        mood_mod: Dict[str, Tuple[int, int]] = {},
+                        alignment: Alignment = None, sex: Sex = None,
+                        rng: Optional[np.random.Generator] = None,
+                        population: Optional[Population] = None,
+                        names_rng: Optional[np.random.Generator] = None
+                        ) -> Population:
+    """Generate n random Characters at once.
+
+    Every field is drawn as in Character.__init__, but for all the
+    Characters in a few array operations.
+
+    Args:
+        n: int: the number of Characters
+        prof_names: Union[str, List[str]]: a profession for all the
+            Characters, or one per Character
+        mood_mod: Dict[str, Tuple[int, int]]: see Country.mood_modifier
+        alignment: Alignment: the born alignment, by default the one of the
+            profession
+        sex: Sex: the sex value of every Character, by default male or
+            female at random
+        rng: np.random.Generator: the random stream to use
+        population: Population: where to add the Characters, a new
+            Population if None
+        names_rng: np.random.Generator: the random stream of the names, rng
+            if None
+
+    Returns:
+        Population: population, with n new rows
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    population = population if population is not None \
+        else Population(capacity=n)
+
+    if isinstance(prof_names, str):
+        prof_ids = np.full(n, professions_list.index(prof_names))
+    else:
+        prof_ids = np.array([professions_list.index(p) for p in prof_names],
+                            int)
+
+    sex_ids = np.full(n, SEXES.index(Sex(sex).value)) if sex \
+        else rng.integers(2, size=n)
+    name_sex_ids = np.where(sex_ids == SEXES.index(Sex.UNKNOWN.value),
+                            rng.integers(2, size=n), sex_ids)
+    names = generate_names(name_sex_ids,
+                           names_rng if names_rng is not None else rng)
+
+    age_ranges = _age_ranges[rng.choice(len(_age_ranges), n, p=_age_weights)]
+    age = rng.integers(age_ranges[:, 0], age_ranges[:, 1])
+
+    imgs = [None] * n
+    for i, s in enumerate(SEXES):
+        rows = np.flatnonzero(sex_ids == i)
+        if len(rows):
+            choices = rng.integers(len(_imgs[s]), size=len(rows))
+            for row, c in zip(rows.tolist(), choices.tolist()):
+                imgs[row] = _imgs[s][c]
+
+    align_mod = _profession_arrays["align_mod"][prof_ids] if alignment is None \
+        else _attrs_mod_array(alignment_mod(alignment))
+    attrs_range = (_default_attrs_range + _attrs_mod_array(mood_mod)
+                   + align_mod + _profession_arrays["attrs_mod"][prof_ids])
+    attrs_range = np.broadcast_to(attrs_range, (n, *_default_attrs_range.shape))
+    lower, upper = attrs_range[..., 0], attrs_range[..., 1]
+    attributes = rng.integers(np.maximum(1, lower),
+                              np.maximum.reduce([np.full_like(lower, 2),
+                                                 lower+1, upper]))
+
+    juice_range = _profession_arrays["juice"][prof_ids]
+    juice = rng.integers(juice_range[:, 0], juice_range[:, 1])
+
+    population.extend_columns(attributes=attributes, juice=juice, age=age,
+                              sex=sex_ids, profession=prof_ids,
+                              names=names[0], surnames=names[1],
+                              nicknames=names[2], imgs=imgs)
+    return population
+
+
 def main() -> None:
 
     for k in data.professions:
@@ -0,0 +1,460 @@
+from __future__ import annotations
+import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, \
+    Union
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+GRID_FILE = "grid.json"
+
+# a chunk to write: its array, or the .npy file it already is in
+ChunkData = Union[np.ndarray, str]
+
+
+class FrozenChunks:
+    """The chunks of a ChunkedGrid to write to a directory, see freeze()
+
+    Args:
+        meta: Dict[str, Any]: what ChunkedGrid.open() needs
+        chunks: Dict[int, ChunkData]: the chunks to write, by key
+        full: bool: whether chunks is every chunk of the grid, so that the
+            other files of the directory are stale
+    """
+    __slots__ = ("meta", "chunks", "full")
+
+    def __init__(self, meta: Dict, chunks: Dict[int, ChunkData],
+                 full: bool) -> None:
+        self.meta = meta
+        self.chunks = chunks
+        self.full = full
+
+    def write(self, directory: str) -> int:
+        """write the chunks to directory, to be called from any thread
+
+        Returns:
+            int: the number of chunk files written
+        """
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, GRID_FILE), self.meta)
+        for key, data in self.chunks.items():
+            path = os.path.join(directory, f"{key}.npy")
+            if isinstance(data, str):
+                if os.path.abspath(data) != os.path.abspath(path):
+                    shutil.copyfile(data, path + ".tmp")
+                    os.replace(path + ".tmp", path)
+            else:
+                with open(path + ".tmp", "wb") as f:
+                    np.save(f, data)
+                os.replace(path + ".tmp", path)
+        if self.full:
+            for name in os.listdir(directory):
+                stem, ext = os.path.splitext(name)
+                if ext == ".npy" and int(stem) not in self.chunks:
+                    os.remove(os.path.join(directory, name))
+        return len(self.chunks)
+
+
+def _write_json(path: str, value: Dict) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(value, f)
+    os.replace(path + ".tmp", path)
+
+
+class _SpillFiles:
+    """The files a ChunkedGrid spills its chunks to, shared with its
+    snapshots
+
+    Each file is counted once for the grid holding it, and once for each
+    snapshot that may read it. It is removed when the count drops to 0, the
+    directory once the grid and its snapshots are gone. The snapshots are
+    read, and released, on another thread than the grid: the counts are
+    only touched under the lock.
+    """
+
+    def __init__(self) -> None:
+        self.directory: Optional[str] = None
+        self._cnt = 0
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def owns(self, path: str) -> bool:
+        return os.path.dirname(path) == self.directory
+
+    def new(self, key: int) -> str:
+        """the path of a new file for the chunk key, held by the grid"""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="lg-chunks-")
+            weakref.finalize(self, shutil.rmtree, self.directory, True)
+        # never overwritten, a snapshot may still read the previous one
+        self._cnt += 1
+        path = os.path.join(self.directory, f"{key}-{self._cnt}.npy")
+        with self._lock:
+            self._refs[path] = 1
+        return path
+
+    def hold(self, paths: Iterable[str]) -> List[str]:
+        """count paths once more, those that are spilled files
+
+        Returns:
+            List[str]: the paths counted, to release() later
+        """
+        with self._lock:
+            held = [p for p in paths if p in self._refs]
+            for path in held:
+                self._refs[path] += 1
+        return held
+
+    def release(self, paths: Iterable[str]) -> None:
+        """count paths once less, and remove those no longer held"""
+        with self._lock:
+            for path in paths:
+                refs = self._refs.pop(path) - 1
+                if refs:
+                    self._refs[path] = refs
+                else:
+                    os.remove(path)
+
+
+class ChunkedGrid:
+    """A 2D grid stored as square chunks, allocated when first written.
+
+    Reading a cell of a chunk never written gives fill. At most max_hot
+    chunks are kept in memory: the least recently used ones are spilled to
+    .npy files of a temporary directory and memory-mapped back the next
+    time they are needed.
+
+    Cells are indexed as NumPy arrays are, grid[y, x], with plain ints.
+
+    The chunks written since the last freeze() are tracked, so that saves
+    only write those. Frozen chunks are shared with the saving thread and
+    copied before they are written to again.
+
+    Args:
+        shape: Tuple[int, int]: (height, width) of the grid
+        dtype: np.dtype: the type of the cells
+        chunk_size: int: the side of a chunk, a power of 2
+        fill: int: the value of the cells never written
+        max_hot: int: the number of chunks kept in memory, all if None
+    """
+
+    def __init__(self, shape: Tuple[int, int], dtype: np.dtype,
+                 chunk_size: int = 64, fill: int = 0,
+                 max_hot: Optional[int] = None) -> None:
+        if chunk_size <= 0 or chunk_size & (chunk_size - 1):
+            raise ValueError("chunk_size must be a power of 2")
+        if max_hot is not None and max_hot < 1:
+            raise ValueError("max_hot must be at least 1")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.fill = fill
+        self.max_hot = max_hot
+        self._height, self._width = self.shape
+        self._shift = chunk_size.bit_length() - 1
+        self._mask = chunk_size - 1
+        # a chunk key is cy * _stride + cx, ints hash faster than tuples
+        self._stride = (self._width >> self._shift) + 1
+        self._hot: OrderedDict[int, np.ndarray] = OrderedDict()
+        # memoryviews of the hot chunks, they index much faster than arrays
+        self._views: Dict[int, memoryview] = {}
+        # the .npy file of each chunk not in memory, and of each chunk in
+        # memory still the same as a file
+        self._cold: Dict[int, str] = {}
+        self._origin: Dict[int, str] = {}
+        self._files = _SpillFiles()
+        # by directory, the chunks written since the last freeze() for it
+        self._dirty: Dict[str, Set[int]] = {}
+        # shared with a frozen copy, a snapshot or a wire buffer, copied on
+        # write
+        self._shared: Set[int] = set()
+        self._read_only = False
+        # the last chunks used, most lookups hit the same chunk in a row
+        self._last_key = -1
+        self._last_view: Optional[memoryview] = None
+        self._last_write_key = -1
+        self._last_write_view: Optional[memoryview] = None
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, chunk_size: int = 64,
+                   fill: int = 0,
+                   max_hot: Optional[int] = None) -> ChunkedGrid:
+        """a grid with the cells of array, chunks only holding fill are not
+        allocated"""
+        grid = cls(array.shape, array.dtype, chunk_size, fill, max_hot)
+        height, width = array.shape
+        for y in range(0, height, chunk_size):
+            for x in range(0, width, chunk_size):
+                block = array[y:y+chunk_size, x:x+chunk_size]
+                if (block != fill).any():
+                    chunk = grid._writable(grid._key(y, x))
+                    chunk[:block.shape[0], :block.shape[1]] = block
+        return grid
+
+    @classmethod
+    def open(cls, directory: str,
+             max_hot: Optional[int] = None) -> ChunkedGrid:
+        """the grid written to directory, see freeze()
+
+        Nothing is read but the grid description: each chunk is
+        memory-mapped the first time it is needed.
+        """
+        with open(os.path.join(directory, GRID_FILE)) as f:
+            meta = json.load(f)
+        grid = cls(meta["shape"], meta["dtype"], meta["chunk_size"],
+                   meta["fill"], max_hot)
+        for name in os.listdir(directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".npy":
+                grid._cold[int(stem)] = os.path.join(directory, name)
+        grid._dirty[os.path.abspath(directory)] = set()
+        return grid
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def hot_count(self) -> int:
+        """the number of chunks in memory"""
+        return len(self._hot)
+
+    @property
+    def cold_count(self) -> int:
+        """the number of chunks not in memory"""
+        return len(self._cold)
+
+    def dirty_count(self, directory: str) -> int:
+        """the number of chunks written since the last freeze(directory),
+        -1 if the grid was never frozen for directory"""
+        dirty = self._dirty.get(os.path.abspath(directory))
+        return -1 if dirty is None else len(dirty)
+
+    @property
+    def nbytes(self) -> int:
+        """the memory used by the chunks in memory"""
+        return sum(c.nbytes for c in self._hot.values())
+
+    def _key(self, y: int, x: int) -> int:
+        return (y >> self._shift) * self._stride + (x >> self._shift)
+
+    def __getitem__(self, key: Tuple[int, int]) -> int:
+        y, x = key
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise IndexError(f"{key} is out of a {self.shape} grid")
+        s = self._shift
+        chunk_key = (y >> s) * self._stride + (x >> s)
+        if chunk_key == self._last_key:
+            view = self._last_view
+        elif self._chunk(chunk_key, False) is not None:
+            view = self._last_view
+        else:
+            return self.fill
+        return view[y & self._mask, x & self._mask]
+
+    def __setitem__(self, key: Tuple[int, int], value: int) -> None:
+        y, x = key
+        if not (0 <= y < self._height and 0 <= x < self._width):
+            raise IndexError(f"{key} is out of a {self.shape} grid")
+        s = self._shift
+        chunk_key = (y >> s) * self._stride + (x >> s)
+        if chunk_key != self._last_write_key:
+            self._writable(chunk_key)
+        self._last_write_view[y & self._mask, x & self._mask] = value
+
+    def scatter(self, ys: np.ndarray, xs: np.ndarray,
+                values: np.ndarray) -> None:
+        """grid[ys[i], xs[i]] = values[i] for every i, chunk by chunk"""
+        ys, xs = np.asarray(ys), np.asarray(xs)
+        values = np.broadcast_to(np.asarray(values, self.dtype), ys.shape)
+        keys = (ys >> self._shift) * self._stride + (xs >> self._shift)
+        order = np.argsort(keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            chunk = self._writable(int(keys[group[0]]))
+            chunk[ys[group] & self._mask, xs[group] & self._mask] = \
+                values[group]
+
+    def chunks(self) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """(y, x, chunk) of every allocated chunk, cut to the grid bounds
+
+        The chunks are given in row-major order, read-only. Chunks not in
+        memory are loaded back one at a time.
+        """
+        for key in sorted([*self._hot, *self._cold]):
+            chunk = self._chunk(key, False)
+            cy, cx = divmod(key, self._stride)
+            y, x = cy << self._shift, cx << self._shift
+            yield y, x, chunk[:self._height - y, :self._width - x]
+
+    def count_nonzero(self, bits: Optional[int] = None) -> int:
+        """the number of cells different from 0, or with any of bits"""
+        return sum(int(np.count_nonzero(c if bits is None else c & bits))
+                   for _, _, c in self.chunks())
+
+    def nonzero(self) -> Iterator[Tuple[int, int]]:
+        """the (y, x) of every cell different from 0, chunk by chunk"""
+        for y, x, chunk in self.chunks():
+            for j, i in np.argwhere(chunk).tolist():
+                yield y + j, x + i
+
+    def to_array(self) -> np.ndarray:
+        """the whole grid, as a dense array"""
+        array = np.full(self.shape, self.fill, self.dtype)
+        for y, x, chunk in self.chunks():
+            array[y:y+chunk.shape[0], x:x+chunk.shape[1]] = chunk
+        return array
+
+    ##########
+    # SAVING #
+    ##########
+
+    def freeze(self, directory: str) -> FrozenChunks:
+        """the chunks to write to directory to save the grid there
+
+        Only the chunks written since the last freeze() for directory are
+        given, or every chunk the first time. It is cheap: hot chunks are
+        not copied but shared, until they are written to again.
+        FrozenChunks.write() can then run on another thread.
+        """
+        directory = os.path.abspath(directory)
+        dirty = self._dirty.get(directory)
+        full = dirty is None
+        chunks: Dict[int, ChunkData] = {}
+        for key in (set(self._hot) | set(self._cold) if full else dirty):
+            if key in self._hot:
+                chunks[key] = self._hot[key]
+                self._shared.add(key)
+            elif self._files.owns(self._cold[key]):
+                # spilled files are removed once the chunk changes, copy it
+                chunks[key] = np.load(self._cold[key])
+            else:
+                chunks[key] = self._cold[key]
+        self._dirty[directory] = set()
+        self._last_write_key = -1
+        meta = dict(shape=self.shape, dtype=self.dtype.str,
+                    chunk_size=self.chunk_size, fill=self.fill)
+        return FrozenChunks(meta, chunks, full)
+
+    def snapshot(self) -> ChunkedGrid:
+        """a read-only copy of the grid, as it is now
+
+        It is cheap: the chunks in memory are shared until the grid writes
+        to them again, the others are read from their file when needed.
+        Hand it to another thread, which should be the only one reading it.
+        """
+        copy = type(self)(self.shape, self.dtype, self.chunk_size, self.fill)
+        copy._hot.update(self._hot)
+        copy._views.update(self._views)
+        copy._cold.update(self._cold)
+        copy._read_only = True
+        self._shared.update(self._hot)
+        self._last_write_key = -1
+        # the spilled files it may read outlive the grid writing to them
+        held = self._files.hold(copy._cold.values())
+        weakref.finalize(copy, self._files.release, held)
+        return copy
+
+    def to_wire(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        """the description of the grid and its chunks, stacked by key, to
+        encode with common.wire"""
+        keys = np.array(sorted([*self._hot, *self._cold]), np.int64)
+        chunks = np.empty((len(keys), self.chunk_size, self.chunk_size),
+                          self.dtype)
+        for i, key in enumerate(keys.tolist()):
+            chunks[i] = self._chunk(key, False)
+        meta = dict(shape=self.shape, dtype=self.dtype.str,
+                    chunk_size=self.chunk_size, fill=self.fill)
+        return meta, dict(keys=keys, chunks=chunks)
+
+    @classmethod
+    def from_wire(cls, meta: Dict, arrays: Dict[str, np.ndarray],
+                  max_hot: Optional[int] = None) -> ChunkedGrid:
+        """the grid of to_wire(), whose chunks are views of arrays until
+        they are written to"""
+        grid = cls(meta["shape"], meta["dtype"], meta["chunk_size"],
+                   meta["fill"], max_hot)
+        for key, chunk in zip(arrays["keys"].tolist(), arrays["chunks"]):
+            grid._hot[key] = chunk
+            grid._views[key] = memoryview(chunk)
+            grid._shared.add(key)
+        grid._spill()
+        return grid
+
+    def _writable(self, key: int) -> np.ndarray:
+        """the chunk key, created if need be, ready to be written to"""
+        if self._read_only:
+            raise ValueError("a snapshot is read-only")
+        chunk = self._chunk(key, True)
+        if key in self._shared:
+            self._shared.discard(key)
+            chunk = chunk.copy()
+            self._hot[key] = chunk
+            self._views[key] = memoryview(chunk)
+            self._last_view = self._views[key]
+        for dirty in self._dirty.values():
+            dirty.add(key)
+        origin = self._origin.pop(key, None)
+        if origin is not None and self._files.owns(origin):
+            self._files.release([origin])
+        self._last_write_key = key
+        self._last_write_view = self._views[key]
+        return chunk
+
+    def _chunk(self, key: int, create: bool) -> Optional[np.ndarray]:
+        """the chunk key, made the last used one, None if never written"""
+        chunk = self._hot.get(key)
+        if chunk is not None:
+            if self.max_hot is not None:
+                self._hot.move_to_end(key)
+        else:
+            if key in self._cold:
+                path = self._origin[key] = self._cold.pop(key)
+                chunk = np.array(np.load(path, mmap_mode="r"))
+            elif create:
+                chunk = np.full((self.chunk_size,)*2, self.fill, self.dtype)
+            else:
+                return None
+            self._hot[key] = chunk
+            self._views[key] = memoryview(chunk)
+            self._spill()
+        self._last_key = key
+        self._last_view = self._views[key]
+        return chunk
+
+    def _spill(self) -> None:
+        if self.max_hot is None:
+            return
+        while len(self._hot) > self.max_hot:
+            key, chunk = self._hot.popitem(last=False)
+            del self._views[key]
+            self._shared.discard(key)
+            if key == self._last_write_key:
+                self._last_write_key = -1
+            if key in self._origin:
+                # unchanged since it was read, no need to write it
+                self._cold[key] = self._origin.pop(key)
+                continue
+            path = self._files.new(key)
+            spilled = np.lib.format.open_memmap(path + ".tmp", "w+",
+                                                self.dtype, chunk.shape)
+            spilled[...] = chunk
+            spilled.flush()
+            del spilled
+            os.replace(path + ".tmp", path)
+            self._cold[key] = path
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}({self.shape}, {self.dtype}, "
+                f"{self.hot_count} hot / {self.cold_count} cold chunks)")
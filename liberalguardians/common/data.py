@@ -30,4 +30,10 @@ with open('data/areas.json') as f:
 with open('data/interactions.json') as f:
     interactions = json.load(f)
 
+with open('data/events.json') as f:
+    events = json.load(f)
+
+with open('data/attributes.json') as f:
+    attributes = json.load(f)
+
 logger.debug("Loading game data : done")
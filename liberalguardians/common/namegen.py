@@ -0,0 +1,137 @@
+from __future__ import annotations
+import os
+import re
+import logging
+import random as rnd
+from typing import Dict, List, NamedTuple, Optional, Union
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+NAMES_PATH = "data/names/name_tcod_structures.dat"
+NAMES_CACHE_PATH = "data/names/name_tcod_structures.cache.npz"
+
+_set_re = re.compile(r'name\s+"(?P<name>[^"]+)"\s*{(?P<body>[^}]*)}')
+_property_re = re.compile(r'(?P<key>\w+)\s*=\s*"(?P<value>[^"]*)"')
+
+
+class NameSet(NamedTuple):
+    """A name set of a libtcod namegen file.
+
+    Only the syllablesStart ($s), syllablesEnd ($e) and rules properties
+    are supported, which is all the game data uses. As in libtcod, a '_'
+    in a rule is a space and rules are separated by commas.
+    """
+    start: np.ndarray
+    end: np.ndarray
+    rules: np.ndarray
+
+
+def parse(path: str) -> Dict[str, NameSet]:
+    """parse a libtcod namegen file"""
+    with open(path) as f:
+        content = f.read()
+    sets = {}
+    for match in _set_re.finditer(content):
+        props = {m["key"]: m["value"].split(",")
+                 for m in _property_re.finditer(match["body"])}
+        sets[match["name"]] = NameSet(
+            np.array(props.get("syllablesStart", [])),
+            np.array(props.get("syllablesEnd", [])),
+            np.array(props.get("rules", ["$s"])))
+    return sets
+
+
+def load(path: str = NAMES_PATH,
+         cache_path: Optional[str] = NAMES_CACHE_PATH) -> Dict[str, NameSet]:
+    """parse path, going through an .npz cache refreshed when path changes"""
+    mtime = os.stat(path).st_mtime_ns
+    if cache_path is not None and os.path.exists(cache_path):
+        with np.load(cache_path) as cache:
+            if int(cache["mtime"]) == mtime:
+                names = [k[:-len("/rules")] for k in cache.files
+                         if k.endswith("/rules")]
+                return {name: NameSet(*(cache[f"{name}/{field}"]
+                                        for field in NameSet._fields))
+                        for name in names}
+
+    logger.debug("parsing {}", path)
+    sets = parse(path)
+    if cache_path is not None:
+        arrays = {f"{name}/{field}": array
+                  for name, name_set in sets.items()
+                  for field, array in zip(NameSet._fields, name_set)}
+        try:
+            with open(cache_path, "wb") as f:
+                np.savez(f, mtime=np.array(mtime), **arrays)
+        except OSError as err:
+            logger.warning("could not write names cache: {}", err)
+    return sets
+
+
+class NameGenerator:
+    """Generate names in bulk, from name sets parsed once.
+
+    Args:
+        sets: Dict[str, NameSet]: the name sets, by name
+    """
+
+    def __init__(self, sets: Dict[str, NameSet]) -> None:
+        self.sets = sets
+
+    def generate(self, set_name: str, n: int, rng: np.random.Generator,
+                 rule: Optional[str] = None) -> List[str]:
+        """generate n names
+
+        Args:
+            set_name: str: the name set to use
+            n: int: the number of names
+            rng: np.random.Generator: the random stream to use
+            rule: str: the rule to follow, a random rule of the set for
+                each name if None
+        """
+        name_set = self.sets[set_name]
+        rules = [rule] if rule is not None else name_set.rules.tolist()
+        rule_ind = rng.integers(len(rules), size=n)
+
+        names = np.empty(n, object)
+        for i, r in enumerate(rules):
+            rows = np.flatnonzero(rule_ind == i)
+            if len(rows):
+                names[rows] = self._apply(name_set, r, len(rows), rng)
+        return names.tolist()
+
+    def generate_one(self, set_name: str, rng: Union[rnd.Random, None] = None,
+                     rule: Optional[str] = None) -> str:
+        """generate a single name with a random.Random stream"""
+        rng = rng or rnd
+        name_set = self.sets[set_name]
+        rule = rule if rule is not None else rng.choice(name_set.rules)
+        syllables = dict(s=name_set.start, e=name_set.end)
+        return "".join(str(syllables[t[1]][rng.randrange(len(syllables[t[1]]))])
+                       if t[0] == "$" else t
+                       for t in self._tokens(rule))
+
+    def _apply(self, name_set: NameSet, rule: str, n: int,
+               rng: np.random.Generator) -> np.ndarray:
+        syllables = dict(s=name_set.start, e=name_set.end)
+        names = np.full(n, "", object)
+        for token in self._tokens(rule):
+            if token[0] == "$":
+                array = syllables[token[1]]
+                names += array[rng.integers(len(array), size=n)].astype(object)
+            else:
+                names += token
+        return names
+
+    @staticmethod
+    def _tokens(rule: str) -> List[str]:
+        return re.findall(r"\$[se]|[^$]+", rule.replace("_", " "))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__} with sets {list(self.sets)}"
+
+
+namegen = NameGenerator(load())
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import logging
+from typing import Sequence, Dict, List, Any, Optional
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+import liberalguardians.common.data as data
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+
+class AliasTable:
+    """An immutable weighted sampler using Walker's alias method.
+
+    Drawing n labels costs two array lookups per label, whatever the number
+    of labels. Each draw consumes a single uniform number in [0, 1).
+
+    Args:
+        labels: Sequence[Any]: what is drawn
+        weights: Sequence[float]: the relative weight of each label
+    """
+    __slots__ = ("labels", "prob", "alias")
+
+    def __init__(self, labels: Sequence[Any], weights: Sequence[float]) -> None:
+        weights = np.asarray(weights, float)
+        if len(labels) != len(weights) or not len(labels):
+            raise ValueError("labels and weights must have the same, "
+                             "non-zero, length")
+        if (weights < 0).any() or not weights.sum() > 0:
+            raise ValueError("weights must be positive, with a positive sum")
+
+        n = len(weights)
+        scaled = weights * n / weights.sum()
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1.]
+        large = [i for i in range(n) if scaled[i] >= 1.]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1. - scaled[s]
+            (small if scaled[l] < 1. else large).append(l)
+
+        prob.setflags(write=False)
+        alias.setflags(write=False)
+        self.labels = tuple(labels)
+        self.prob = prob
+        self.alias = alias
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def resolve(self, uniform: np.ndarray) -> np.ndarray:
+        """turn uniform numbers in [0, 1) into label indices"""
+        scaled = np.asarray(uniform) * len(self.labels)
+        column = np.minimum(scaled.astype(np.intp), len(self.labels) - 1)
+        return np.where(scaled - column < self.prob[column],
+                        column, self.alias[column])
+
+    def draw(self, rng: np.random.Generator,
+             size: Optional[int] = None) -> np.ndarray:
+        """draw size label indices"""
+        return self.resolve(rng.random(size))
+
+    def choices(self, rng: np.random.Generator, size: int) -> List[Any]:
+        """draw size labels"""
+        labels = self.labels
+        return [labels[i] for i in self.draw(rng, size)]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__} of {len(self)} labels"
+
+
+class AliasTableSet:
+    """Several AliasTable over the same labels, stacked to be drawn at once.
+
+    Args:
+        tables: Dict[str, AliasTable]: the tables, by name
+    """
+    __slots__ = ("labels", "names", "index", "prob", "alias")
+
+    def __init__(self, tables: Dict[str, AliasTable]) -> None:
+        self.names = tuple(tables)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.labels = tables[self.names[0]].labels
+        if any(t.labels != self.labels for t in tables.values()):
+            raise ValueError("every table must have the same labels")
+
+        self.prob = np.stack([t.prob for t in tables.values()])
+        self.alias = np.stack([t.alias for t in tables.values()])
+        self.prob.setflags(write=False)
+        self.alias.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, name: str) -> AliasTable:
+        table = AliasTable.__new__(AliasTable)
+        i = self.index[name]
+        table.labels = self.labels
+        table.prob = self.prob[i]
+        table.alias = self.alias[i]
+        return table
+
+    def resolve(self, tables: np.ndarray, uniform: np.ndarray) -> np.ndarray:
+        """turn uniform numbers in [0, 1) into label indices
+
+        Args:
+            tables: np.ndarray: for each number, the index of the table to
+                draw from
+            uniform: np.ndarray: uniform numbers in [0, 1)
+        """
+        scaled = np.asarray(uniform) * len(self.labels)
+        column = np.minimum(scaled.astype(np.intp), len(self.labels) - 1)
+        return np.where(scaled - column < self.prob[tables, column],
+                        column, self.alias[tables, column])
+
+
+#################
+# COMPILED DATA #
+#################
+
+
+professions_list = tuple(data.professions)
+
+
+def encounter_weights(area_name: str) -> np.ndarray:
+    """the weight of meeting each profession of professions_list
+
+    What is not covered by the encounter table of the Area, up to a total
+    weight of 10, is spread evenly among every profession.
+    """
+    encounter = data.areas[area_name]["encounter"]
+    weights = np.array([encounter.get(p, 0) for p in professions_list],
+                       float)
+    any_weight = 10 - weights.sum()
+    if any_weight > 0:
+        weights += any_weight / len(professions_list)
+    return weights
+
+
+logger.debug("alias tables compilation started")
+
+# Area name of a room, by Location template
+area_tables = {template: AliasTable(*zip(*location["areas"].items()))
+               for template, location in data.locations.items()}
+
+# profession index in professions_list, by Area name
+encounter_tables = AliasTableSet({
+    area_name: AliasTable(professions_list, encounter_weights(area_name))
+    for area_name in data.areas})
+
+logger.debug("alias tables compilation done")
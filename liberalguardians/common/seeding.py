@@ -0,0 +1,62 @@
+from __future__ import annotations
+import logging
+import random as rnd
+from typing import Dict, Optional
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# every stream is keyed by its subsystem index in SUBSYSTEMS, never reorder
+SUBSYSTEMS = ("maze", "areas", "characters", "names", "interactions",
+              "policy", "president", "party")
+
+
+class Seeder:
+    """Hand out independent random streams, derived from one campaign seed.
+
+    A stream only depends on the seed, its subsystem and its key, e.g. the
+    Location index. It does not depend on what was drawn before or in
+    which process, so a worker given the same Seeder builds the same
+    Location, bit for bit.
+
+    Args:
+        seed: int: the campaign seed, drawn from the OS entropy if None
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.seed = seed if seed is not None \
+            else np.random.SeedSequence().entropy
+        self._counters: Dict[str, int] = {}
+
+    def sequence(self, subsystem: str, *key: int) -> np.random.SeedSequence:
+        return np.random.SeedSequence(
+            self.seed, spawn_key=(SUBSYSTEMS.index(subsystem), *key))
+
+    def stream(self, subsystem: str, *key: int) -> np.random.Generator:
+        """the NumPy stream of subsystem, for key"""
+        return np.random.default_rng(self.sequence(subsystem, *key))
+
+    def random(self, subsystem: str, *key: int) -> rnd.Random:
+        """same as stream(), for code written against random.Random"""
+        state = self.sequence(subsystem, *key).generate_state(2, np.uint64)
+        return rnd.Random(int(state[0]) << 64 | int(state[1]))
+
+    def next_index(self, subsystem: str) -> int:
+        """0, 1, 2... at each call, to key streams in creation order"""
+        index = self._counters.get(subsystem, 0)
+        self._counters[subsystem] = index + 1
+        return index
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        """the next index of each subsystem, to save and restore"""
+        return dict(self._counters)
+
+    @counters.setter
+    def counters(self, value: Dict[str, int]) -> None:
+        self._counters = dict(value)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.seed})"
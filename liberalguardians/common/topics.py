@@ -13,6 +13,7 @@ PLAYER_LOG_NAME = 'log'
 DESCRIPTION_NAME = 'description.value'
 DEFAULT_DESCRIPTION_NAME = 'description.default'
 TEXT_DESCRIPTION_NAME = 'description.text'
+LOCATION_MOVE_NAME = 'location.move'
 
 topic_manager = pub.getDefaultTopicMgr()
 
@@ -34,4 +35,7 @@ default_description = topic_manager.getOrCreateTopic(
 text_description = topic_manager.getOrCreateTopic(
     TEXT_DESCRIPTION_NAME, _prot_value)
 
+# args: dict(location=Location, result=MoveResult or TravelResult)
+location_move = topic_manager.getOrCreateTopic(LOCATION_MOVE_NAME, _prot_args)
+
 logger.debug('topics creation done')
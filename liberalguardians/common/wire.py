@@ -0,0 +1,127 @@
+"""A flat binary format for arrays and the little state around them.
+
+A message is MAGIC, the byte length of a JSON header, the header, then the
+arrays, each aligned on ALIGNMENT bytes. The header holds the caller's
+metadata, e.g. a string table, and where each array is. Object references
+are never encoded: callers replace them with ids, rows or keys.
+
+Decoding does not copy: the arrays are views of the buffer, writable if
+the buffer is, e.g. a bytearray or a shared memory block.
+"""
+from __future__ import annotations
+import json
+import struct
+from itertools import chain
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+
+MAGIC = b"LGW1"
+ALIGNMENT = 8
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_LENGTH = struct.Struct("<I")
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def pack(meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> bytearray:
+    """encode meta, JSON serializable, and arrays in a message"""
+    specs, offset = {}, 0
+    for name, array in arrays.items():
+        specs[name] = [offset, array.dtype.str, array.shape]
+        offset += _aligned(array.nbytes)
+    header = json.dumps(dict(meta=meta, arrays=specs)).encode()
+    start = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+    message = bytearray(start + offset)
+    message[:len(MAGIC)] = MAGIC
+    _LENGTH.pack_into(message, len(MAGIC), len(header))
+    header_start = len(MAGIC) + _LENGTH.size
+    message[header_start:header_start + len(header)] = header
+    for (array_offset, dtype, shape), array in zip(specs.values(),
+                                                   arrays.values()):
+        np.ndarray(shape, dtype, message, start + array_offset)[...] = array
+    return message
+
+
+def unpack(buffer: Buffer) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """the meta and the arrays of a message, see pack()
+
+    Raises:
+        ValueError: if buffer is not a message
+    """
+    buffer = memoryview(buffer).cast("B")
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a wire message")
+    size, = _LENGTH.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + _LENGTH.size
+    header = json.loads(bytes(buffer[header_start:header_start + size]))
+    start = _aligned(header_start + size)
+    arrays = {name: np.ndarray(shape, dtype, buffer, start + offset)
+              for name, (offset, dtype, shape) in header["arrays"].items()}
+    return header["meta"], arrays
+
+
+def encode_strings(columns: Dict[str, List[str]]
+                   ) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """a table of the distinct strings of columns, and the id of each
+    string of each column in it"""
+    table = list(dict.fromkeys(chain.from_iterable(columns.values())))
+    ids = dict(zip(table, range(len(table))))
+    encoded = {name: np.fromiter(map(ids.__getitem__, column), np.int32,
+                                 len(column))
+               for name, column in columns.items()}
+    return table, encoded
+
+
+def decode_strings(table: List[str], ids: np.ndarray) -> List[str]:
+    """the strings of ids, see encode_strings()"""
+    return list(map(table.__getitem__, ids.tolist()))
+
+
+def main() -> None:
+    """compare pickle and the wire format on a crowd and a Location"""
+    import time
+    import pickle
+    from liberalguardians.common.seeding import Seeder
+    from liberalguardians.characters import Population, generate_characters
+    from liberalguardians.country import Country
+    from liberalguardians.location import Location
+
+    def bench(what: str, encode, decode) -> None:
+        start = time.perf_counter()
+        message = encode()
+        encoded = time.perf_counter()
+        decode(message)
+        decoded = time.perf_counter()
+        print(f"{what:<16}: {len(message) / 2**20:6.2f}MiB, encoded in "
+              f"{(encoded - start) * 1000:4.0f}ms, decoded in "
+              f"{(decoded - encoded) * 1000:4.0f}ms")
+
+    seeder = Seeder(0)
+    crowd = generate_characters(100_000, rng=seeder.stream("characters"),
+                                names_rng=seeder.stream("names"))
+    # the wire format is a bit smaller, pickle is faster: the string lists
+    # dominate and pickle walks them in C
+    bench("crowd, pickled", lambda: pickle.dumps(crowd, 5), pickle.loads)
+    bench("crowd, wire", crowd.to_bytes, Population.from_bytes)
+    crowd[0].followers.append(crowd[1])
+    again = pickle.loads(pickle.dumps(crowd, 5))
+    assert again.names == crowd.names and (again.juice == crowd.juice).all()
+    assert again[0].followers == [again[1]]
+    again = Population.from_bytes(crowd.to_bytes())
+    assert again.names == crowd.names and again[0].followers == [again[1]]
+
+    country = Country("Benchland", seeder=seeder)
+    location = Location(country, "standard", (500, 500))
+    location.explore(publish=False)
+    bench("location, wire", location.to_bytes,
+          lambda m: Location.from_bytes(country, m))
+    again = Location.from_bytes(country, location.to_bytes())
+    assert (again.masks.to_array() == location.masks.to_array()).all()
+
+
+if __name__ == "__main__":
+    main()
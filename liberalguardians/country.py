@@ -1,7 +1,9 @@
 from datetime import date
-from typing import Dict
+from typing import Dict, NamedTuple, Optional
 from enum import IntEnum
 
+from liberalguardians.common.seeding import Seeder
+from liberalguardians.registry import LocationRegistry
 from liberalguardians.characters import Character
 from liberalguardians.common.alignment import Alignment, std_align
 from liberalguardians.common.alignment import colored_alignment_str
@@ -25,15 +27,27 @@ alignment_country_str = {Alignment.ARCHCONSERVATIVE: "fanatically conservative",
                          Alignment.ELITELIBERAL: "embracing liberal ideas"}
 
 
-class Country:
-    def __init__(self, name, mood: int = MOOD_MIN, start: date = None,
-                 speed: int = Speed.NORMAL) -> None:
-        self.name = name
-        self._mood = mood
-        self.start = start or date.today()
-        self.time = self.start
-        self.president = Character(prof_name="president",
-                                   alignment=self.std_alignment)
+class CountrySnapshot(NamedTuple):
+    """A Country as it was at some point, see Country.snapshot()
+
+    Args:
+        version: int: the simulation tick it was taken at
+        name: str: the Country name
+        mood: int: see Country
+        alignment: Alignment: see Country
+        std_alignment: Alignment: see Country
+        time: date: the current date
+        president: str: the full name of the president
+        president_alignment: Alignment: the alignment of the president
+    """
+    version: int
+    name: str
+    mood: int
+    alignment: Alignment
+    std_alignment: Alignment
+    time: date
+    president: str
+    president_alignment: Alignment
 
     @property
     def description(self) -> Dict[str, str]:
@@ -41,13 +55,44 @@ class Country:
         subtitle = self.time.strftime("%B %Y")
         align_str = "The country is {}".format(
             colored_alignment_str(self.std_alignment, alignment_country_str[self.alignment]))
-        president = self.president
         president_str = "The current president is: {}".format(
-            colored_alignment_str(president.alignment, president.fullname))
+            colored_alignment_str(self.president_alignment, self.president))
         text = "{}\n\n{}\n".format(align_str, president_str)
 
         return dict(title=title, subtitle=subtitle, text=text)
 
+
+class Country:
+    def __init__(self, name, mood: int = MOOD_MIN, start: date = None,
+                 speed: int = Speed.NORMAL,
+                 seeder: Optional[Seeder] = None) -> None:
+        self.name = name
+        self._mood = mood
+        self.start = start or date.today()
+        self.time = self.start
+        # the random streams of the campaign
+        self.seeder = seeder or Seeder()
+        self.president = Character(prof_name="president",
+                                   alignment=self.std_alignment,
+                                   rng=self.seeder.random("president"))
+        # every Location of the Country, only the recent ones in memory
+        self.locations = LocationRegistry(self)
+
+    @property
+    def description(self) -> Dict[str, str]:
+        return self.snapshot().description
+
+    def snapshot(self, version: int = 0) -> CountrySnapshot:
+        """the Country as it is now, to read from another thread
+
+        Args:
+            version: int: the simulation tick
+        """
+        president = self.president
+        return CountrySnapshot(version, self.name, self.mood,
+                               self.alignment, self.std_alignment, self.time,
+                               president.fullname, president.alignment)
+
     @property
     def mood(self) -> int:
         return self._mood
@@ -55,7 +100,7 @@ class Country:
     @mood.setter
     def mood(self, value: int) -> None:
         self._mood = value
-        self._mood = sorted([-1000, self._mood, 1000])[0]
+        self._mood = sorted([MOOD_MIN, self._mood, MOOD_MAX])[1]
 
     @property
     def mood_modifier(self) -> Dict[str, int]:
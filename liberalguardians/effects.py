@@ -0,0 +1,187 @@
+from __future__ import annotations
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+import liberalguardians.common.data as data
+import liberalguardians.common.topics as topics
+from liberalguardians.characters import Population
+
+if TYPE_CHECKING:
+    from liberalguardians.country import Country
+    from liberalguardians.location import Location
+    from liberalguardians.interactions import Attempt
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# effect ids, see data/events.json, plus the offences of data/offences.json
+EFFECTS = tuple(data.events) + ("offence",)
+MOOD = EFFECTS.index("mood")
+SUSPICION = EFFECTS.index("suspicion")
+JUICE = EFFECTS.index("juice")
+HOSTILE = EFFECTS.index("hostile")
+OFFENCE = EFFECTS.index("offence")
+
+# what a hostile or offence effect is about, by label index
+_labels: List[str] = []
+_label_ids: Dict[str, int] = {}
+
+
+def label_index(label: str) -> int:
+    if label not in _label_ids:
+        _label_ids[label] = len(_labels)
+        _labels.append(label)
+    return _label_ids[label]
+
+
+class PendingEffects(NamedTuple):
+    """Effects not rolled yet, one per row of each array
+
+    Args:
+        effect: np.ndarray: the index in EFFECTS
+        row: np.ndarray: the Population row of the actor
+        chance: np.ndarray: the probability that the effect happens
+        low: np.ndarray: the lowest delta
+        high: np.ndarray: the highest delta, excluded
+        label: np.ndarray: the label_index of hostile and offence effects,
+            -1 for the others
+    """
+    effect: np.ndarray
+    row: np.ndarray
+    chance: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    label: np.ndarray
+
+    @classmethod
+    def concatenate(cls, pending: List[PendingEffects]) -> PendingEffects:
+        return cls(*(np.concatenate(arrays) for arrays in zip(*pending)))
+
+
+class EffectReport(NamedTuple):
+    """What a commit applied
+
+    Args:
+        totals: Dict[str, int]: the total delta, by effect id
+        hostiles: Dict[str, int]: the number of each hostile
+        offences: Dict[str, int]: the number of each offence
+        attempts: Dict[str, int]: the number of actors of each interaction
+    """
+    totals: Dict[str, int]
+    hostiles: Dict[str, int]
+    offences: Dict[str, int]
+    attempts: Dict[str, int]
+
+    @property
+    def short(self) -> str:
+        attempts = ", ".join(f"{k} x{v}" for k, v in self.attempts.items())
+        totals = ", ".join(f"{k} {v:+}" for k, v in self.totals.items()
+                           if k != "offence")
+        return f"{attempts}: {totals or 'nothing happened'}"
+
+
+class EffectPipeline:
+    """Collect the effects of many interactions, then apply them at once.
+
+    collect() only queues the effects. commit() rolls every chance and
+    every delta in one draw, reduces the deltas per target, applies them to
+    the Country, the Location and the Populations and publishes a single
+    log entry.
+
+    Effects with nothing to apply to yet (money, recruit, item...) are only
+    reported.
+
+    Args:
+        country: Country: the target of mood effects
+        location: Location: the target of suspicion effects
+    """
+
+    def __init__(self, country: Optional[Country] = None,
+                 location: Optional[Location] = None) -> None:
+        self.country = country
+        self.location = location
+        self._batches: List[Tuple[Population, PendingEffects]] = []
+        self._attempts: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return sum(len(p.effect) for _, p in self._batches)
+
+    def collect(self, attempt: Attempt) -> None:
+        """queue the effects of an interaction attempt"""
+        self._batches.append((attempt.population, attempt.pending_effects()))
+        name = attempt.interaction.name
+        self._attempts[name] = self._attempts.get(name, 0) + len(attempt.rows)
+
+    def commit(self, rng: Optional[np.random.Generator] = None,
+               publish: bool = True) -> EffectReport:
+        """roll, reduce and apply every collected effect
+
+        Args:
+            rng: np.random.Generator: the random stream to use
+            publish: bool: whether to publish the report to topics.log
+
+        Returns:
+            EffectReport: the applied deltas
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        batches, self._batches = self._batches, []
+        attempts, self._attempts = self._attempts, {}
+        if not batches:
+            return EffectReport({}, {}, {}, attempts)
+
+        pending = PendingEffects.concatenate([p for _, p in batches])
+        happened = rng.random(len(pending.effect)) < pending.chance
+        deltas = np.where(happened, rng.integers(pending.low, pending.high), 0)
+
+        totals = np.bincount(pending.effect, deltas, minlength=len(EFFECTS))
+        totals = {e: int(totals[i]) for i, e in enumerate(EFFECTS)
+                  if i not in (HOSTILE, OFFENCE) and totals[i]}
+        hostiles = self._label_counts(pending, deltas, HOSTILE)
+        offences = self._label_counts(pending, deltas, OFFENCE)
+
+        if self.country is not None and "mood" in totals:
+            self.country.mood += totals["mood"]
+        if self.location is not None and "suspicion" in totals:
+            self.location.suspicion += totals["suspicion"]
+
+        start = 0
+        for population, batch in batches:
+            end = start + len(batch.effect)
+            self._apply_characters(population, batch, deltas[start:end])
+            start = end
+
+        report = EffectReport(totals, hostiles, offences, attempts)
+        logger.debug("effects committed: {}", report)
+        if publish:
+            topics.log.publish(args=dict(short=report.short))
+        return report
+
+    @staticmethod
+    def _label_counts(pending: PendingEffects, deltas: np.ndarray,
+                      effect: int) -> Dict[str, int]:
+        selected = pending.effect == effect
+        counts = np.bincount(pending.label[selected], deltas[selected],
+                             minlength=len(_labels))
+        return {_labels[i]: int(c) for i, c in enumerate(counts) if c}
+
+    @staticmethod
+    def _apply_characters(population: Population, pending: PendingEffects,
+                          deltas: np.ndarray) -> None:
+        juice = (pending.effect == JUICE) & (deltas != 0)
+        if juice.any():
+            per_row = np.bincount(pending.row[juice], deltas[juice],
+                                  minlength=len(population)).astype(int)
+            rows = np.flatnonzero(per_row)
+            population.add_juice(rows, per_row[rows])
+
+        offence = (pending.effect == OFFENCE) & (deltas != 0)
+        if offence.any():
+            all_offences = population.offences
+            for row, label in zip(pending.row[offence].tolist(),
+                                  pending.label[offence].tolist()):
+                offences = all_offences[row]
+                if offences is None:
+                    offences = all_offences[row] = {}
+                name = _labels[label]
+                offences[name] = offences.get(name, 0) + 1
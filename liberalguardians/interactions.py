@@ -0,0 +1,276 @@
+from __future__ import annotations
+import ast
+import logging
+import timeit
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+import liberalguardians.common.data as data
+from liberalguardians.characters import ATTRIBUTES, Population
+from liberalguardians.characters import generate_characters
+from liberalguardians.effects import EFFECTS, OFFENCE, EffectPipeline
+from liberalguardians.effects import PendingEffects, label_index
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# chance_calc symbols, and the Population value they stand for
+SYMBOLS = MappingProxyType(dict(INT="intel", CHA="charisma", HRT="heart",
+                                WIS="wisdom", AGI="agility", STR="strength",
+                                FOL="followers"))
+
+Rows = Union[slice, np.ndarray, None]
+
+
+############
+# FORMULAS #
+############
+
+
+_formula_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+                  ast.Name, ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div,
+                  ast.UAdd, ast.USub)
+
+
+class Formula:
+    """A chance_calc formula, compiled once.
+
+    Only numbers, SYMBOLS, parentheses and + - * / are allowed, so that
+    evaluating a formula from the data files can't do anything else.
+
+    Args:
+        source: str: the formula, e.g. "INT+0.5*CHA+(HRT-WIS)"
+    """
+    __slots__ = ("source", "symbols", "code")
+
+    def __init__(self, source: str) -> None:
+        tree = ast.parse(source, mode="eval")
+        for node in ast.walk(tree):
+            if (not isinstance(node, _formula_nodes)
+                    or isinstance(node, ast.Name) and node.id not in SYMBOLS
+                    or isinstance(node, ast.Constant)
+                    and not isinstance(node.value, (int, float))):
+                raise ValueError(f"invalid formula {source!r}: "
+                                 f"{ast.dump(node)} is not allowed")
+        self.source = source
+        self.symbols = tuple(sorted({n.id for n in ast.walk(tree)
+                                     if isinstance(n, ast.Name)}))
+        self.code = compile(tree, f"<formula {source}>", "eval")
+
+    def __call__(self, values: Mapping[str, np.ndarray]) -> np.ndarray:
+        """evaluate the formula on arrays of values, by symbol"""
+        return eval(self.code, {"__builtins__": {}}, values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.source!r})"
+
+
+def is_formula(source: str) -> bool:
+    try:
+        Formula(source)
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+
+###########
+# EFFECTS #
+###########
+
+
+class Effect(NamedTuple):
+    """An entry of success_results or failure_results.
+
+    mod is either a number, an attribute (the value of the actor),
+    a [lower, upper) range to draw from or, for hostile, what shows up.
+    """
+    id: str
+    mod: Union[int, str, Tuple[int, int]]
+    chance: float
+
+    def bounds(self, values: Mapping[str, np.ndarray]
+               ) -> Tuple[Union[int, np.ndarray], Union[int, np.ndarray]]:
+        """the [low, high) range of the delta, for all or for each actor"""
+        if isinstance(self.mod, tuple):
+            low, high = self.mod
+        elif isinstance(self.mod, str) and self.id != "hostile":
+            low = values[self.mod]
+            high = low + 1
+        else:
+            low, high = (1, 2) if self.id == "hostile" else \
+                (self.mod, self.mod + 1)
+        return low, high
+
+
+class Offence(NamedTuple):
+    id: str
+    success_chance: float
+    failure_chance: float
+
+
+class Attempt(NamedTuple):
+    """An interaction attempted by several actors, effects not rolled yet
+
+    Args:
+        interaction: Interaction: what was attempted
+        population: Population: where the actors are
+        rows: np.ndarray: the Population rows of the actors
+        success: np.ndarray: whether each actor succeeded
+        values: Dict[str, np.ndarray]: the actors values, see
+            Interaction.actor_values
+    """
+    interaction: Interaction
+    population: Population
+    rows: np.ndarray
+    success: np.ndarray
+    values: Dict[str, np.ndarray]
+
+    def pending_effects(self) -> PendingEffects:
+        """every result and offence each actor may get"""
+        interaction, success, n = self.interaction, self.success, len(self.rows)
+        parts = []
+        for results, happened in ((interaction.success_results, success),
+                                  (interaction.failure_results, ~success)):
+            for effect in results:
+                label = label_index(effect.mod) if effect.id == "hostile" \
+                    else -1
+                parts.append((EFFECTS.index(effect.id),
+                              np.where(happened, effect.chance, 0.),
+                              *effect.bounds(self.values), label))
+        for offence in interaction.offences:
+            parts.append((OFFENCE, np.where(success, offence.success_chance,
+                                            offence.failure_chance),
+                          1, 2, label_index(offence.id)))
+
+        size = len(parts) * n
+        pending = PendingEffects(
+            np.empty(size, np.intp), np.tile(self.rows, len(parts)),
+            np.empty(size), np.empty(size, np.int64), np.empty(size, np.int64),
+            np.empty(size, np.intp))
+        columns = (pending.effect, pending.chance, pending.low, pending.high,
+                   pending.label)
+        for i, part in enumerate(parts):
+            for column, values in zip(columns, part):
+                column[i*n:(i+1)*n] = values
+        return pending
+
+
+################
+# INTERACTIONS #
+################
+
+
+class Interaction:
+    """An interaction of data.interactions, compiled to be resolved for many
+    actors at once.
+
+    An actor succeeds with probability score / (2 * success_chance), capped
+    to [0, 1]: a score equal to success_chance gives even odds.
+    Interactions without a formula (recruit, assault, sneak) need a dedicated
+    resolution and have formula set to None.
+
+    Args:
+        name: str: the key in data.interactions
+        interaction: Dict[str, Any]: the data.interactions entry
+    """
+    __slots__ = ("name", "short_desc", "formula", "threshold",
+                 "success_results", "failure_results", "offences")
+
+    def __init__(self, name: str, interaction: Dict[str, Any]) -> None:
+        self.name = name
+        self.short_desc = interaction["short_desc"]
+        calc = interaction["chance_calc"]
+        self.formula = Formula(calc) if is_formula(calc) else None
+        self.threshold = float(interaction["success_chance"]) \
+            if self.formula is not None else None
+        self.success_results = tuple(self._effects(
+            interaction["success_results"]))
+        self.failure_results = tuple(self._effects(
+            interaction["failure_results"]))
+        self.offences = tuple(Offence(**o)
+                              for o in interaction.get("offences") or ())
+
+    @staticmethod
+    def _effects(results: List[Dict[str, Any]]) -> List[Effect]:
+        return [Effect(r["id"],
+                       tuple(r["mod"]) if isinstance(r["mod"], list)
+                       else r["mod"], r["chance"])
+                for r in results if "mod" in r]
+
+    def actor_values(self, population: Population,
+                     rows: Rows = None) -> Dict[str, np.ndarray]:
+        """the values the formula and effects need, by symbol and name"""
+        rows = slice(None) if rows is None else rows
+        juicy = population.juicy_attributes()[rows]
+        values = {a: juicy[:, i] for i, a in enumerate(ATTRIBUTES)}
+        values["followers"] = population.follower_counts()[rows]
+        values.update({s: values[a] for s, a in SYMBOLS.items()})
+        return values
+
+    def success_probability(self, values: Mapping[str, np.ndarray],
+                            n: int) -> np.ndarray:
+        score = np.broadcast_to(self.formula(values), (n,))
+        return np.clip(score / (2 * self.threshold), 0., 1.)
+
+    def attempt(self, population: Population, rows: Rows = None,
+                rng: Optional[np.random.Generator] = None) -> Attempt:
+        """draw the success of every actor at once, see EffectPipeline for
+        what follows
+
+        Args:
+            population: Population: where the actors are
+            rows: Rows: the rows of the actors, every row if None
+            rng: np.random.Generator: the random stream to use
+
+        Returns:
+            Attempt: who succeeded
+        """
+        if self.formula is None:
+            raise ValueError(f"{self.name} has no chance formula")
+        rng = rng if rng is not None else np.random.default_rng()
+        rows = np.arange(len(population))[slice(None) if rows is None
+                                          else rows]
+        n = len(rows)
+        values = self.actor_values(population, rows)
+        success = rng.random(n) < self.success_probability(values, n)
+        return Attempt(self, population, rows, success, values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__} {self.name}: {self.formula}"
+
+
+interactions: Mapping[str, Interaction] = MappingProxyType({
+    k: Interaction(k, v) for k, v in data.interactions.items()})
+
+
+def attempt(name: str, population: Population, rows: Rows = None,
+            rng: Optional[np.random.Generator] = None) -> Attempt:
+    """attempt interactions[name], see Interaction.attempt"""
+    return interactions[name].attempt(population, rows, rng)
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    crowd = generate_characters(10000, rng=rng)
+    pipeline = EffectPipeline()
+    for name, interaction in interactions.items():
+        if interaction.formula is None:
+            continue
+        pipeline.collect(interaction.attempt(crowd, rng=rng))
+        report = pipeline.commit(rng, publish=False)
+        print(f"{name:<14}{report.totals}, {report.hostiles}, "
+              f"{report.offences}")
+
+    def turn():
+        pipeline.collect(attempt("propaganda", crowd, rng=rng))
+        pipeline.collect(attempt("speech", crowd, np.arange(100), rng=rng))
+        return pipeline.commit(rng, publish=False)
+
+    time = timeit.timeit(turn, number=100) / 100
+    print(f"propaganda and speech on {len(crowd)} characters: "
+          f"{time*1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
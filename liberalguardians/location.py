@@ -1,28 +1,231 @@
 from __future__ import annotations
-from typing import Tuple, List
-import random as rnd
+from typing import Callable, Dict, Iterator, Tuple, List, Optional, NamedTuple
+from typing import Any, Union
+import os
+import json
+from collections import deque
+from collections.abc import Mapping
+from itertools import permutations
+from operator import attrgetter
 from math import cos, sin, pi
 import numpy as np
 
 import liberalguardians.common.data as data
+import liberalguardians.common.topics as topics
+import liberalguardians.common.wire as wire
 from liberalguardians.common.grid import Connections, coords_to_connection
 from liberalguardians.common.grid import connection_to_coords, AreaMask
+from liberalguardians.common.sampling import area_tables, encounter_tables
+from liberalguardians.common.seeding import Seeder
+from liberalguardians.common.chunks import ChunkedGrid, FrozenChunks
 from liberalguardians.country import Country
-from liberalguardians.area import Area
+from liberalguardians.area import Area, populate
+from liberalguardians.characters import Population, generate_characters
+from liberalguardians.interactions import Attempt, Rows, interactions
+from liberalguardians.effects import EffectPipeline, EffectReport
+
+# chunks of each grid of a Location kept in memory, the others are spilled
+HOT_CHUNKS = 256
+
+# see Location.save(), the grids are saved in a directory each, by
+# Location attribute
+LOCATION_FILE = "location.json"
+_SAVED_GRIDS = dict(connections="connections_grid", masks="masks",
+                    area_names="areas.names", area_seeds="areas.seeds")
+
+# (dx, dy) of the rooms behind each connections mask, in Connections order
+_ADJACENT_OFFSETS = tuple(
+    tuple((int(cos(i*pi/2)), int(sin(i*pi/2))) for i in range(4) if 2**i & m)
+    for m in range(16))
 
 
 def get_adjacent_areas(position: Tuple[int, int],
                        room_connection_mask: int) -> List[Tuple[int, int]]:
     x, y = position
-    rooms_pos = []
-    for i in range(4):
-        if 2**i & room_connection_mask:
-            con = (x+int(cos(i*pi/2)), y+int(sin(i*pi/2)))
-            rooms_pos.append(con)
-    return rooms_pos
+    return [(x+dx, y+dy)
+            for dx, dy in _ADJACENT_OFFSETS[int(room_connection_mask) & 15]]
+
+
+###################
+# MAZE GENERATION #
+###################
+
+# Every table below is padded to the same length so that a single random
+# integer in [0, _DOOR_TABLE_LEN) picks a uniform entry, whatever the mask.
+# lcm of the order table lengths, 1/2/6/24, and of the choice table ones,
+# 24/72/168/360
+_DOOR_TABLE_LEN = 2520
+_RANDOM_CHUNK = 2**16
+
+
+def _connection_bits(mask: int) -> Tuple[int, ...]:
+    return tuple(int(c) for c in (Connections.EAST, Connections.SOUTH,
+                                  Connections.WEST, Connections.NORTH)
+                 if c & mask)
+
+
+def _door_orders(mask: int) -> List[Tuple[int, ...]]:
+    """every visiting order of the connections in mask, uniformly"""
+    orders = list(permutations(_connection_bits(mask)))
+    return orders * (_DOOR_TABLE_LEN // len(orders))
+
+
+def _door_choices(mask: int) -> List[Tuple[int, Tuple[int, ...]]]:
+    """(new_cons, visiting order) for every non-empty subset of mask.
+
+    The subset is uniform, and so is the visiting order given the subset.
+    """
+    if not mask:
+        return []
+    choices = []
+    for sub in range(1, 16):
+        if sub & mask == sub:
+            sub_orders = list(permutations(_connection_bits(sub)))
+            choices += [(sub, o) for o in sub_orders] * (24 // len(sub_orders))
+    return choices * (_DOOR_TABLE_LEN // len(choices))
+
+
+_DOOR_CHOICES = [_door_choices(m) for m in range(16)]
+_DOOR_ORDERS = [_door_orders(m) for m in range(16)]
+_OPPOSITE_CONNECTION = [int(((m << 2) | (m >> 2)) & Connections.ALL)
+                        for m in range(16)]
+
+
+def open_doors(grid: np.ndarray, start: Tuple[int, int], end: Tuple[int, int],
+               rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Carve the doors of grid with a randomized depth-first search.
+
+    The first pass walks from start to end, only going east or toward end,
+    so that a path always exists between them. The search then stops
+    opening new rooms once half of the grid has been visited.
+
+    The search is iterative and works on a flat copy of the grid padded
+    with already visited cells, so that no bound check is needed when
+    looking at the neighbors of a room.
+
+    Args:
+        grid: np.ndarray: the (height, width) grid to fill with Connections
+        start: Tuple[int, int]: the (x, y) room to start from
+        end: Tuple[int, int]: the (x, y) room the first pass must reach
+        rng: np.random.Generator: the random stream to use
+
+    Returns:
+        np.ndarray: grid, filled in place
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    grid_h, grid_w = grid.shape
+    pad_w = grid_w + 2
+    max_room_cnt = int(0.5 * grid_h * grid_w)
+
+    walls = np.ones((grid_h + 2, pad_w), np.uint8)
+    walls[1:-1, 1:-1] = 0
+    visited = bytearray(walls.tobytes())
+    cells = [0] * walls.size
+
+    # a stack item is (index << 4 | connection back to the parent room)
+    offsets = {Connections.EAST: 1, Connections.SOUTH: pad_w,
+               Connections.WEST: -1, Connections.NORTH: -pad_w}
+    steps = [0] * 16
+    for con, offset in offsets.items():
+        steps[con] = (offset << 4) | _OPPOSITE_CONNECTION[con]
+    stack: List[int] = []
+    push, pop = stack.append, stack.pop
+
+    def draw() -> int:
+        return int(rng.integers(_DOOR_TABLE_LEN))
+
+    end_x, end_y = end[0] + 1, end[1] + 1
+    end_ind = end_y * pad_w + end_x
+    ind = (start[1] + 1) * pad_w + start[0] + 1
+    p_con = 0
+    room_cnt = 0
+
+    # first pass, never cut by max_room_cnt so that end is always reached
+    while True:
+        visited[ind] = 1
+        room_cnt += 1
+        if ind == end_ind:
+            cells[ind] = p_con
+            break
+
+        available_cons = 15 ^ (visited[ind + 1] | visited[ind + pad_w] << 1
+                               | visited[ind - 1] << 2
+                               | visited[ind - pad_w] << 3)
+        if not available_cons:
+            cells[ind] = p_con
+            break
+
+        new_cons = _DOOR_CHOICES[available_cons][draw()][0]
+
+        y, x = divmod(ind, pad_w)
+        vertical_cons = Connections.NORTH | Connections.SOUTH
+        if x == end_x:
+            vertical_cons = Connections.NORTH if y > end_y \
+                else Connections.SOUTH
+        avail_mand_cons = available_cons & (Connections.EAST | vertical_cons)
+        con = 0
+        if avail_mand_cons:
+            if not (new_cons & avail_mand_cons):
+                new_cons |= _DOOR_CHOICES[avail_mand_cons][draw()][0]
+            con = _DOOR_ORDERS[new_cons & avail_mand_cons][draw()][0]
+
+        cells[ind] = new_cons | p_con
+        other_cons = new_cons & ~con
+        if other_cons:
+            for c in _DOOR_ORDERS[other_cons][draw()]:
+                push((ind << 4) + steps[c])
+        if not con:
+            break
+        ind += offsets[con]
+        p_con = _OPPOSITE_CONNECTION[con]
+
+    # everything else
+    door_choices = _DOOR_CHOICES
+    random_chunk = min(_RANDOM_CHUNK, walls.size)
+    randoms = rng.integers(_DOOR_TABLE_LEN, size=random_chunk).tolist()
+    r_ind = 0
+    while stack:
+        item = pop()
+        ind = item >> 4
+        if visited[ind]:
+            cells[ind] |= item & 15
+            continue
+        visited[ind] = 1
+        room_cnt += 1
+        if room_cnt >= max_room_cnt:
+            cells[ind] = item & 15
+            continue
+
+        available_cons = 15 ^ (visited[ind + 1] | visited[ind + pad_w] << 1
+                               | visited[ind - 1] << 2
+                               | visited[ind - pad_w] << 3)
+        if not available_cons:
+            cells[ind] = item & 15
+            continue
 
+        if r_ind == random_chunk:
+            randoms = rng.integers(_DOOR_TABLE_LEN,
+                                   size=random_chunk).tolist()
+            r_ind = 0
+        new_cons, order = door_choices[available_cons][randoms[r_ind]]
+        r_ind += 1
 
-def open_doors(grid, start, end) -> List[List[int]]:
+        cells[ind] = new_cons | (item & 15)
+        item = ind << 4
+        for c in order:
+            push(item + steps[c])
+
+    padded = np.array(cells, grid.dtype).reshape(walls.shape)
+    grid[:] = padded[1:-1, 1:-1]
+    return grid
+
+
+def open_doors_recursive(grid, start, end) -> List[List[int]]:
+    """OBSOLETE: recursive version of open_doors(), kept for benchmarking
+
+    It recurses once per room, so with the default recursion limit of 1000
+    it fails on some 50x50 grids and on nearly every grid from 60x60.
+    """
     grid_h, grid_w = grid.shape
     visited = np.zeros(grid.shape, bool)
     room_cnt = 0
@@ -101,45 +304,749 @@ def open_doors(grid, start, end) -> List[List[int]]:
     return grid
 
 
+##########
+# LAYOUT #
+##########
+
+
+class Layout(NamedTuple):
+    """Everything a Location draws when it is created, as plain arrays
+
+    Args:
+        entrance: Tuple[int, int]: the (x, y) entrance room
+        exit: Tuple[int, int]: the (x, y) exit room
+        connections_grid: np.ndarray: the Connections of each room
+        masks: np.ndarray: the AreaMask of each room, before any visit
+        area_names: np.ndarray: the Area name of each room, as an index in
+            the labels of its area_tables, in np.argwhere() order
+        area_seeds: np.ndarray: the seed of each Area, same order
+    """
+    entrance: Tuple[int, int]
+    exit: Tuple[int, int]
+    connections_grid: np.ndarray
+    masks: np.ndarray
+    area_names: np.ndarray
+    area_seeds: np.ndarray
+
+
+def draw_areas(seeder: Seeder, template: str, room_cnt: int,
+               index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """the Area names and seeds of the rooms of a Location, see Layout
+
+    They only depend on the number of rooms, so they are cheap to draw
+    again from a saved maze.
+    """
+    rng = seeder.stream("areas", index)
+    area_names = area_tables[template].draw(rng, room_cnt).astype(np.int16)
+    area_seeds = rng.integers(2**32, size=room_cnt, dtype=np.uint64)
+    return area_names, area_seeds
+
+
+def generate_layout(seeder: Seeder, template: str,
+                    grid_shape: Tuple[int, int], index: int) -> Layout:
+    """draw the maze and the Areas of a Location
+
+    This is the slow part of creating a Location. It only depends on its
+    arguments, so it can run in another process, see
+    liberalguardians.pregen.
+
+    Args:
+        seeder: Seeder: the Country seeder
+        template: str: see data.locations
+        grid_shape: Tuple[int, int]: (height, width) of the grid
+        index: int: the Location index, the key of the streams
+    """
+    rng = seeder.stream("maze", index)
+    grid_height, grid_width = grid_shape
+    entrance = (0, int(rng.integers(grid_height)))
+    exit_ = (grid_width-1, int(rng.integers(grid_height)))
+    conn_grid = np.zeros(grid_shape, np.int8)
+    conn_grid = open_doors(conn_grid, entrance, exit_, rng)
+
+    rooms = np.nonzero(conn_grid)
+    area_names, area_seeds = draw_areas(seeder, template, len(rooms[0]),
+                                        index)
+
+    masks = np.zeros(grid_shape, np.int8)
+    table = area_tables[template]
+    forbidden = np.array([bool(data.areas[n].get("forbidden"))
+                          for n in table.labels])
+    forbidden_rooms = forbidden[area_names]
+    masks[rooms[0][forbidden_rooms], rooms[1][forbidden_rooms]] = \
+        AreaMask.FORBIDDEN
+    masks[entrance[1], entrance[0]] |= AreaMask.ENTRANCE
+    masks[exit_[1], exit_[0]] |= AreaMask.EXIT
+    return Layout(entrance, exit_, conn_grid, masks, area_names, area_seeds)
+
+
+class AreaMap(Mapping):
+    """The Areas of a Location, by (x, y), built when first accessed
+
+    Creating every Area object upfront is what made a large Location slow
+    to set up, while only the rooms around the party are ever looked at.
+
+    Args:
+        location: Location: the owner of the Areas
+        names: ChunkedGrid: the Area name of each room, as an index in the
+            labels of its area_tables, -1 where there is no room
+        seeds: ChunkedGrid: the seed of the Area of each room
+        room_cnt: int: the number of rooms
+    """
+
+    def __init__(self, location: Location, names: ChunkedGrid,
+                 seeds: ChunkedGrid, room_cnt: int) -> None:
+        self.location = location
+        self.labels = area_tables[location.template].labels
+        self.names = names
+        self.seeds = seeds
+        self._len = room_cnt
+        self._areas: Dict[Tuple[int, int], Area] = {}
+
+    @classmethod
+    def from_layout(cls, location: Location, layout: Layout) -> AreaMap:
+        shape = layout.connections_grid.shape
+        rooms = np.nonzero(layout.connections_grid)
+        names = ChunkedGrid(shape, np.int16, fill=-1, max_hot=HOT_CHUNKS)
+        names.scatter(*rooms, layout.area_names)
+        seeds = ChunkedGrid(shape, np.uint64, max_hot=HOT_CHUNKS)
+        seeds.scatter(*rooms, layout.area_seeds)
+        return cls(location, names, seeds, len(layout.area_names))
+
+    def __getitem__(self, key: Tuple[int, int]) -> Area:
+        area = self._areas.get(key)
+        if area is None:
+            try:
+                x, y = key
+                name_ind = self.names[y, x]
+            except (TypeError, ValueError, IndexError):
+                raise KeyError(key) from None
+            if name_ind < 0:
+                raise KeyError(key)
+            area = Area(self.location, (x, y), self.labels[name_ind],
+                        seed=self.seeds[y, x])
+            self._areas[key] = area
+        return area
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return ((x, y) for y, x in self.location.connections_grid.nonzero())
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def created(self) -> int:
+        """the number of Area objects built so far"""
+        return len(self._areas)
+
+    def created_areas(self) -> Iterator[Tuple[Tuple[int, int], Area]]:
+        """the Area objects built so far, by (x, y)"""
+        return iter(list(self._areas.items()))
+
+
+############
+# COMMANDS #
+############
+
+
+# plain int masks, AreaMask arithmetic is slow on the move() path
+_FOG = int(AreaMask.FOG)
+_VISIBLE = int(AreaMask.VISIBLE)
+_VISITED = int(AreaMask.VISITED | AreaMask.VISIBLE)
+_VISITED_ONLY = int(AreaMask.VISITED)
+
+# (connection, dx, dy) of the four doors, walked by the path searches
+_DOORS = tuple((int(c), *connection_to_coords[c])
+               for c in (Connections.EAST, Connections.SOUTH,
+                         Connections.WEST, Connections.NORTH))
+
+
+class MoveResult(NamedTuple):
+    """What Location.move() did
+
+    Args:
+        moved: bool: False if there is no door in that direction
+        start: Tuple[int, int]: the position before the move
+        dest: Tuple[int, int]: the position after the move
+        direction: Connections: the direction asked
+        changed: Tuple[Tuple[int, int], ...]: the positions whose mask changed
+        area_name: str: the Area name at dest
+    """
+    moved: bool
+    start: Tuple[int, int]
+    dest: Tuple[int, int]
+    direction: Connections
+    changed: Tuple[Tuple[int, int], ...]
+    area_name: str
+
+    @property
+    def short(self) -> str:
+        if not self.moved:
+            return "You can't go there"
+        direction = Connections(self.direction).name.capitalize()
+        return "{:<6}: {}".format(direction,
+                                  data.areas[self.area_name]['short_desc'])
+
+
+class TravelResult(NamedTuple):
+    """What Location.travel() and Location.explore() did
+
+    Args:
+        start: Tuple[int, int]: the position before the travel
+        moves: Tuple[MoveResult, ...]: every step, empty if there is no
+            known path
+    """
+    start: Tuple[int, int]
+    moves: Tuple[MoveResult, ...]
+
+    @property
+    def moved(self) -> bool:
+        return bool(self.moves)
+
+    @property
+    def dest(self) -> Tuple[int, int]:
+        return self.moves[-1].dest if self.moves else self.start
+
+    @property
+    def changed(self) -> Tuple[Tuple[int, int], ...]:
+        return tuple(dict.fromkeys(p for m in self.moves for p in m.changed))
+
+    @property
+    def short(self) -> str:
+        if not self.moves:
+            return "You can't go there"
+        area_name = self.moves[-1].area_name
+        return "Travel: {} room{} to {}".format(
+            len(self.moves), "s" if len(self.moves) > 1 else "",
+            data.areas[area_name]['short_desc'])
+
+
+class FrozenLocation(NamedTuple):
+    """A Location to write to a directory, see Location.freeze()
+
+    Args:
+        meta: Dict[str, Any]: the state that is not in the grids
+        grids: Dict[str, FrozenChunks]: the grids, by directory name
+    """
+    meta: Dict[str, Any]
+    grids: Dict[str, FrozenChunks]
+
+    def write(self, directory: str) -> int:
+        """write the Location to directory, to be called from any thread
+
+        Returns:
+            int: the number of chunk files written
+        """
+        os.makedirs(directory, exist_ok=True)
+        written = sum(grid.write(os.path.join(directory, name))
+                      for name, grid in self.grids.items())
+        path = os.path.join(directory, LOCATION_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.meta, f)
+        os.replace(path + ".tmp", path)
+        return written
+
+
+class LocationSnapshot(NamedTuple):
+    """A Location as it was at some point, see Location.snapshot()
+
+    Read it from a single thread, e.g. to render the Location while it
+    keeps changing on another one.
+
+    Args:
+        version: int: the simulation tick it was taken at
+        index: int: the Location index
+        template: str: the Location template
+        suspicion: int: see Location
+        room_cnt: int: the number of rooms
+        entrance: Tuple[int, int]: the (x, y) of the entrance
+        exit: Tuple[int, int]: the (x, y) of the exit
+        player_position: Tuple[int, int]: the (x, y) of the party
+        connections: ChunkedGrid: read-only Location.connections_grid
+        masks: ChunkedGrid: read-only Location.masks
+        area_names: ChunkedGrid: read-only AreaMap.names
+        crowds: Dict[Tuple[int, int], np.ndarray]: the crowd of the Areas
+            populated so far, by (x, y)
+    """
+    version: int
+    index: int
+    template: str
+    suspicion: int
+    room_cnt: int
+    entrance: Tuple[int, int]
+    exit: Tuple[int, int]
+    player_position: Tuple[int, int]
+    connections: ChunkedGrid
+    masks: ChunkedGrid
+    area_names: ChunkedGrid
+    crowds: Dict[Tuple[int, int], np.ndarray]
+
+    def area_name(self, position: Tuple[int, int]) -> str:
+        x, y = position
+        return area_tables[self.template].labels[self.area_names[y, x]]
+
+    def professions(self, position: Tuple[int, int]
+                    ) -> Optional[Dict[str, int]]:
+        """see Area.professions, None if the Area is not populated yet"""
+        crowd = self.crowds.get(position)
+        if crowd is None:
+            return None
+        labels = encounter_tables.labels
+        return {labels[i]: int(crowd[i])
+                for i in np.flatnonzero(crowd)}
+
+
+class InteractResult(NamedTuple):
+    """What Location.interact() did
+
+    Args:
+        attempt: Attempt: who succeeded
+        report: EffectReport: the applied effects, None if not committed
+    """
+    attempt: Attempt
+    report: Optional[EffectReport]
+
+
 class Location:
-    def __init__(self, country: Country, template: str, grid_shape: Tuple[int, int]):
+    """A dungeon of Areas.
+
+    Everything is drawn from the maze and areas streams of the Country
+    seeder for index, so the same seed and index give the same Location.
+
+    Args:
+        country: Country: where the Location is
+        template: str: see data.locations
+        grid_shape: Tuple[int, int]: (height, width) of the grid
+        index: int: the key of the streams, the next Location index of the
+            seeder if None
+    """
+
+    def __init__(self, country: Country, template: str,
+                 grid_shape: Tuple[int, int], index: Optional[int] = None):
+        seeder = country.seeder
+        index = index if index is not None else seeder.next_index("maze")
+        layout = generate_layout(seeder, template, grid_shape, index)
+        self._setup(country, template, index, layout.entrance, layout.exit,
+                    ChunkedGrid.from_array(layout.connections_grid,
+                                           max_hot=HOT_CHUNKS),
+                    ChunkedGrid.from_array(layout.masks, max_hot=HOT_CHUNKS))
+        # Areas are created on demand, and so is their crowd
+        self.areas = AreaMap.from_layout(self, layout)
+        self._reveal(self.player_position)
+        self.queue_prefetch(self.player_position)
+        country.locations.add(self)
+
+    def _setup(self, country: Country, template: str, index: int,
+               entrance: Tuple[int, int], exit_: Tuple[int, int],
+               connections_grid: ChunkedGrid, masks: ChunkedGrid) -> None:
         self.template = template
         self.suspicion = 0
         self.country = country
+        self.index = index
+        self.entrance = entrance
+        self.exit = exit_
+        self.player_position = entrance
+        self.connections_grid = connections_grid
+        self.masks = masks
+
+        # bounded, the oldest positions are dropped if prefetch() lags
+        self.prefetch_queue = deque(maxlen=256)
+        self._prefetch_center: Optional[Tuple[int, int]] = None
+
+        # results of interactions, applied to the Country and the Location
+        self.effects = EffectPipeline(country, self)
+        self.rng = country.seeder.stream("interactions", index)
+
+    ##########
+    # SAVING #
+    ##########
+
+    def _meta(self) -> Dict[str, Any]:
+        """the state that is not in the grids, JSON serializable
+
+        Raises:
+            ValueError: if interaction effects are waiting to be committed
+        """
+        if len(self.effects):
+            raise ValueError(f"{self} has effects left to commit")
+        populated = [[*pos, area.mood_mod]
+                     for pos, area in self.areas.created_areas()
+                     if area.is_populated]
+        return dict(template=self.template, index=self.index,
+                    suspicion=self.suspicion, room_cnt=len(self.areas),
+                    entrance=self.entrance, exit=self.exit,
+                    player_position=self.player_position,
+                    rng=self.rng.bit_generator.state, populated=populated)
+
+    @classmethod
+    def _restore(cls, country: Country, meta: Dict[str, Any],
+                 grids: Dict[str, ChunkedGrid]) -> Location:
+        """the Location of _meta() and its grids, by _SAVED_GRIDS name"""
+        location = cls.__new__(cls)
+        location._setup(country, meta["template"], meta["index"],
+                        tuple(meta["entrance"]), tuple(meta["exit"]),
+                        grids["connections"], grids["masks"])
+        location.areas = AreaMap(location, grids["area_names"],
+                                 grids["area_seeds"], meta["room_cnt"])
+        location.suspicion = meta["suspicion"]
+        location.player_position = tuple(meta["player_position"])
+        location.queue_prefetch(location.player_position)
+        location.rng.bit_generator.state = meta["rng"]
+
+        areas = [location.areas[x, y] for x, y, _ in meta["populated"]]
+        populate(areas)
+        for area, (_, _, mood_mod) in zip(areas, meta["populated"]):
+            area.mood_mod = {k: tuple(v) for k, v in mood_mod.items()}
+        country.locations.add(location)
+        return location
+
+    def freeze(self, directory: str) -> FrozenLocation:
+        """what to write to directory to save the Location there, see
+        ChunkedGrid.freeze()
+
+        Raises:
+            ValueError: if interaction effects are waiting to be committed
+        """
+        grids = {name: attrgetter(attr)(self).freeze(
+                     os.path.join(directory, name))
+                 for name, attr in _SAVED_GRIDS.items()}
+        return FrozenLocation(self._meta(), grids)
+
+    def save(self, directory: str) -> int:
+        """save the Location to directory, only what changed since it was
+        last saved there
+
+        Returns:
+            int: the number of chunk files written
+        """
+        return self.freeze(directory).write(directory)
+
+    @classmethod
+    def load(cls, country: Country, directory: str) -> Location:
+        """the Location saved to directory, in country
+
+        The grids are memory-mapped chunk by chunk, when first needed.
+        """
+        with open(os.path.join(directory, LOCATION_FILE)) as f:
+            meta = json.load(f)
+        grids = {name: ChunkedGrid.open(os.path.join(directory, name),
+                                        HOT_CHUNKS)
+                 for name in _SAVED_GRIDS}
+        return cls._restore(country, meta, grids)
+
+    def to_bytes(self) -> bytearray:
+        """the Location encoded with common.wire, without its Country
+
+        Raises:
+            ValueError: if interaction effects are waiting to be committed
+        """
+        meta = self._meta()
+        meta["country"] = self.country.name
+        meta["grids"], arrays = {}, {}
+        for name, attr in _SAVED_GRIDS.items():
+            grid_meta, grid_arrays = attrgetter(attr)(self).to_wire()
+            meta["grids"][name] = grid_meta
+            arrays.update({f"{name}.{k}": v for k, v in grid_arrays.items()})
+        return wire.pack(meta, arrays)
+
+    @classmethod
+    def from_bytes(cls, country: Country, buffer: wire.Buffer) -> Location:
+        """the Location of to_bytes(), in country
+
+        The chunks are views of buffer until they are written to: keep
+        buffer unchanged as long as the Location is used.
+        """
+        meta, arrays = wire.unpack(buffer)
+        if meta["country"] != country.name:
+            raise ValueError(f"{meta['country']} Location given to "
+                             f"{country.name}")
+        grids = {name: ChunkedGrid.from_wire(
+                     grid_meta, {k: arrays[f"{name}.{k}"]
+                                 for k in ("keys", "chunks")}, HOT_CHUNKS)
+                 for name, grid_meta in meta["grids"].items()}
+        return cls._restore(country, meta, grids)
+
+    #############
+    # SNAPSHOTS #
+    #############
+
+    def snapshot(self, version: int = 0) -> LocationSnapshot:
+        """the Location as it is now, cheap to take at every tick
+
+        The grids are shared until the Location writes to them again.
+
+        Args:
+            version: int: the simulation tick
+        """
+        return LocationSnapshot(
+            version, self.index, self.template, self.suspicion,
+            len(self.areas), self.entrance, self.exit, self.player_position,
+            self.connections_grid.snapshot(), self.masks.snapshot(),
+            self.areas.names.snapshot(),
+            {pos: area.crowd for pos, area in self.areas.created_areas()
+             if area.is_populated})
+
+    def __repr__(self) -> str:
+        return (f"{data.locations[self.template]['short_desc'].title()} "
+                f"#{self.index}")
+
+    def _reveal(self, position: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """mark position visited and the rooms around visible
+
+        Returns:
+            List[Tuple[int, int]]: the positions whose mask changed
+        """
+        x, y = position
+        masks = self.masks
+        masks[y, x] = (masks[y, x] | _VISITED) & ~_FOG
+        adjacent = get_adjacent_areas(position, self.connections_grid[y, x])
+        for x, y in adjacent:
+            masks[y, x] = (masks[y, x] | _VISIBLE) & ~_FOG
+        return [position, *adjacent]
+
+    def _fog(self, position: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """cover position and the rooms around with fog"""
+        x, y = position
+        adjacent = get_adjacent_areas(position, self.connections_grid[y, x])
+        masks = self.masks
+        for x, y in [position, *adjacent]:
+            masks[y, x] = masks[y, x] | _FOG
+        return [position, *adjacent]
+
+    def move(self, direction: Connections, publish: bool = True) -> MoveResult:
+        """move the party through the door in direction, if any
+
+        Args:
+            direction: Connections: EAST, SOUTH, WEST or NORTH
+            publish: bool: whether to publish the result to
+                topics.location_move and topics.log
+
+        Returns:
+            MoveResult: the move and the positions it changed
+        """
+        start = self.player_position
+        x, y = start
+        if not self.connections_grid[y, x] & int(direction):
+            result = MoveResult(False, start, start, direction, (),
+                                self.areas[start].area_name)
+        else:
+            dx, dy = connection_to_coords[direction]
+            dest = (x+dx, y+dy)
+            changed = dict.fromkeys(self._fog(start) + self._reveal(dest))
+            self.player_position = dest
+            self.queue_prefetch(dest)
+            result = MoveResult(True, start, dest, direction, tuple(changed),
+                                self.areas[dest].area_name)
+
+        if publish:
+            self.publish(result)
+        return result
+
+    def publish(self, result: Union[MoveResult, TravelResult]) -> None:
+        """publish what a command did to topics.location_move and
+        topics.log, e.g. once a command run with publish=False is visible
+        in a snapshot"""
+        topics.location_move.publish(args=dict(location=self, result=result))
+        topics.log.publish(args=dict(short=result.short))
+
+    def _search(self, is_goal: Callable[[int, Tuple[int, int]], bool]
+                ) -> Optional[List[Connections]]:
+        """breadth-first search through the known rooms
+
+        Args:
+            is_goal: Callable[[int, Tuple[int, int]], bool]: tells from the
+                mask and the position of a room if the search is over
+
+        Returns:
+            Optional[List[Connections]]: the directions of the shortest
+                path to the nearest goal, None if no goal can be reached
+        """
+        start = self.player_position
+        masks = self.masks
+        connections = self.connections_grid
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            position = queue.popleft()
+            x, y = position
+            if position != start and is_goal(masks[y, x], position):
+                path = []
+                while parents[position] is not None:
+                    position, con = parents[position]
+                    path.append(Connections(con))
+                return path[::-1]
+            room_connections = connections[y, x]
+            for con, dx, dy in _DOORS:
+                nxt = (x+dx, y+dy)
+                if room_connections & con and nxt not in parents \
+                        and masks[y+dy, x+dx] & _VISIBLE:
+                    parents[nxt] = (position, con)
+                    queue.append(nxt)
+        return None
+
+    def path_to(self, dest: Tuple[int, int]) -> Optional[List[Connections]]:
+        """the shortest path to dest, only through rooms already seen
+
+        Returns:
+            Optional[List[Connections]]: the directions to follow, None if
+                dest can't be reached
+        """
+        if dest == self.player_position:
+            return []
+        return self._search(lambda mask, position: position == dest)
+
+    def _follow(self, path: Optional[List[Connections]],
+                publish: bool) -> TravelResult:
+        start = self.player_position
+        moves = tuple(self.move(d, publish=False) for d in path or ())
+        result = TravelResult(start, moves)
+        if publish:
+            self.publish(result)
+        return result
+
+    def travel(self, dest: Tuple[int, int],
+               publish: bool = True) -> TravelResult:
+        """move the party to dest, a room already seen, by the shortest path
+
+        Every step updates the masks, but the travel is published once, as
+        a single move.
+
+        Args:
+            dest: Tuple[int, int]: the (x, y) room to go to
+            publish: bool: whether to publish the result to
+                topics.location_move and topics.log
+
+        Returns:
+            TravelResult: every step, and the positions they changed
+        """
+        return self._follow(self.path_to(dest), publish)
+
+    def explore(self, publish: bool = True) -> TravelResult:
+        """travel to the nearest room seen but never visited, see travel()"""
+        path = self._search(lambda mask, position: not mask & _VISITED_ONLY)
+        return self._follow(path, publish)
+
+    def available_interactions(self) -> List[str]:
+        """the interactions available where the party is"""
+        area_name = self.areas[self.player_position].area_name
+        return data.areas[area_name]["interactions"]
+
+    def interact(self, name: str, party: Population, rows: Rows = None,
+                 commit: bool = True, publish: bool = True) -> InteractResult:
+        """have the party attempt an interaction of the current Area
+
+        Args:
+            name: str: see available_interactions()
+            party: Population: the actors
+            rows: Rows: the rows of party taking part, every row if None
+            commit: bool: whether to apply the effects now, otherwise they
+                wait in self.effects for the next commit
+            publish: bool: whether to publish the effects to topics.log
+
+        Returns:
+            InteractResult: the attempt and the applied effects
+        """
+        if name not in self.available_interactions():
+            raise ValueError(f"{name} is not available in "
+                             f"{self.areas[self.player_position]}")
+        attempt = interactions[name].attempt(party, rows, self.rng)
+        self.effects.collect(attempt)
+        report = self.effects.commit(self.rng, publish) if commit else None
+        return InteractResult(attempt, report)
+
+    def queue_prefetch(self, position: Tuple[int, int]) -> None:
+        """queue the Areas that will soon be needed around position
+
+        That is the Area at position, its adjacent Areas, then the Areas
+        that will become visible once the party moves to one of them. Only
+        the last position matters, it is expanded by the next prefetch().
+        """
+        self._prefetch_center = position
+
+    def _expand_prefetch_center(self) -> None:
+        position, self._prefetch_center = self._prefetch_center, None
+        x, y = position
+        adjacent = get_adjacent_areas(position, self.connections_grid[y, x])
+        next_ring = []
+        for x, y in adjacent:
+            next_ring += get_adjacent_areas((x, y), self.connections_grid[y, x])
+        self.prefetch_queue.extendleft(reversed([position, *adjacent,
+                                                 *next_ring]))
+
+    def prefetch(self, max_cnt: int = 1) -> int:
+        """populate at most max_cnt queued Areas, to be called in idle time
+
+        Returns:
+            int: the number of Areas populated
+        """
+        if self._prefetch_center is not None:
+            self._expand_prefetch_center()
+        areas = []
+        while self.prefetch_queue and len(areas) < max_cnt:
+            area = self.areas[self.prefetch_queue.popleft()]
+            if not area.is_populated and area not in areas:
+                areas.append(area)
+        populate(areas)
+        return len(areas)
+
+
+def main() -> None:
+    """benchmark open_doors() against open_doors_recursive(), then the
+    command API"""
+    import timeit
+
+    def bench(fun, shape: Tuple[int, int], number: int) -> str:
+        grid_h, grid_w = shape
+        start, end = (0, grid_h // 2), (grid_w - 1, grid_h // 2)
+        try:
+            t = timeit.timeit(lambda: fun(np.zeros(shape, np.int8), start, end),
+                              number=number)
+        except RecursionError:
+            return "RecursionError"
+        return f"{t / number * 1000:.2f}ms"
+
+    print(f"{'grid':>12}{'recursive':>16}{'iterative':>16}")
+    for shape, number in [((10, 10), 100), ((30, 30), 20), ((45, 45), 10),
+                          ((100, 100), 10), ((1000, 1000), 1)]:
+        recursive = bench(open_doors_recursive, shape, number) \
+            if shape[0] * shape[1] < 10**4 else "-"
+        iterative = bench(open_doors, shape, number)
+        print(f"{str(shape):>12}{recursive:>16}{iterative:>16}")
+
+    location = Location(Country("Benchland"), "standard", (100, 100))
+    directions = list(Connections)[:4]
+    rng = np.random.default_rng(0)
+    moves = [directions[i] for i in rng.integers(4, size=100000)]
+    t = timeit.timeit(lambda: [location.move(d, publish=False)
+                               for d in moves], number=1)
+    print(f"{len(moves) / t:,.0f} moves/s")
+
+    explored = Location(Country("Benchland"), "standard", (30, 30))
+    start = timeit.default_timer()
+    travels = rooms = 0
+    while True:
+        result = explored.explore(publish=False)
+        if not result.moved:
+            break
+        travels += 1
+        rooms += len(result.moves)
+    t = timeit.default_timer() - start
+    print(f"explored in {t * 1000:.0f}ms: {travels} travels, {rooms} moves")
+
+    party = generate_characters(4, rng=rng)
+    location.player_position = next(
+        position for position, area in location.areas.items()
+        if "propaganda" in data.areas[area.area_name]["interactions"])
+    t = timeit.timeit(lambda: [location.interact(
+        "propaganda", party, publish=False)
+        for _ in range(1000)], number=1)
+    print(f"{1000 / t:,.0f} interactions/s")
+
+    city = Location(Country("Benchland"), "standard", (2000, 2000))
+    for _ in range(200):
+        city.explore(publish=False)
+    print(f"{len(city.areas):,} rooms: {city.areas.created} Areas built, "
+          f"masks {city.masks}")
+
 
-        # init grid
-        grid_height, grid_width = grid_shape
-        self.entrance = (0, rnd.randrange(0, grid_height))
-        self.exit = (grid_width-1, rnd.randrange(0, grid_height))
-        self.player_position = self.entrance
-        conn_grid = np.zeros(grid_shape, np.int8)
-        conn_grid = open_doors(conn_grid, self.entrance, self.exit)
-        self.connections_grid = conn_grid
-
-        # init areas masks
-        self.masks = np.zeros(grid_shape, np.int8)
-        ex, ey = self.entrance
-        self.masks[ey, ex] |= AreaMask.ENTRANCE
-        ex, ey = self.exit
-        self.masks[ey, ex] |= AreaMask.EXIT
-
-        x, y = self.player_position
-        self.masks[y, x] |= (AreaMask.VISITED | AreaMask.VISIBLE)
-        self.masks[y, x] &= ~AreaMask.FOG
-        conn_positions = get_adjacent_areas((x, y), self.connections_grid[y, x])
-        for x, y in conn_positions:
-            self.masks[y, x] |= AreaMask.VISIBLE
-            self.masks[y, x] &= ~AreaMask.FOG
-
-        # Create Areas here
-        self.areas = {}
-        available_areas = data.locations[self.template]["areas"]
-        for j in range(grid_height):
-            for i in range(grid_width):
-                if self.connections_grid[j, i]:
-                    area_name = rnd.choices(*zip(*available_areas.items()))[0]
-                    area = Area(self, (i, j), area_name)
-                    area.randomize()
-                    self.areas[str((i, j))] = area
-                    if "forbidden" in data.areas[area_name] and data.areas[area_name]["forbidden"]:
-                        self.masks[j, i] |= AreaMask.FORBIDDEN
+if __name__ == "__main__":
+    main()
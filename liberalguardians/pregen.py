@@ -0,0 +1,204 @@
+"""Generate the next Locations in the background, while one is played.
+
+A Location only depends on the Country seed, the template, the grid shape
+and the Location index, see Location. A worker process builds it in a
+stand-in Country and hands it back encoded with common.wire, through a
+shared memory block, so that nothing is pickled but its name. Decoding it
+is then a copy of the block.
+"""
+from __future__ import annotations
+import os
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from liberalguardians.common.logging import StyleAdapter
+from liberalguardians.common.seeding import Seeder
+from liberalguardians.country import Country
+from liberalguardians.location import Location
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+
+class SharedMessage(NamedTuple):
+    """A common.wire message in the shared memory block name
+
+    Args:
+        name: str: the name of the SharedMemory block
+        size: int: the byte length of the message, the block may be larger
+    """
+    name: str
+    size: int
+
+
+def _disown(shm: SharedMemory) -> None:
+    """leave the shared memory block shm to the process that attaches it
+
+    On POSIX, the resource tracker registers a block on its creation and
+    again on every attach, and unregisters it only on unlink(). Disowning
+    the block on creation leaves a single registration, the one of the
+    process that attaches then unlinks it, see load_message().
+    """
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def share_message(message: bytearray) -> SharedMessage:
+    """copy message to a new shared memory block
+
+    The block is left to load_message() or _free_message() to unlink, in
+    the process that calls them.
+    """
+    shm = SharedMemory(create=True, size=max(len(message), 1))
+    try:
+        shm.buf[:len(message)] = message
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    _disown(shm)
+    shm.close()
+    return SharedMessage(shm.name, len(message))
+
+
+def load_message(shared: SharedMessage) -> bytearray:
+    """copy a shared message back and free its shared memory block"""
+    shm = SharedMemory(shared.name)
+    try:
+        with shm.buf[:shared.size] as view:
+            message = bytearray(view)
+    finally:
+        shm.close()
+        shm.unlink()
+    return message
+
+
+def _free_message(shared: SharedMessage) -> None:
+    shm = SharedMemory(shared.name)
+    shm.close()
+    shm.unlink()
+
+
+def _generate(seed: int, country_name: str, template: str,
+              grid_shape: Tuple[int, int], index: int) -> SharedMessage:
+    """run in a worker, see Location.to_bytes()"""
+    country = Country(country_name, seeder=Seeder(seed))
+    location = Location(country, template, grid_shape, index)
+    return share_message(location.to_bytes())
+
+
+class LocationPregenerator:
+    """Generate Locations of a Country in a process pool.
+
+    submit() reserves the next Location index of the Country seeder, so a
+    pregenerated Location is the one Location() would have built at that
+    point, whether it is collected or not.
+
+    Args:
+        country: Country: the Country of the Locations
+        jobs: int: the number of worker processes, keep it low not to slow
+            down the game itself
+    """
+
+    def __init__(self, country: Country, jobs: int = 1) -> None:
+        self.country = country
+        self.jobs = jobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._requests: Dict[int, Future] = {}
+
+    @property
+    def pending(self) -> List[int]:
+        """the indices submitted and not collected yet"""
+        return list(self._requests)
+
+    def submit(self, template: str, grid_shape: Tuple[int, int]) -> int:
+        """start generating a Location in the background
+
+        Returns:
+            int: the Location index, to give to get()
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.jobs)
+        seeder = self.country.seeder
+        index = seeder.next_index("maze")
+        future = self._executor.submit(_generate, seeder.seed,
+                                       self.country.name, template,
+                                       grid_shape, index)
+        self._requests[index] = future
+        logger.debug("location {} submitted: {} {}", index, template,
+                     grid_shape)
+        return index
+
+    def done(self, index: int) -> bool:
+        """whether get(index) will return without waiting"""
+        return self._requests[index].done()
+
+    def get(self, index: int, timeout: Optional[float] = None) -> Location:
+        """the Location submitted as index, waiting for it if need be
+
+        Raises:
+            KeyError: if index was not submitted, or already collected
+            TimeoutError: if it is still not generated after timeout seconds
+        """
+        message = load_message(self._requests[index].result(timeout))
+        del self._requests[index]
+        return Location.from_bytes(self.country, message)
+
+    def discard(self, index: int) -> None:
+        """forget the Location submitted as index, generated or not"""
+        future = self._requests.pop(index)
+        if not future.cancel():
+            future.add_done_callback(_discard_result)
+
+    def shutdown(self) -> None:
+        """discard every pending Location and stop the workers"""
+        for index in self.pending:
+            self.discard(index)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> LocationPregenerator:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+def _discard_result(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        _free_message(future.result())
+
+
+def main() -> None:
+    """time the switch to a large Location, built here or pregenerated"""
+    import time
+    from operator import attrgetter
+
+    grid_shape = (300, 300)
+    country = Country("Benchland", seeder=Seeder(0))
+    start = time.perf_counter()
+    built = Location(country, "standard", grid_shape)
+    print(f"built in place: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    with LocationPregenerator(country) as pregen:
+        index = pregen.submit("standard", grid_shape)
+        while not pregen.done(index):
+            time.sleep(0.01)
+        start = time.perf_counter()
+        location = pregen.get(index)
+        print(f"pregenerated: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    again = Location(Country("Benchland", seeder=Seeder(0)), "standard",
+                     grid_shape, index)
+    for grid in ("connections_grid", "masks", "areas.names"):
+        assert (attrgetter(grid)(again).to_array()
+                == attrgetter(grid)(location).to_array()).all()
+    assert again.rng.bit_generator.state == location.rng.bit_generator.state
+    assert built.index != location.index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import os
+import shutil
+import logging
+import tempfile
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from liberalguardians.common.logging import StyleAdapter
+
+if TYPE_CHECKING:
+    from liberalguardians.country import Country
+    from liberalguardians.location import Location
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# Locations of a Country kept in memory
+HOT_LOCATIONS = 4
+
+
+class LocationRegistry:
+    """Every Location of a Country, by index, with only a few in memory.
+
+    A Location registers itself when it is created. Once more than max_hot
+    Locations are in memory, the least recently used one is saved with
+    Location.save() and dropped. Getting it back loads it, lazily: only
+    what changed since is written when it is evicted again.
+
+    Get Locations through the registry rather than keeping them around:
+    changes made to an evicted Location object are lost. A Location held on
+    purpose, e.g. the one being simulated, must be pinned: pinned Locations
+    are never evicted, even when more than max_hot are in memory.
+
+    Args:
+        country: Country: the owner of the Locations
+        max_hot: int: the number of Locations kept in memory
+        directory: str: where evicted Locations are saved, a temporary
+            directory removed with the registry if None
+    """
+
+    def __init__(self, country: Country, max_hot: int = HOT_LOCATIONS,
+                 directory: Optional[str] = None) -> None:
+        if max_hot < 1:
+            raise ValueError("max_hot must be at least 1")
+        self.country = country
+        self.max_hot = max_hot
+        self._directory = directory
+        self._hot: OrderedDict[int, Location] = OrderedDict()
+        # the class of the evicted Location and the directory it is in
+        self._cold: Dict[int, Tuple[type, str]] = {}
+        # how many times each pinned Location is pinned
+        self._pins: Dict[int, int] = {}
+
+    @property
+    def hot(self) -> List[int]:
+        """the indices of the Locations in memory, least recent first"""
+        return list(self._hot)
+
+    @property
+    def cold(self) -> List[int]:
+        """the indices of the evicted Locations"""
+        return list(self._cold)
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._cold)
+
+    def __iter__(self) -> Iterator[int]:
+        yield from sorted([*self._hot, *self._cold])
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._hot or index in self._cold
+
+    def __getitem__(self, index: int) -> Location:
+        """the Location index, loaded if it was evicted"""
+        location = self._hot.get(index)
+        if location is not None:
+            self._hot.move_to_end(index)
+            return location
+        cls, path = self._cold.pop(index)
+        logger.debug("location {} loaded from {}", index, path)
+        return cls.load(self.country, path)
+
+    def peek(self, index: int) -> Optional[Location]:
+        """the Location index if it is in memory, without loading it nor
+        marking it as used"""
+        return self._hot.get(index)
+
+    def saved_path(self, index: int) -> str:
+        """the directory the evicted Location index is saved in"""
+        return self._cold[index][1]
+
+    def add(self, location: Location) -> None:
+        """register location as the most recently used one"""
+        if location.country is not self.country:
+            raise ValueError(f"{location} is not in {self.country.name}")
+        self._cold.pop(location.index, None)
+        self._hot[location.index] = location
+        self._hot.move_to_end(location.index)
+        self._evict_lru()
+
+    def pin(self, index: int) -> None:
+        """keep the Location index in memory until it is unpinned as many
+        times as it was pinned
+
+        Raises:
+            KeyError: if the Location index is not in memory
+        """
+        if index not in self._hot:
+            raise KeyError(f"location {index} is not in memory")
+        self._pins[index] = self._pins.get(index, 0) + 1
+
+    def unpin(self, index: int) -> None:
+        """undo a pin(), the Location may be evicted once it is unpinned"""
+        count = self._pins.pop(index) - 1
+        if count:
+            self._pins[index] = count
+        else:
+            self._evict_lru()
+
+    def is_pinned(self, index: int) -> bool:
+        return index in self._pins
+
+    def evict(self, index: int) -> None:
+        """save the Location index to disk and drop it from memory
+
+        Raises:
+            ValueError: if the Location is pinned, or can't be saved
+        """
+        if index in self._pins:
+            raise ValueError(f"location {index} is pinned")
+        location = self._hot[index]
+        path = os.path.join(self._eviction_dir(), f"location_{index}")
+        location.save(path)
+        del self._hot[index]
+        self._cold[index] = (type(location), path)
+        logger.debug("location {} evicted to {}", index, path)
+
+    def discard(self, index: int) -> None:
+        """forget the Location index, e.g. a dungeon that can't be
+        revisited"""
+        self._pins.pop(index, None)
+        if self._hot.pop(index, None) is None:
+            path = self._cold.pop(index)[1]
+            # never remove what add_saved() registered
+            if os.path.dirname(path) == self._directory:
+                shutil.rmtree(path)
+
+    def _evict_lru(self) -> None:
+        # neither the most recent Location nor the pinned ones are evicted
+        for index in list(self._hot)[:-1]:
+            if len(self._hot) <= self.max_hot:
+                break
+            if index in self._pins:
+                continue
+            try:
+                self.evict(index)
+            except ValueError as e:
+                logger.warning("location {} kept in memory: {}", index, e)
+
+    def add_saved(self, cls: type, index: int, directory: str) -> None:
+        """register the Location saved in directory, not loaded until
+        needed"""
+        self._cold[index] = (cls, directory)
+
+    def _eviction_dir(self) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="lg-locations-")
+            weakref.finalize(self, shutil.rmtree, self._directory, True)
+        return self._directory
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}({len(self._hot)} hot, "
+                f"{len(self._cold)} cold)")
@@ -0,0 +1,496 @@
+"""Save and load a game, incrementally, and autosave it in the background.
+
+A save is a directory:
+
+- country.json: the Country, its seeder and the indices of its Locations
+- locations/<index>/: each Location, see Location.save()
+- populations/<name>.npy: the characters of each Population, one record
+  of RECORD_DTYPE per row
+- populations/<name>.json: what does not fit in a record, e.g. wounds
+- strings.json: the names the records refer to, by id
+
+Saving again to the same directory only writes the Location chunks and the
+records that changed. Loading memory-maps the records and only opens the
+Locations, their chunks are read when first needed.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+from liberalguardians.common.seeding import Seeder
+from liberalguardians.characters import ATTRIBUTES, EXTRA_FIELDS, Population
+from liberalguardians.characters import encode_extras, decode_extras
+from liberalguardians.country import Country
+from liberalguardians.location import FrozenLocation, Location
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+COUNTRY_FILE = "country.json"
+STRINGS_FILE = "strings.json"
+LOCATIONS_DIR = "locations"
+POPULATIONS_DIR = "populations"
+# the Population the Country president is saved in
+PRESIDENT = "president"
+# seconds between two autosaves
+AUTOSAVE_INTERVAL = 60.
+# where the game is autosaved, relative to the working directory like data/
+AUTOSAVE_DIR = "saves/autosave"
+
+RECORD_DTYPE = np.dtype([("attributes", np.int16, (len(ATTRIBUTES),)),
+                         ("juice", np.int32), ("age", np.int16),
+                         ("sex", np.int8), ("profession", np.int16),
+                         ("name", np.int32), ("surname", np.int32),
+                         ("nickname", np.int32), ("img", np.int32)])
+# record fields holding an id in the string table, and their Population list
+_STRING_FIELDS = dict(name="names", surname="surnames", nickname="nicknames",
+                      img="imgs")
+
+
+def _write_json(path: str, value: Any) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(value, f)
+    os.replace(path + ".tmp", path)
+
+
+################
+# STRING TABLE #
+################
+
+
+class StringTable:
+    """Strings by id, only ever appended to so that ids stay valid
+
+    Args:
+        strings: List[str]: the strings, by id
+    """
+
+    def __init__(self, strings: List[str] = ()) -> None:
+        self.strings = [sys.intern(s) for s in strings]
+        self._ids = {s: i for i, s in enumerate(self.strings)}
+        self._saved = len(self.strings)
+
+    @classmethod
+    def load(cls, path: str) -> StringTable:
+        """the table saved to path, empty if there is none"""
+        try:
+            with open(path) as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def ids(self, strings: List[str]) -> np.ndarray:
+        """the id of each of strings, added to the table if need be"""
+        ids = self._ids
+        out = np.empty(len(strings), np.int32)
+        for i, s in enumerate(strings):
+            index = ids.get(s)
+            if index is None:
+                index = ids[s] = len(self.strings)
+                self.strings.append(s)
+            out[i] = index
+        return out
+
+    def lookup(self, ids: np.ndarray) -> List[str]:
+        strings = self.strings
+        return [strings[i] for i in ids.tolist()]
+
+    def save(self, path: str) -> None:
+        """write the table to path if strings were added since"""
+        if self._saved != len(self.strings) or not os.path.exists(path):
+            _write_json(path, self.strings)
+            self._saved = len(self.strings)
+
+
+###############
+# POPULATIONS #
+###############
+
+
+class FrozenPopulation(NamedTuple):
+    """A copy of a Population to encode and write, see freeze_population()
+
+    Args:
+        columns: Dict[str, np.ndarray]: the numeric columns, by record field
+        strings: Dict[str, List[str]]: the string columns, by record field
+        extras: Dict[str, List[Any]]: the EXTRA_FIELDS lists
+    """
+    columns: Dict[str, np.ndarray]
+    strings: Dict[str, List[str]]
+    extras: Dict[str, List[Any]]
+
+
+def freeze_population(population: Population) -> FrozenPopulation:
+    """copy what encode_population() needs, so that it can run on another
+    thread while the game goes on"""
+    columns = {k: getattr(population, k).copy()
+               for k in ("attributes", "juice", "age", "sex", "profession")}
+    strings = {k: list(getattr(population, v))
+               for k, v in _STRING_FIELDS.items()}
+    extras = {k: list(getattr(population, k)) for k in EXTRA_FIELDS}
+    return FrozenPopulation(columns, strings, extras)
+
+
+def encode_population(frozen: FrozenPopulation, table: StringTable
+                      ) -> Tuple[np.ndarray, Dict[str, Dict[int, Any]]]:
+    """the records and the extras of a frozen Population
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Dict[int, Any]]]: the RECORD_DTYPE
+            records, and the non-empty extras by field then row
+    """
+    size = len(frozen.columns["juice"])
+    records = np.empty(size, RECORD_DTYPE)
+    for k, v in frozen.columns.items():
+        records[k] = v
+    for k, v in frozen.strings.items():
+        records[k] = table.ids(v)
+    return records, encode_extras(frozen.extras)
+
+
+def write_records(path: str, records: np.ndarray) -> int:
+    """write records to the .npy file path, only the rows that changed if
+    it already holds as many records
+
+    Rewriting the rows in place is not atomic, unlike replacing the file:
+    if interrupted, some rows are old and some new. The string ids of both
+    are valid as long as the StringTable is saved first.
+
+    Returns:
+        int: the number of records written
+    """
+    try:
+        old = np.load(path, mmap_mode="r+")
+    except (FileNotFoundError, ValueError):
+        old = None
+    if old is not None and old.shape == records.shape \
+            and old.dtype == records.dtype:
+        # a Population loaded from path maps it copy-on-write: the rows
+        # that differ are in its private pages, or it was reallocated
+        changed = np.flatnonzero(old != records)
+        old[changed] = records[changed]
+        old.flush()
+        return len(changed)
+    del old
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, records)
+    os.replace(path + ".tmp", path)
+    return len(records)
+
+
+def decode_population(records: np.ndarray, extras: Dict[str, Dict[str, Any]],
+                      table: StringTable) -> Population:
+    """the Population of records, whose columns are views of records"""
+    strings = {v: table.lookup(records[k]) for k, v in _STRING_FIELDS.items()}
+    population = Population.from_columns(
+        records["attributes"], records["juice"], records["age"],
+        records["sex"], records["profession"], **strings)
+    decode_extras(population, extras)
+    return population
+
+
+#############
+# GAME SAVE #
+#############
+
+
+class FrozenGame(NamedTuple):
+    """A game to write, see GameSave.freeze()
+
+    Args:
+        country: Dict[str, Any]: the country.json content
+        locations: Dict[int, Any]: the FrozenLocation of each Location in
+            memory, and the directory each evicted one is saved in
+        populations: Dict[str, FrozenPopulation]: the Populations, by name
+    """
+    country: Dict[str, Any]
+    locations: Dict[int, Any]
+    populations: Dict[str, FrozenPopulation]
+
+
+class GameSave:
+    """A save directory, written to incrementally
+
+    Keep the GameSave around between saves: it remembers the string table
+    and the Locations know what they wrote to it.
+
+    Args:
+        directory: str: the save directory, created if need be
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.strings = StringTable.load(os.path.join(directory, STRINGS_FILE))
+
+    def _location_dir(self, index: int) -> str:
+        return os.path.join(self.directory, LOCATIONS_DIR, str(index))
+
+    def freeze(self, country: Country,
+               populations: Dict[str, Population]) -> FrozenGame:
+        """a copy of the game to write(), cheap enough for the main thread
+
+        Raises:
+            ValueError: if a Location has effects left to commit
+        """
+        registry = country.locations
+        locations = {}
+        for index in registry:
+            location = registry.peek(index)
+            locations[index] = registry.saved_path(index) if location is None \
+                else location.freeze(self._location_dir(index))
+        meta = dict(name=country.name, mood=country.mood,
+                    start=country.start.isoformat(),
+                    time=country.time.isoformat(),
+                    seed=country.seeder.seed,
+                    counters=country.seeder.counters,
+                    populations=[k for k in populations if k != PRESIDENT])
+        populations = {k: freeze_population(v)
+                       for k, v in populations.items()}
+        populations[PRESIDENT] = freeze_population(
+            Population([country.president]))
+        return FrozenGame(meta, locations, populations)
+
+    def write(self, frozen: FrozenGame) -> Dict[str, int]:
+        """write a frozen game, to be called from any thread
+
+        Each file is replaced at once, but for the records updated in
+        place, see write_records(): a write interrupted may leave a save
+        mixing the two games.
+
+        Returns:
+            Dict[str, int]: the number of chunks and records written
+        """
+        written = dict(chunks=0, records=0)
+        for index, location in frozen.locations.items():
+            directory = self._location_dir(index)
+            if isinstance(location, FrozenLocation):
+                written["chunks"] += location.write(directory)
+            else:
+                written["chunks"] += _sync_tree(location, directory)
+        locations_dir = os.path.join(self.directory, LOCATIONS_DIR)
+        os.makedirs(locations_dir, exist_ok=True)
+        for name in os.listdir(locations_dir):
+            if int(name) not in frozen.locations:
+                shutil.rmtree(os.path.join(locations_dir, name))
+
+        encoded = {name: encode_population(population, self.strings)
+                   for name, population in frozen.populations.items()}
+        # the table is only appended to: saved before any record refers to
+        # the new strings, it is still valid for the records on disk
+        self.strings.save(os.path.join(self.directory, STRINGS_FILE))
+        populations_dir = os.path.join(self.directory, POPULATIONS_DIR)
+        os.makedirs(populations_dir, exist_ok=True)
+        for name, (records, extras) in encoded.items():
+            path = os.path.join(populations_dir, name)
+            written["records"] += write_records(path + ".npy", records)
+            _write_json(path + ".json", extras)
+        _write_json(os.path.join(self.directory, COUNTRY_FILE),
+                    frozen.country)
+        return written
+
+    def save(self, country: Country,
+             populations: Dict[str, Population]) -> Dict[str, int]:
+        """freeze() then write() the game"""
+        start = time.perf_counter()
+        written = self.write(self.freeze(country, populations))
+        logger.debug("saved to {} in {:.0f}ms: {}", self.directory,
+                     (time.perf_counter() - start) * 1000, written)
+        return written
+
+    def load(self) -> Tuple[Country, Dict[str, Population]]:
+        """the Country and the Populations saved
+
+        The Locations are only loaded when first got from the registry of
+        the Country.
+        """
+        with open(os.path.join(self.directory, COUNTRY_FILE)) as f:
+            meta = json.load(f)
+        seeder = Seeder(meta["seed"])
+        country = Country(meta["name"], meta["mood"],
+                          date.fromisoformat(meta["start"]), seeder=seeder)
+        country.time = date.fromisoformat(meta["time"])
+        seeder.counters = meta["counters"]
+        populations = {name: self._load_population(name)
+                       for name in [*meta["populations"], PRESIDENT]}
+        country.president = populations.pop(PRESIDENT)[0]
+
+        locations_dir = os.path.join(self.directory, LOCATIONS_DIR)
+        for name in sorted(os.listdir(locations_dir), key=int):
+            country.locations.add_saved(Location, int(name),
+                                        os.path.join(locations_dir, name))
+        return country, populations
+
+    def _load_population(self, name: str) -> Population:
+        path = os.path.join(self.directory, POPULATIONS_DIR, name)
+        # copy-on-write: the game changes the arrays, not the save
+        records = np.load(path + ".npy", mmap_mode="c")
+        with open(path + ".json") as f:
+            extras = json.load(f)
+        return decode_population(records, extras, self.strings)
+
+
+def _sync_tree(source: str, target: str) -> int:
+    """copy the files of source that target does not have, or has with
+    another size or modification time
+
+    Returns:
+        int: the number of files copied
+    """
+    if os.path.abspath(source) == os.path.abspath(target):
+        return 0
+    copied = 0
+    for root, _, files in os.walk(source):
+        directory = os.path.join(target, os.path.relpath(root, source))
+        os.makedirs(directory, exist_ok=True)
+        for name in files:
+            src, dst = os.path.join(root, name), os.path.join(directory, name)
+            stat = os.stat(src)
+            try:
+                dst_stat = os.stat(dst)
+                if (dst_stat.st_size == stat.st_size
+                        and dst_stat.st_mtime >= stat.st_mtime):
+                    continue
+            except FileNotFoundError:
+                pass
+            shutil.copy2(src, dst)
+            copied += 1
+    return copied
+
+
+############
+# AUTOSAVE #
+############
+
+
+class Autosaver:
+    """Save a game every interval seconds, written on a background thread
+
+    The game is frozen on the calling thread, which only copies the
+    Population columns and shares the Location chunks until they are
+    written to again. Encoding and writing is left to the thread.
+
+    Args:
+        game_save: GameSave: where to save
+        interval: float: the seconds between two autosaves
+    """
+
+    def __init__(self, game_save: GameSave,
+                 interval: float = AUTOSAVE_INTERVAL) -> None:
+        self.game_save = game_save
+        self.interval = interval
+        self.last = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def busy(self) -> bool:
+        """whether a save is being written"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def due(self) -> bool:
+        """whether the last save is older than interval"""
+        return time.monotonic() - self.last >= self.interval
+
+    def request(self, country: Country,
+                populations: Dict[str, Population]) -> bool:
+        """start saving the game now, unless a save is being written or the
+        game can't be saved at this point
+
+        Returns:
+            bool: whether a save was started
+        """
+        if self.busy:
+            return False
+        try:
+            frozen = self.game_save.freeze(country, populations)
+        except ValueError as e:
+            logger.debug("autosave postponed: {}", e)
+            return False
+        self.last = time.monotonic()
+        self._thread = threading.Thread(target=self._write, args=(frozen,),
+                                        name="autosave", daemon=True)
+        self._thread.start()
+        return True
+
+    def tick(self, country: Country,
+             populations: Dict[str, Population]) -> bool:
+        """request() a save if one is due"""
+        if not self.due:
+            return False
+        return self.request(country, populations)
+
+    def _write(self, frozen: FrozenGame) -> None:
+        start = time.perf_counter()
+        try:
+            written = self.game_save.write(frozen)
+        except Exception:
+            logger.exception("autosave to {} failed",
+                             self.game_save.directory)
+            return
+        logger.info("autosaved in {:.0f}ms: {}",
+                    (time.perf_counter() - start) * 1000, written)
+
+    def wait(self) -> None:
+        """wait for the save being written, if any"""
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self) -> None:
+        self.wait()
+        self._thread = None
+
+
+def main() -> None:
+    """time a full save, an incremental one, an autosave and a load"""
+    import tempfile
+    from liberalguardians.characters import generate_characters
+
+    seeder = Seeder(0)
+    country = Country("Benchland", mood=-200, seeder=seeder)
+    crowd = generate_characters(100_000, rng=seeder.stream("characters"),
+                                names_rng=seeder.stream("names"))
+    locations = [Location(country, "standard", (300, 300)) for _ in range(6)]
+    for location in locations[-country.locations.max_hot:]:
+        location.explore(publish=False)
+    populations = dict(crowd=crowd)
+
+    with tempfile.TemporaryDirectory() as directory:
+        game_save = GameSave(directory)
+        for what in ("full", "unchanged"):
+            start = time.perf_counter()
+            written = game_save.save(country, populations)
+            print(f"{what} save: {(time.perf_counter() - start) * 1000:.0f}ms"
+                  f", {written}")
+
+        location = country.locations[locations[-1].index]
+        for _ in range(20):
+            location.explore(publish=False)
+        crowd.add_juice(slice(0, 100), 10)
+        autosaver = Autosaver(game_save)
+        start = time.perf_counter()
+        autosaver.request(country, populations)
+        print(f"autosave blocked for "
+              f"{(time.perf_counter() - start) * 1000:.1f}ms")
+        autosaver.close()
+
+        start = time.perf_counter()
+        loaded, loaded_populations = GameSave(directory).load()
+        print(f"load: {(time.perf_counter() - start) * 1000:.0f}ms")
+        loaded_crowd = loaded_populations["crowd"]
+        assert (loaded_crowd.juice == crowd.juice).all()
+        assert loaded_crowd.names == crowd.names
+        again = loaded.locations[location.index]
+        assert (again.masks.to_array() == location.masks.to_array()).all()
+        assert loaded.president.fullname == country.president.fullname
+
+
+if __name__ == "__main__":
+    main()
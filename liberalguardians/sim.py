@@ -0,0 +1,255 @@
+"""Headless Monte Carlo campaigns, to balance the data files.
+
+python -m liberalguardians.sim --campaigns 2000 --out sim/run plays 2000
+seeded campaigns with a scripted policy on every core, then writes the
+per-turn statistics to sim/run.csv and the raw curves to sim/run.npz.
+"""
+from __future__ import annotations
+import os
+import csv
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+from liberalguardians.common.logging import StyleAdapter
+from liberalguardians.common.grid import Connections, connection_to_coords
+from liberalguardians.common.seeding import Seeder
+from liberalguardians.characters import Population, generate_characters
+from liberalguardians.country import Country
+from liberalguardians.location import Location
+from liberalguardians.interactions import Interaction, interactions
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# recorded at the end of every turn, one curve per campaign
+CURVES = ("mood", "suspicion", "juice")
+PERCENTILES = (10, 50, 90)
+
+
+class SimConfig(NamedTuple):
+    """What every campaign of a run plays
+
+    Args:
+        policy: str: a key of POLICIES
+        party_size: int: the number of characters of the party
+        locations: int: the number of Locations visited
+        turns: int: the number of turns spent in each Location
+        grid_shape: Tuple[int, int]: the (height, width) of the Locations
+        template: str: the Location template, see data.locations
+        mood: int: the starting mood of the Country
+    """
+    policy: str = "greedy"
+    party_size: int = 4
+    locations: int = 5
+    turns: int = 30
+    grid_shape: Tuple[int, int] = (10, 10)
+    template: str = "standard"
+    mood: int = -200
+
+
+############
+# POLICIES #
+############
+
+
+Policy = Callable[[Sequence[Interaction], Population, Location,
+                   np.random.Generator], Optional[Interaction]]
+
+
+def random_policy(choices: Sequence[Interaction], party: Population,
+                  location: Location,
+                  rng: np.random.Generator) -> Optional[Interaction]:
+    """any interaction of the area"""
+    return choices[rng.integers(len(choices))] if choices else None
+
+
+def greedy_policy(choices: Sequence[Interaction], party: Population,
+                  location: Location,
+                  rng: np.random.Generator) -> Optional[Interaction]:
+    """the interaction the party is the most likely to succeed"""
+    if not choices:
+        return None
+    values = choices[0].actor_values(party)
+    odds = [i.success_probability(values, len(party)).mean()
+            for i in choices]
+    return choices[int(np.argmax(odds))]
+
+
+def cautious_policy(choices: Sequence[Interaction], party: Population,
+                    location: Location,
+                    rng: np.random.Generator) -> Optional[Interaction]:
+    """greedy, but lay low once suspicion gets high"""
+    if location.suspicion > 100:
+        choices = [i for i in choices if not i.offences]
+    return greedy_policy(choices, party, location, rng)
+
+
+POLICIES: Dict[str, Policy] = dict(random=random_policy, greedy=greedy_policy,
+                                   cautious=cautious_policy)
+
+
+############
+# CAMPAIGN #
+############
+
+
+def _available_interactions(location: Location) -> List[Interaction]:
+    return [interactions[i] for i in location.available_interactions()
+            if interactions[i].formula is not None]
+
+
+def _next_direction(location: Location, visited: set,
+                    rng: np.random.Generator) -> Connections:
+    """the way to an adjacent room, one never visited if possible"""
+    x, y = location.player_position
+    connections = int(location.connections_grid[y, x])
+    doors = {conn: (x + dx, y + dy)
+             for conn, (dx, dy) in connection_to_coords.items()
+             if connections & conn}
+    new = [conn for conn, p in doors.items() if p not in visited]
+    candidates = new or list(doors)
+    return candidates[rng.integers(len(candidates))]
+
+
+def run_campaign(seed: int, config: SimConfig) -> Dict[str, np.ndarray]:
+    """play a campaign, headless
+
+    Args:
+        seed: int: the campaign seed, the same seed plays the same campaign
+        config: SimConfig: what to play
+
+    Returns:
+        Dict[str, np.ndarray]: the curve of each of CURVES, by turn
+    """
+    seeder = Seeder(seed)
+    policy_rng = seeder.stream("policy")
+    policy = POLICIES[config.policy]
+
+    country = Country("Simland", mood=config.mood, seeder=seeder)
+    party = generate_characters(config.party_size,
+                                rng=seeder.stream("party"),
+                                names_rng=seeder.stream("names"))
+    turns = config.locations * config.turns
+    curves = {k: np.empty(turns) for k in CURVES}
+
+    turn = 0
+    for _ in range(config.locations):
+        location = Location(country, config.template, config.grid_shape)
+        visited = {location.player_position}
+        for _ in range(config.turns):
+            choice = policy(_available_interactions(location), party,
+                            location, policy_rng)
+            if choice is not None:
+                location.interact(choice.name, party, publish=False)
+
+            curves["mood"][turn] = country.mood
+            curves["suspicion"][turn] = location.suspicion
+            curves["juice"][turn] = party.juice.mean()
+            turn += 1
+
+            direction = _next_direction(location, visited, policy_rng)
+            visited.add(location.move(direction, publish=False).dest)
+        # campaigns never come back to a Location
+        country.locations.discard(location.index)
+    return curves
+
+
+def run(seeds: Sequence[int], config: SimConfig,
+        jobs: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """play a campaign per seed on a process pool
+
+    Returns:
+        Dict[str, np.ndarray]: the (len(seeds), turns) curves, by name
+    """
+    jobs = jobs or os.cpu_count() or 1
+    play = partial(run_campaign, config=config)
+    if jobs == 1:
+        results = list(map(play, seeds))
+    else:
+        chunksize = max(1, len(seeds) // (jobs * 4))
+        with ProcessPoolExecutor(jobs) as executor:
+            results = list(executor.map(play, seeds, chunksize=chunksize))
+    return {k: np.stack([r[k] for r in results]) for k in CURVES}
+
+
+##########
+# OUTPUT #
+##########
+
+
+def statistics(curves: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """the mean, standard deviation and PERCENTILES of each curve, by turn"""
+    stats = {}
+    for k, v in curves.items():
+        stats[f"{k}_mean"] = v.mean(axis=0)
+        stats[f"{k}_std"] = v.std(axis=0)
+        for p, values in zip(PERCENTILES,
+                             np.percentile(v, PERCENTILES, axis=0)):
+            stats[f"{k}_p{p}"] = values
+    return stats
+
+
+def write(prefix: str, seeds: Sequence[int], config: SimConfig,
+          curves: Dict[str, np.ndarray]) -> None:
+    """write prefix.npz, with the raw curves, and prefix.csv, with the
+    statistics by turn"""
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(f"{prefix}.npz", seeds=np.asarray(seeds),
+                        config=np.array(repr(config)), **curves)
+
+    stats = statistics(curves)
+    with open(f"{prefix}.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["turn", *stats])
+        for turn, row in enumerate(zip(*stats.values())):
+            writer.writerow([turn, *(f"{v:.3f}" for v in row)])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m liberalguardians.sim",
+        description="play seeded campaigns headless and aggregate them")
+    default = SimConfig()
+    parser.add_argument("-n", "--campaigns", type=int, default=1000)
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="the first campaign seed")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes, every core by default")
+    parser.add_argument("-p", "--policy", choices=POLICIES,
+                        default=default.policy)
+    parser.add_argument("--party-size", type=int, default=default.party_size)
+    parser.add_argument("--locations", type=int, default=default.locations)
+    parser.add_argument("--turns", type=int, default=default.turns,
+                        help="turns spent in each location")
+    parser.add_argument("--grid", type=int, nargs=2,
+                        default=default.grid_shape, metavar=("H", "W"))
+    parser.add_argument("--mood", type=int, default=default.mood)
+    parser.add_argument("-o", "--out", default="sim/campaigns",
+                        help="output prefix of the .csv and .npz files")
+    args = parser.parse_args(argv)
+
+    config = SimConfig(args.policy, args.party_size, args.locations,
+                       args.turns, tuple(args.grid), default.template,
+                       args.mood)
+    seeds = list(range(args.seed, args.seed + args.campaigns))
+    start = time.perf_counter()
+    curves = run(seeds, config, args.jobs)
+    elapsed = time.perf_counter() - start
+    write(args.out, seeds, config, curves)
+
+    print(f"{len(seeds)} campaigns in {elapsed:.1f}s, "
+          f"written to {args.out}.csv and {args.out}.npz")
+    for k, v in curves.items():
+        print(f"final {k:<10}: mean {v[:, -1].mean():>9.1f}, "
+              f"p10 {np.percentile(v[:, -1], 10):>9.1f}, "
+              f"p90 {np.percentile(v[:, -1], 90):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
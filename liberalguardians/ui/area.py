@@ -1,5 +1,6 @@
 from __future__ import annotations
 from math import cos, sin, pi
+from typing import Tuple
 import tcod
 
 from tcodplus.widgets import BaseMouseFocusable
@@ -7,8 +8,13 @@ from tcodplus.style import Display, Border, draw_border
 import liberalguardians.common.data as data
 import liberalguardians.common.topics as topics
 from liberalguardians.common.grid import AreaMask
+from liberalguardians.common.alignment import colored_alignment_str
+from liberalguardians.characters import profession_align
 from liberalguardians.area import Area
 
+# drawn where an Area is until it is updated, see LocationUI
+PLACEHOLDER_COLOR = (40,)*3
+
 
 class AreaUI(BaseMouseFocusable):
     def __init__(self, area: Area, *args, **kwargs) -> None:
@@ -23,14 +29,21 @@ class AreaUI(BaseMouseFocusable):
         def ev_mousefocuslost(ev: tcod.event.MouseMotion, self=self) -> None:
             topics.description.publish(args={})
 
+        def ev_mousebuttonup(ev: tcod.event.MouseButtonUp, self=self) -> None:
+            if ev.button == tcod.event.BUTTON_LEFT \
+                    and not self.parent.dragging:
+                self.parent.command(self.area.location.travel,
+                                    self.area.coordinates)
+
         self.focus_dispatcher.ev_mousefocusgain.append(ev_mousefocusgain)
         self.focus_dispatcher.ev_mousefocuslost.append(ev_mousefocuslost)
+        self.focus_dispatcher.ev_mousebuttonup.append(ev_mousebuttonup)
 
     @property
     def description(self):
-        location = self.area.location
+        snapshot = self.parent.snapshot
         x, y = self.area.coordinates
-        mask = location.masks[y, x]
+        mask = snapshot.masks[y, x]
 
         area_name = self.area.area_name
         title = data.areas[area_name]['short_desc']
@@ -40,7 +53,7 @@ class AreaUI(BaseMouseFocusable):
             (150,)*3, data.areas[area_name]['long_desc'],
             tcod.COLCTRL_STOP)
 
-        center = location.player_position
+        center = snapshot.player_position
         dx, dy = x - center[0], y - center[1]
         if mask & AreaMask.FORBIDDEN and not (dx == dy == 0):
             restricted_str = ("This is a restricted area, going there will "
@@ -53,14 +66,21 @@ class AreaUI(BaseMouseFocusable):
         elif mask & AreaMask.FOG:
             text += "You can't see what's in there. This area is too far away..."
         else:
+            professions = snapshot.professions(self.area.coordinates)
+            if professions is None:
+                # not drawn yet by the simulation, draw it now
+                professions = self.parent.simulation.command(
+                    lambda: self.area.professions)
             text += "{} people are present here :\n\n".format(
-                len(self.area.characters))
+                sum(professions.values()))
 
-            iter_chars = iter(self.area.characters)
-            text += "\n".join(f'{c1.colored_profession:<17}{c2.colored_profession}'
-                              for c1, c2 in zip(iter_chars, iter_chars))
-            if len(self.area.characters) % 2:
-                text += f"\n{self.area.characters[-1].colored_profession}"
+            crowd = [colored_alignment_str(profession_align(p), f"{cnt} {p}")
+                     for p, cnt in professions.items()]
+            iter_crowd = iter(crowd)
+            text += "\n".join(f'{p1:<17}{p2}'
+                              for p1, p2 in zip(iter_crowd, iter_crowd))
+            if len(crowd) % 2:
+                text += f"\n{crowd[-1]}"
 
         interactions = ""
         if self.name == str(center):
@@ -71,24 +91,31 @@ class AreaUI(BaseMouseFocusable):
         area_name = self.area.area_name
         return data.areas[area_name]['interactions']
 
-    def update(self) -> None:
-        location = self.area.location
+    def tile(self) -> Tuple[int, int, int]:
+        """the center and the size of the Area in the LocationUI"""
         locationUI = self.parent
         x, y = self.area.coordinates
-        # connections = location.connections_grid[y, x]
-        mask = location.masks[y, x]
         cx, cy = locationUI.camera.position
-        center = location.player_position
+        center = locationUI.snapshot.player_position
         dx, dy = x - center[0], y - center[1]
         area_size = locationUI.area_size
 
         loc_width, loc_height = locationUI.geometry[6:]
         origin_x, origin_y = loc_width // 2 + cx, loc_height // 2 + cy
+        return origin_x + dx*area_size, origin_y + dy*area_size, area_size
+
+    def update(self) -> None:
+        locationUI = self.parent
+        snapshot = locationUI.snapshot
+        x, y = self.area.coordinates
+        # connections = snapshot.connections[y, x]
+        mask = snapshot.masks[y, x]
 
+        tile_x, tile_y, area_size = self.tile()
         self.style.width = area_size
         self.style.height = area_size
-        self.style.x = origin_x + dx*area_size
-        self.style.y = origin_y + dy*area_size
+        self.style.x = tile_x
+        self.style.y = tile_y
 
         # TODO: put the various styles into a single dict
         # TODO: color scheme with fixed name
@@ -147,11 +174,25 @@ class AreaUI(BaseMouseFocusable):
 
         self.should_update = False
 
+    def draw_placeholder(self) -> None:
+        """draw a blank tile where the Area goes, until it is updated"""
+        locationUI = self.parent
+        x, y = self.area.coordinates
+        if not locationUI.snapshot.masks[y, x] & AreaMask.VISIBLE:
+            return
+        tile_x, tile_y, area_size = self.tile()
+        # origin=Origin.CENTER, and the border is left out
+        left = tile_x - area_size // 2 + 1
+        top = tile_y - area_size // 2 + 1
+        right, bottom = left + area_size - 2, top + area_size - 2
+        locationUI.console.bg[max(0, top):max(0, bottom),
+                              max(0, left):max(0, right)] = PLACEHOLDER_COLOR
+
     def draw_area(self):
-        location = self.area.location
+        snapshot = self.parent.snapshot
         area_size = self.parent.area_size
         x, y = self.area.coordinates
-        mask = location.masks[y, x]
+        mask = snapshot.masks[y, x]
         # area_content = self.geometry.content_width
 
         if mask & AreaMask.VISIBLE:
@@ -169,7 +210,7 @@ class AreaUI(BaseMouseFocusable):
                 else:
                     pass
             elif mask & AreaMask.VISITED:
-                center = location.player_position
+                center = snapshot.player_position
                 dx, dy = x - center[0], y - center[1]
                 if dx == dy == 0:
                     self.console.bg[:] = (220,)*3
@@ -198,10 +239,9 @@ class AreaUI(BaseMouseFocusable):
             console = self.console
 
         # draw coordinates
-        location = self.area.location
         locationUI = self.parent
         x, y = self.area.coordinates
-        connections = location.connections_grid[y, x]
+        connections = locationUI.snapshot.connections[y, x]
 
         x, y, width, height = self.geometry[2:6]
         for i in range(4):
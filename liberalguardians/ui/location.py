@@ -1,23 +1,22 @@
 from __future__ import annotations
 import logging
-from itertools import chain
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Any, Callable
 from math import log
-import numpy as np
 import tcod
 
 from tcodplus.canvas import RootCanvas
 from tcodplus.widgets import BaseMouseFocusable, BaseKeyboardFocusable
 from tcodplus.style import Display, Origin, Border
+from tcodplus.schedule import UpdateScheduler
 
 import liberalguardians.common.data as data
 import liberalguardians.common.topics as topics
 from liberalguardians.common.logging import StyleAdapter
 from liberalguardians.common.grid import AreaMask, Connections
-from liberalguardians.common.grid import connection_to_coords
 from liberalguardians.country import Country
 from liberalguardians.ui.area import AreaUI
-from liberalguardians.location import Location, get_adjacent_areas
+from liberalguardians.location import Location, LocationSnapshot
+from liberalguardians.world import Simulation
 
 logger = StyleAdapter(logging.getLogger(__name__))
 
@@ -59,10 +58,19 @@ class Camera:
 
 
 class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
-    def __init__(self, location: Location, *args, **kwargs) -> None:
+    """The rooms of a Location, drawn from the snapshots of simulation
+
+    Args:
+        location: Location: the Location shown, simulation.location
+        simulation: Simulation: what runs the Location
+    """
+
+    def __init__(self, location: Location, simulation: Simulation,
+                 *args, **kwargs) -> None:
         logger.debug("{} initialisation started", __class__.__name__)
         super().__init__(*args, **kwargs)
         self.location = location
+        self.simulation = simulation
 
         # self.template = template
         self.area_size = BASE_AREA_SIZE
@@ -70,34 +78,25 @@ class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
         min_zoom = (round(log(AREA_MIN_SIZE/BASE_AREA_SIZE)/log(2)),)*2
         max_zoom = (round(log(AREA_MAX_SIZE/BASE_AREA_SIZE)/log(2)),)*2
         self.camera = Camera(min_zoom=min_zoom, max_zoom=max_zoom)
-
-        for k, area in location.areas.items():
+        # whether the mouse moved the camera since the button went down,
+        # a click on an Area only travels there when it did not
+        self.dragging = False
+
+        # zooming or moving marks every Area, update the ones around the
+        # party first and the others in the next frames
+        self.scheduler = UpdateScheduler(priority=self._update_priority,
+                                         placeholder=AreaUI.draw_placeholder)
+
+        # the Areas are built by the simulation thread too
+        with simulation.lock:
+            areas = list(location.areas.items())
+        for k, area in areas:
             style = dict(display=Display.NONE, border=Border.PATTERN2,
                          origin=Origin.CENTER, fg_color=tcod.black)
-            area_ui = AreaUI(area, name=k, style=style)
+            area_ui = AreaUI(area, name=str(k), style=style)
             self.childs.add(area_ui)
 
-        def movement_mask_update(start: Tuple[int, int], dest: Tuple[int, int]) -> None:
-            x, y = start
-            self.location.masks[y, x] |= AreaMask.FOG
-            conn_rooms = get_adjacent_areas(
-                (x, y), self.location.connections_grid[y, x])
-            for x, y in conn_rooms:
-                self.location.masks[y, x] |= AreaMask.FOG
-
-            x, y = dest
-            self.location.masks[y, x] |= (AreaMask.VISITED | AreaMask.VISIBLE)
-            self.location.masks[y, x] &= ~AreaMask.FOG
-            conn_rooms = get_adjacent_areas(
-                (x, y), self.location.connections_grid[y, x])
-            for x, y in conn_rooms:
-                self.location.masks[y, x] |= AreaMask.VISIBLE
-                self.location.masks[y, x] &= ~AreaMask.FOG
-
         def ev_keydown(ev: tcod.event.KeyDown) -> None:
-            x, y = self.location.player_position
-            connections = self.location.connections_grid[y, x]
-
             t_ev = tcod.event
 
             # TODO: key mapping outside
@@ -105,29 +104,13 @@ class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
                            [t_ev.K_DOWN, t_ev.K_s],
                            [t_ev.K_LEFT, t_ev.K_q],
                            [t_ev.K_UP, t_ev.K_z]]
-            if ev.sym in list(chain.from_iterable(motion_keys)):
-                for i, m_keys in enumerate(motion_keys):
-                    conn = 2**i
-                    if ev.sym in m_keys and connections & conn:
-                        dest = tuple(a+b for a, b
-                                     in zip((x, y), connection_to_coords[conn]))
-                        movement_mask_update((x, y), dest)
-                        self.update_areas()
-
-                        self.location.player_position = dest
-                        area_ui = self.childs[str(dest)]
-                        area_name = area_ui.area.area_name
-
-                        value = area_ui.description
-                        topics.description.publish(args=value)
-                        topics.default_description.publish(args=value)
-
-                        short = "{:<6}: {}".format(Connections(conn).name.capitalize(),
-                                                   data.areas[area_name]['short_desc'])
-                        topics.log.publish(args=dict(short=short))
-                        break
-                else:
-                    topics.log.publish(args=dict(short="You can't go there"))
+            for i, m_keys in enumerate(motion_keys):
+                if ev.sym in m_keys:
+                    self.command(self.location.move, Connections(2**i))
+                    break
+            else:
+                if ev.sym == t_ev.K_e:
+                    self.command(self.location.explore)
 
         def ev_mousewheel(ev: tcod.event.MouseWheel) -> None:
             mv = -(-1+ev.flipped*2) * ev.y
@@ -151,9 +134,13 @@ class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
                 if dcy:
                     y += dcy
                 if dcx or dcy:
+                    self.dragging = True
                     self.camera.position = (x, y)
                     self.update_areas()
 
+        def ev_mousebuttondown(ev: tcod.event.MouseButtonDown):
+            self.dragging = False
+
         def ev_mousebuttonup(ev: tcod.event.MouseButtonUp):
             self.camera.position = (0, 0)
             self.update_areas()
@@ -161,36 +148,62 @@ class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
         self.focus_dispatcher.ev_keydown.append(ev_keydown)
         self.focus_dispatcher.ev_mousewheel.append(ev_mousewheel)
         self.focus_dispatcher.ev_mousemotion.append(ev_mousemotion)
+        self.focus_dispatcher.ev_mousebuttondown.append(ev_mousebuttondown)
         self.focus_dispatcher.ev_mousebuttonup.append(ev_mousebuttonup)
 
+        topics.location_move.subscribe(self._ev_locationmove)
+
         self.kbdfocus_requested = True
 
         logger.debug("{} initialisation done: {}",
                      __class__.__name__, repr(self))
 
+    @property
+    def snapshot(self) -> LocationSnapshot:
+        """the Location to draw"""
+        return self.simulation.latest.location
+
+    def command(self, command: Callable[..., Any], *args) -> None:
+        """run a move command of the Location on the simulation, then
+        publish what it did, once it is in the snapshot"""
+        result = self.simulation.command(command, *args, publish=False)
+        self.location.publish(result)
+
     @property
     def description(self) -> Dict[str, str]:
-        location = self.location
-        template = location.template
-        suspicion = location.suspicion
-        masks = location.masks
-        grid = location.connections_grid
+        snapshot = self.snapshot
+        template = snapshot.template
+        suspicion = snapshot.suspicion
 
         title = data.locations[template]['short_desc']
         subtitle = get_suspicion(suspicion)[1]
         text = data.locations[template]['long_desc'] + "\n\n"
         text += "You've visited {}% of it so far.".format(
-            len(masks[masks & AreaMask.VISITED != 0]) * 100 // np.count_nonzero(grid))
+            snapshot.masks.count_nonzero(AreaMask.VISITED) * 100
+            // snapshot.room_cnt)
 
         return dict(title=title, subtitle=subtitle, text=text)
 
+    def _ev_locationmove(self, args: Dict[str, Any] = None) -> None:
+        result = args["result"]
+        if args["location"] is not self.location or not result.moved:
+            return
+        self.update_areas()
+        value = self.childs[str(result.dest)].description
+        topics.description.publish(args=value)
+        topics.default_description.publish(args=value)
+
+    def _update_priority(self, area_ui: AreaUI) -> Tuple[bool, int]:
+        """the visible Areas first, then the nearest to the party"""
+        snapshot = self.snapshot
+        x, y = area_ui.area.coordinates
+        center_x, center_y = snapshot.player_position
+        hidden = not snapshot.masks[y, x] & AreaMask.VISIBLE
+        return hidden, abs(x - center_x) + abs(y - center_y)
+
     def update_areas(self):
-        connections_grid = self.location.connections_grid
-        g_h, g_w = connections_grid.shape
-        for y in range(g_h):
-            for x in range(g_w):
-                if connections_grid[y, x]:
-                    self.childs[str((x, y))].should_update = True
+        for area_ui in self.childs.values():
+            area_ui.should_update = True
 
     def update(self):
         # x, y = self.player_position
@@ -204,11 +217,13 @@ class LocationUI(BaseMouseFocusable, BaseKeyboardFocusable):
 
 
 def main() -> None:
-    def handle_events(root_canvas: RootCanvas) -> None:
-        for event in tcod.event.get():
+    def handle_events(root_canvas: RootCanvas) -> bool:
+        events = tcod.event.get()
+        for event in events:
             if event.type == "KEYDOWN" and event.sym == tcod.event.K_ESCAPE:
                 raise SystemExit()
             root_canvas.handle_focus_event(event)
+        return bool(events)
 
     import logging.config
     import yaml
@@ -221,18 +236,22 @@ def main() -> None:
     root_canvas = RootCanvas(root_w, root_h, "room maze",
                              "data/fonts/dejavu10x10_gs_tc.png",
                              renderer=tcod.constants.RENDERER_OPENGL)
-    location = Location(Country("LaLaLand"), "standard", (10, 10))
-    location_ui = LocationUI(location, style=dict(width=1., height=1.))
+    country = Country("LaLaLand")
+    location = Location(country, "standard", (10, 10))
+    simulation = Simulation(country, location)
+    location_ui = LocationUI(location, simulation,
+                             style=dict(width=1., height=1.))
 
     root_canvas.childs.add(location_ui)
 
     root_canvas.update_kbd_focus()
 
     tcod.sys_set_fps(60)
-    while not tcod.console_is_window_closed():
-        root_canvas.refresh()
-        tcod.console_flush()
-        handle_events(root_canvas)
+    with simulation:
+        while not tcod.console_is_window_closed():
+            root_canvas.refresh()
+            tcod.console_flush()
+            handle_events(root_canvas)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,10 @@
+from typing import Callable, Optional
 import tcod
+import tcod.event
 
 from tcodplus.canvas import Canvas, RootCanvas
+from tcodplus.scene import Scene, SceneManager
+from tcodplus.runner import AsyncRunner
 from tcodplus.widgets import Header, Button, Text
 from tcodplus.style import Border, Origin
 
@@ -167,31 +171,57 @@ class CharacterCreationScreen(Canvas):
         self.console.print(w//2, 43, f"{'Criminal records:'.upper():>{w//4+8}}")
 
 
+class CharacterCreationScene(Scene):
+    """The character creation, until the report is sent
+
+    Args:
+        next_scene: Callable[[Character], Scene]: makes the Scene that
+            replaces this one, given the character created. If None, the
+            Scene is popped.
+    """
+
+    def __init__(self, next_scene: Optional[Callable[[Character], Scene]] = None
+                 ) -> None:
+        style = dict(x=.25, width=.5, height=1., bg_color=tcod.white,
+                     fg_color=tcod.black, border=Border.PATTERN2,
+                     border_bg_color=(40, 40, 100))
+        super().__init__(CharacterCreationScreen(style=style))
+        self.next_scene = next_scene
+        self._leaving = False
+
+    def update(self) -> None:
+        if not self.canvas.end:
+            return
+        self.canvas.end = False
+        if self.next_scene is None:
+            self.manager.pop()
+        elif self.manager.runner is None:
+            self.manager.switch(self.next_scene(self.canvas.char))
+        elif not self._leaving:
+            self._leaving = True
+            self.manager.runner.spawn(self._leave())
+
+    async def _leave(self) -> None:
+        # next_scene may wait for the Scene to be prepared, the UI doesn't
+        scene = await self.manager.runner.background(self.next_scene,
+                                                     self.canvas.char)
+        if self.manager is not None:
+            self.manager.switch(scene)
+
+    def handle_event(self, event: tcod.event.Event) -> bool:
+        if event.type == "KEYDOWN" and event.sym == tcod.event.K_ESCAPE:
+            self.manager.clear()
+            return True
+        return False
+
+
 def main():
     font = "data/fonts/dejavu10x10_gs_tc.png"
     root_canvas = RootCanvas(100, 70, "setup screen tests", font,
                              renderer=tcod.RENDERER_OPENGL2)
-
-    def handle_events(root_canvas: RootCanvas) -> None:
-        for event in tcod.event.get():
-            if event.type == "KEYDOWN" and event.sym == tcod.event.K_ESCAPE:
-                raise SystemExit()
-            root_canvas.handle_focus_event(event)
-
-    style = dict(x=.25, width=.5, height=1., bg_color=tcod.white,
-                 fg_color=tcod.black, border=Border.PATTERN2,
-                 border_bg_color=(40, 40, 100))
-    char_canvas = CharacterCreationScreen(style=style)
-
-    root_canvas.childs.add(char_canvas)
-
-    tcod.sys_set_fps(60)
-    while not tcod.console_is_window_closed():
-        root_canvas.refresh()
-        tcod.console_flush()
-        handle_events(root_canvas)
-        if char_canvas.end is True:
-            break
+    scenes = SceneManager(root_canvas)
+    scenes.push(CharacterCreationScene())
+    AsyncRunner(scenes).run()
 
 
 if __name__ == "__main__":
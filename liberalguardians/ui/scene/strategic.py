@@ -1,23 +1,34 @@
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import tcod
+import tcod.event
 
 from tcodplus.canvas import Canvas, RootCanvas
+from tcodplus.scene import Scene, SceneManager
+from tcodplus.runner import AsyncRunner
 from tcodplus.widgets import BaseUpdatable, BaseMouseFocusable, Text, Header, Image
 from tcodplus.style import Origin, Border, Display
 
 import liberalguardians.common.data as data
 import liberalguardians.common.topics as topics
 from liberalguardians.common.logging import StyleAdapter
-from liberalguardians.characters import Character
+from liberalguardians.characters import Character, Population
 from liberalguardians.country import Country
 from liberalguardians.location import Location
+from liberalguardians.pregen import LocationPregenerator
+from liberalguardians.save import AUTOSAVE_DIR, Autosaver, GameSave
 from liberalguardians.ui.log import LogUI
 from liberalguardians.ui.location import LocationUI, get_suspicion
+from liberalguardians.world import Simulation
 
 logger = StyleAdapter(logging.getLogger(__name__))
 
+LOCATION_SHAPE = (10, 10)
+# the number of candidates for the next Location. The party can't choose
+# one yet, reaching the exit enters the first one
+NEXT_LOCATION_CNT = 1
+
 
 class InfosPanel(BaseMouseFocusable):
     def __init__(self, *args, **kwargs):
@@ -46,7 +57,7 @@ class InfosPanel(BaseMouseFocusable):
     @property
     def description(self) -> Dict[str, str]:
         # TODO: avoid DOM mishmash lookup here
-        country = self.parent.country
+        country = self.parent.simulation.latest.country
         location = self.parent.childs['location']
         # characters = self.parent.childs['characters']
 
@@ -67,9 +78,8 @@ class InfosPanel(BaseMouseFocusable):
 
     def base_drawing(self):
         super().base_drawing()
-        country = self.parent.country
-        location_ui = self.parent.childs['location']
-        location = location_ui.location
+        snapshot = self.parent.simulation.latest
+        country, location = snapshot.country, snapshot.location
         self.childs['country_name'].value = "\t{} - {}".format(
             country.name, data.locations[location.template]['short_desc'])
 
@@ -116,12 +126,20 @@ class CharactersPanel(BaseUpdatable):
         logger.debug("{} initialisation started", __class__.__name__)
         super().__init__(*args, **kwargs)
         self.characters = characters
-        self.should_update = True
-        self.ischar_init = False  # TODO: Quick and dirty here...
 
         logger.debug("{} initialisation done: {}",
                      __class__.__name__, repr(self))
 
+    @property
+    def characters(self) -> List[Character]:
+        return self._characters
+
+    @characters.setter
+    def characters(self, characters: List[Character]) -> None:
+        self._characters = characters
+        self.should_update = True
+        self.ischar_init = False  # TODO: Quick and dirty here...
+
     def update(self) -> None:
         if not self.ischar_init:
             width, height = self.geometry[6:]
@@ -345,31 +363,162 @@ class MainScreen(Canvas):
         char_screen = CharactersPanel(name="characters",
                                       style=characters_style)
         info_screen = InfosPanel(style=top_info_bar)
-        location = Location(country, "standard", (10, 10))
-        location_ui = LocationUI(location, name="location",
-                                 style=location_style)
-        self.childs.add(left_panel_screen, info_screen,
-                        char_screen, location_ui)
-
+        self.childs.add(left_panel_screen, info_screen, char_screen)
+        self._location_style = location_style
+        # runs the world on its own thread, see main()
+        location = Location(country, "standard", LOCATION_SHAPE)
+        self.simulation = Simulation(country, location)
+        self.show_location(location)
         left_panel_screen.childs['description'].value = info_screen.description
-        starting_position = location.player_position
-        area_desc = location_ui.childs[str(starting_position)].description
-        left_panel_screen.childs['description'].default_value = area_desc
+
+        # the candidates for the next Location, generated meanwhile. They
+        # are submitted once the screen is shown, see StrategicScene: the
+        # worker processes are not forked from the thread building it
+        self.pregen = LocationPregenerator(country)
+        self.next_locations: List[int] = []
+        # whether the party reached the exit, see leave_location()
+        self.exit_reached = False
+        topics.location_move.subscribe(self._ev_locationmove)
 
         logger.debug("{} initialisation done: {}",
                      __class__.__name__, repr(self))
 
+    def show_location(self, location: Location) -> None:
+        if "location" in self.childs:
+            self.childs.pop("location")
+        self.simulation.location = location
+        location_ui = LocationUI(location, self.simulation, name="location",
+                                 style=self._location_style)
+        self.childs.add(location_ui)
+        starting_position = location.player_position
+        area_desc = location_ui.childs[str(starting_position)].description
+        self.childs['left_panel'].childs['description'].default_value = \
+            area_desc
+
+    def submit_next_locations(self) -> None:
+        self.next_locations = [
+            self.pregen.submit("standard", LOCATION_SHAPE)
+            for _ in range(NEXT_LOCATION_CNT)]
+
+    def enter_location(self, index: int) -> None:
+        """switch to the candidate Location index of next_locations
+
+        The other candidates are discarded and new ones are submitted.
+        """
+        # registering it may evict the Location being simulated
+        with self.simulation.lock:
+            location = self.pregen.get(index)
+        for other in self.next_locations:
+            if other != index:
+                self.pregen.discard(other)
+        self.show_location(location)
+        self.submit_next_locations()
+
+    def _ev_locationmove(self, args: Dict[str, Any] = None) -> None:
+        location, result = args["location"], args["result"]
+        if location is self.simulation.location and result.moved \
+                and result.dest == location.exit:
+            self.exit_reached = True
+
+    def leave_location(self) -> bool:
+        """enter the next Location if the party reached the exit and the
+        Location is generated, not to wait for it
+
+        Returns:
+            bool: whether the next Location was entered
+        """
+        if not self.exit_reached or not self.next_locations \
+                or not self.pregen.done(self.next_locations[0]):
+            return False
+        self.exit_reached = False
+        self.enter_location(self.next_locations[0])
+        return True
+
+
+class StrategicScene(Scene):
+    """The strategic screen of a Country, led by a party of characters
+
+    The simulation runs while the Scene is on top of the stack only. It
+    autosaves the game too, between two ticks, see autosave_system().
+
+    Args:
+        country: Country: the Country played
+        characters: List[Character]: the party
+        save_dir: str: where the game is autosaved, None not to save it
+    """
+
+    def __init__(self, country: Country, characters: List[Character],
+                 save_dir: Optional[str] = AUTOSAVE_DIR) -> None:
+        main_screen = MainScreen(country=country, style=dict(width=1.,
+                                                             height=1.))
+        main_screen.childs["characters"].characters = characters
+        super().__init__(main_screen)
+        # read by the simulation thread too, instead of the CharactersPanel
+        self._party = characters
+        # a Scene discarded before it was shown is not a game to save
+        self.entered = False
+        self.autosaver = Autosaver(GameSave(save_dir)) \
+            if save_dir is not None else None
+        if self.autosaver is not None:
+            main_screen.simulation.systems.append(self.autosave_system)
 
-def main() -> None:
-    def handle_events(root_canvas: RootCanvas) -> None:
-        events = tcod.event.get()
-        for event in events:
-            if event.type == "QUIT":
-                raise SystemExit()
-            if event.type == "KEYDOWN" and event.sym == tcod.event.K_ESCAPE:
-                raise SystemExit()
-            root_canvas.handle_focus_event(event)
+    @property
+    def party(self) -> List[Character]:
+        return self._party
+
+    @party.setter
+    def party(self, characters: List[Character]) -> None:
+        self._party = characters
+        self.canvas.childs["characters"].characters = characters
+
+    @property
+    def populations(self) -> Dict[str, Population]:
+        """what is saved with the Country"""
+        return dict(party=Population(self.party))
+
+    def autosave_system(self, country: Country, location: Location,
+                        dt: float) -> None:
+        """a System of the simulation, so that the game is frozen under its
+        lock: the save is then written on the Autosaver thread"""
+        if self.autosaver.due:
+            self.autosaver.request(country, self.populations)
+
+    def on_enter(self) -> None:
+        self.entered = True
+        # on the main thread, the Scene may have been built on another one
+        self.canvas.submit_next_locations()
+        # the Areas around the party are drawn by the simulation meanwhile
+        self.canvas.simulation.start()
+
+    def on_suspend(self) -> None:
+        self.canvas.simulation.stop()
+
+    def update(self) -> None:
+        # between two frames, not while the LocationUI handles the move
+        self.canvas.leave_location()
+
+    def on_resume(self) -> None:
+        self.canvas.simulation.start()
+
+    def on_exit(self) -> None:
+        simulation = self.canvas.simulation
+        simulation.stop()
+        self.canvas.pregen.shutdown()
+        if self.autosaver is not None:
+            if self.entered:
+                with simulation.lock:
+                    self.autosaver.request(simulation.country,
+                                           self.populations)
+            self.autosaver.close()
+
+    def handle_event(self, event: tcod.event.Event) -> bool:
+        if event.type == "KEYDOWN" and event.sym == tcod.event.K_ESCAPE:
+            self.manager.clear()
+            return True
+        return False
 
+
+def main() -> None:
     import logging.config
     import yaml
     with open("logconfig.yml") as f:
@@ -391,22 +540,11 @@ def main() -> None:
                              "data/fonts/dejavu10x10_gs_tc.png",
                              renderer=tcod.RENDERER_OPENGL2,
                              fullscreen=False)
-    main_screen = MainScreen(country=country, style=dict(width=1., height=1.))
     char_list = [Character() for _ in range(6)]
 
-    main_screen.childs["characters"].characters = char_list
-
-    # location = Location("standard", 10, 10, style=dict(width=1., height=1.))
-
-    root_canvas.childs.add(main_screen)
-
-    # root_canvas.update_kbd_focus()
-
-    tcod.sys_set_fps(60)
-    while True:
-        root_canvas.refresh()
-        tcod.console_flush()
-        handle_events(root_canvas)
+    scenes = SceneManager(root_canvas)
+    scenes.push(StrategicScene(country, char_list))
+    AsyncRunner(scenes).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""Run the world on its own thread, for the UI to render from snapshots.
+
+The simulation owns the Country and the current Location: only its thread,
+or a caller holding its lock, changes them. At every tick it publishes a
+WorldSnapshot, the front buffer the UI renders from, while the next tick is
+computed on the back one, the live objects. A slow tick never blocks a
+frame: the UI keeps rendering the last snapshot.
+"""
+from __future__ import annotations
+import time
+import logging
+import threading
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from liberalguardians.common.logging import StyleAdapter
+from liberalguardians.country import Country, CountrySnapshot
+from liberalguardians.location import Location, LocationSnapshot
+
+logger = StyleAdapter(logging.getLogger(__name__))
+
+# seconds between two ticks
+TICK_INTERVAL = 1/20
+
+
+class WorldSnapshot(NamedTuple):
+    """The world as it was at a tick
+
+    Args:
+        version: int: the tick
+        country: CountrySnapshot: the Country
+        location: LocationSnapshot: the current Location
+    """
+    version: int
+    country: CountrySnapshot
+    location: LocationSnapshot
+
+
+# what runs at every tick, given the Country, the current Location and the
+# seconds since the previous tick
+System = Callable[[Country, Location, float], None]
+
+
+def prefetch_system(country: Country, location: Location, dt: float) -> None:
+    """draw the crowds of the Areas around the party ahead of time"""
+    location.prefetch()
+
+
+class Simulation:
+    """The world, ticked on a background thread
+
+    Change the world through command(), from any thread: it waits for the
+    current tick to end, runs the command and publishes a snapshot right
+    away, so that what the command did is visible in latest.
+
+    The current Location is pinned in the LocationRegistry of the Country,
+    so that it is never evicted while the simulation holds it.
+
+    Args:
+        country: Country: the Country simulated
+        location: Location: the current Location
+        interval: float: the seconds between two ticks
+    """
+
+    def __init__(self, country: Country, location: Location,
+                 interval: float = TICK_INTERVAL) -> None:
+        self.country = country
+        self._location = location
+        country.locations.pin(location.index)
+        self.interval = interval
+        self.systems: List[System] = [prefetch_system]
+        self.lock = threading.RLock()
+        self._version = 0
+        self._latest = self._snapshot()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def latest(self) -> WorldSnapshot:
+        """the last snapshot published, to render from any thread"""
+        return self._latest
+
+    @property
+    def location(self) -> Location:
+        return self._location
+
+    @location.setter
+    def location(self, location: Location) -> None:
+        with self.lock:
+            locations = self.country.locations
+            locations.pin(location.index)
+            locations.unpin(self._location.index)
+            self._location = location
+            self.publish()
+
+    def _snapshot(self) -> WorldSnapshot:
+        version = self._version
+        return WorldSnapshot(version, self.country.snapshot(version),
+                             self._location.snapshot(version))
+
+    def publish(self) -> WorldSnapshot:
+        """take a snapshot of the world and make it the latest one"""
+        with self.lock:
+            self._version += 1
+            snapshot = self._snapshot()
+            # a single reference swap, readers see the old or the new one
+            self._latest = snapshot
+        return snapshot
+
+    def command(self, command: Callable[..., Any], *args, **kwargs) -> Any:
+        """run command(*args, **kwargs) between two ticks and publish
+
+        Returns:
+            Any: what command returned
+        """
+        with self.lock:
+            result = command(*args, **kwargs)
+            self.publish()
+        return result
+
+    def tick(self, dt: float) -> None:
+        """run every system once and publish"""
+        with self.lock:
+            for system in self.systems:
+                system(self.country, self._location, dt)
+            self.publish()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(max(0., last + self.interval
+                                      - time.perf_counter())):
+            now = time.perf_counter()
+            try:
+                self.tick(now - last)
+            except Exception:
+                logger.exception("tick {} failed", self._version)
+            last = now
+
+    def start(self) -> None:
+        """start ticking on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="simulation",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """stop ticking, after the current tick"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> Simulation:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    """time the frames of a renderer reading snapshots while slow ticks run"""
+    from liberalguardians.common.seeding import Seeder
+    from liberalguardians.common.grid import AreaMask
+
+    def slow_system(country: Country, location: Location, dt: float) -> None:
+        time.sleep(0.1)
+
+    country = Country("Benchland", seeder=Seeder(0))
+    location = Location(country, "standard", (300, 300))
+    simulation = Simulation(country, location)
+    simulation.systems.append(slow_system)
+    frames, versions = [], set()
+    with simulation:
+        for _ in range(60):
+            start = time.perf_counter()
+            snapshot = simulation.latest.location
+            visited = snapshot.masks.count_nonzero(AreaMask.VISITED)
+            frames.append(time.perf_counter() - start)
+            versions.add(snapshot.version)
+            if len(frames) % 10 == 0:
+                simulation.command(location.explore, publish=False)
+            time.sleep(1/60)
+    print(f"{len(frames)} frames, {len(versions)} snapshots, worst frame "
+          f"{max(frames) * 1000:.1f}ms, {visited} rooms visited")
+
+
+if __name__ == "__main__":
+    main()
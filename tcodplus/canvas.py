@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import List, NamedTuple, Tuple, Optional, Union
 import sys
+import itertools
 from weakref import WeakValueDictionary
 from collections.abc import Mapping
 # import numpy as np
@@ -8,15 +9,15 @@ import tcod
 import tcod.event
 import tcodplus.style as tcp_style
 from tcodplus import event as tcp_event
+from tcodplus.schedule import UpdateScheduler
 from tcodplus.interfaces import IDrawable, IUpdatable, IKeyboardFocusable, IMouseFocusable
 
-_canvasID = 0
+# next() on a count is atomic, trees may be built on other threads
+_canvasID = itertools.count(1)
 
 
 def _genCanvasID() -> str:
-    global _canvasID
-    _canvasID += 1
-    return f"_can{_canvasID:06x}"
+    return f"_can{next(_canvasID):06x}"
 
 
 Geometry = NamedTuple('Geometry', [('abs_x', int), ('abs_y', int),
@@ -115,6 +116,8 @@ class Canvas(IDrawable):
         console: tcod.Console: the internal Console of the Canvas where
             everything is drawn.
         style: style.Style: the style for the Canvas.
+        scheduler: UpdateScheduler: spreads the updates of the childs over
+            several frames, None to run them all at every refresh
     """
 
     def __init__(self, name: str = "", parent: Canvas = None,
@@ -131,6 +134,8 @@ class Canvas(IDrawable):
         self.style = style
         self.console = self.init_console()
 
+        self.scheduler: Optional[UpdateScheduler] = None
+
         self._force_redraw = True
         self._geometry_updated = False
 
@@ -436,10 +441,14 @@ class Canvas(IDrawable):
         """
 
         up = False
+        deferred = set()
 
         # refresh childs
-        for c in self.childs.values():
-            up = c.refresh()
+        if self.scheduler is not None:
+            up, deferred = self.scheduler.refresh(list(self.childs.values()))
+        else:
+            for c in self.childs.values():
+                up = c.refresh()
 
         up = up or self._geometry_updated
 
@@ -464,6 +473,10 @@ class Canvas(IDrawable):
         # draw childs if necessary
         if up:
             for c in self.childs.values():
+                if c.name in deferred:
+                    if self.scheduler.placeholder is not None:
+                        self.scheduler.placeholder(c)
+                    continue
                 c_style = c.styles()
                 if c_style.visible and c_style.display != tcp_style.Display.NONE:
                     try:
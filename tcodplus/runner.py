@@ -0,0 +1,186 @@
+"""Run a SceneManager on an asyncio event loop.
+
+A frame is a coroutine: it pumps the events, refreshes and flushes, then
+yields to the loop until the next frame is due. Game code spawns its own
+coroutines, which await background work, e.g. a generation in an executor,
+timers or an autosave, without freezing the input.
+
+Every coroutine runs on the UI thread, the thread of the loop. A coroutine
+resuming after background work first waits for a delivery slot: slots are
+granted at every frame for at most budget seconds, so that many results
+landing at once are spread over several frames.
+"""
+from __future__ import annotations
+import asyncio
+import collections
+import functools
+import time
+from concurrent.futures import Executor, Future as ConcurrentFuture
+from typing import Any, Callable, Coroutine, Deque, List, Optional, Set
+import tcod
+
+from tcodplus.scene import SceneManager
+
+# seconds spent per frame resuming coroutines, see AsyncRunner.deliver()
+DELIVERY_BUDGET = 0.004
+
+
+class AsyncRunner:
+    """The asyncio event loop of an application
+
+    Args:
+        scenes: SceneManager: the Scenes to run, its runner is set to this
+        fps: int: the frames per second aimed at
+        budget: float: the seconds per frame granted to delivery slots
+        executor: Executor: where background() runs functions, None for the
+            default executor of the loop
+    """
+
+    def __init__(self, scenes: SceneManager, fps: int = 60,
+                 budget: float = DELIVERY_BUDGET,
+                 executor: Optional[Executor] = None) -> None:
+        self.scenes = scenes
+        self.fps = fps
+        self.budget = budget
+        self.executor = executor
+        # created now, for Scenes to spawn coroutines before run()
+        self.loop = asyncio.new_event_loop()
+        self._slots: Deque[asyncio.Future] = collections.deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._error: Optional[BaseException] = None
+        scenes.runner = self
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        """run coro on the loop, alongside the frames
+
+        An exception raised by coro stops the runner and is raised again
+        by run().
+        """
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None \
+                and self._error is None:
+            self._error = task.exception()
+
+    async def deliver(self) -> None:
+        """wait for a delivery slot, within the budget of a frame"""
+        slot = self.loop.create_future()
+        self._slots.append(slot)
+        await slot
+
+    async def background(self, fn: Callable[..., Any], *args, **kwargs
+                         ) -> Any:
+        """fn(*args, **kwargs) run in the executor, delivered in a slot"""
+        result = await self.loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs))
+        await self.deliver()
+        return result
+
+    async def wait(self, future: ConcurrentFuture) -> Any:
+        """the result of a concurrent Future, e.g. one of
+        SceneManager.prepare(), delivered in a slot"""
+        result = await asyncio.wrap_future(future, loop=self.loop)
+        await self.deliver()
+        return result
+
+    async def _grant_slots(self) -> None:
+        deadline = time.perf_counter() + self.budget
+        while self._slots and time.perf_counter() < deadline:
+            slot = self._slots.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                # lets the coroutine waiting for the slot run to its next
+                # await before the time left is checked
+                await asyncio.sleep(0)
+
+    async def frame(self) -> None:
+        """run a frame: delivery slots, then a step of the SceneManager"""
+        await self._grant_slots()
+        if self.scenes.scenes:
+            self.scenes.step()
+
+    async def main(self) -> None:
+        """run frames until the stack is empty or the window closed"""
+        # the loop paces the frames, tcod must not sleep in console_flush()
+        tcod.sys_set_fps(0)
+        period = 1 / self.fps
+        try:
+            while self.scenes.scenes and self._error is None \
+                    and not tcod.console_is_window_closed():
+                start = time.perf_counter()
+                await self.frame()
+                await asyncio.sleep(max(0., start + period
+                                        - time.perf_counter()))
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self.scenes.close()
+        if self._error is not None:
+            raise self._error
+
+    def run(self) -> None:
+        """run main() in the event loop, then close it"""
+        try:
+            self.loop.run_until_complete(self.main())
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.run_until_complete(
+                self.loop.shutdown_default_executor())
+            self.loop.close()
+
+
+def main() -> None:
+    """time the frames while many background results land at once"""
+    from concurrent.futures import ThreadPoolExecutor
+    from tcodplus.canvas import Canvas, RootCanvas
+    from tcodplus.scene import Scene
+
+    def work(i: int) -> int:
+        time.sleep(0.1)
+        return i
+
+    class Bench(Scene):
+        def __init__(self) -> None:
+            super().__init__(Canvas(style=dict(width=1., height=1.)))
+            self.last: Optional[float] = None
+            self.intervals: List[float] = []
+
+        def update(self) -> None:
+            now = time.perf_counter()
+            if self.last is not None:
+                self.intervals.append(now - self.last)
+            self.last = now
+
+    async def collect(runner: AsyncRunner, i: int) -> None:
+        await runner.background(work, i)
+        # the UI work done with the result
+        time.sleep(0.001)
+
+    async def scenario(runner: AsyncRunner) -> None:
+        await asyncio.gather(*(collect(runner, i) for i in range(64)))
+        await asyncio.sleep(0.1)
+        runner.scenes.clear()
+
+    root = RootCanvas(20, 10, "runner", "data/fonts/dejavu10x10_gs_tc.png")
+    for budget in (float("inf"), DELIVERY_BUDGET):
+        scenes = SceneManager(root)
+        scene = Bench()
+        scenes.push(scene)
+        runner = AsyncRunner(scenes, budget=budget,
+                             executor=ThreadPoolExecutor(64))
+        runner.spawn(scenario(runner))
+        runner.run()
+        runner.executor.shutdown()
+        print(f"budget {budget * 1000:.0f}ms: 64 results over "
+              f"{len(scene.intervals)} frames, worst interval "
+              f"{max(scene.intervals) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""A stack of scenes sharing a single window.
+
+The SceneManager owns the RootCanvas, thus the window, and runs the one
+event loop of the application. Only the Scene on top of the stack is shown:
+its Canvas is the single child of the RootCanvas. A suspended Scene keeps
+its Canvas tree, consoles included, so that coming back to it only blits
+what was already drawn.
+
+The next Scene can be built and drawn on a worker thread while the current
+one is shown, see SceneManager.prepare(). Nothing of it is reachable from
+the RootCanvas until it is pushed, on the main thread, so the handoff is a
+single reference swap.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional
+import tcod
+import tcod.event
+
+from tcodplus.canvas import Canvas, RootCanvas
+from tcodplus import event as tcp_event
+from tcodplus.schedule import unbounded
+
+if TYPE_CHECKING:
+    from tcodplus.runner import AsyncRunner
+
+
+class Scene:
+    """A screen of the application: a Canvas tree and its hooks
+
+    The hooks do nothing by default. A Scene changes the stack through
+    its manager, e.g. self.manager.switch(next_scene) from update().
+
+    Args:
+        canvas: Canvas: the root of the tree of the Scene, shown while the
+            Scene is on top of the stack
+        manager: SceneManager: the manager of the Scene while it is on the
+            stack, None otherwise
+    """
+
+    def __init__(self, canvas: Canvas) -> None:
+        self.canvas = canvas
+        self.manager: Optional[SceneManager] = None
+
+    def on_enter(self) -> None:
+        """called once the Scene is pushed and shown"""
+
+    def on_exit(self) -> None:
+        """called once the Scene is popped and hidden"""
+
+    def on_suspend(self) -> None:
+        """called once another Scene is pushed over this one"""
+
+    def on_resume(self) -> None:
+        """called once the Scene is on top again"""
+
+    def update(self) -> None:
+        """called every frame, before the refresh"""
+
+    def handle_event(self, event: tcod.event.Event) -> bool:
+        """called for every event, before the Canvas tree gets it
+
+        Returns:
+            bool: True if the event was consumed, otherwise False
+        """
+        return False
+
+
+class SceneManager:
+    """The stack of Scenes shown in a RootCanvas
+
+    Args:
+        root: RootCanvas: the RootCanvas, created once for all the Scenes
+        scenes: List[Scene]: the stack, the current Scene is the last one
+        runner: AsyncRunner: the runner of the SceneManager, if it is run
+            on an asyncio event loop, see tcodplus.runner
+    """
+
+    def __init__(self, root: RootCanvas) -> None:
+        self.root = root
+        self.scenes: List[Scene] = []
+        self.runner: Optional[AsyncRunner] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def current(self) -> Optional[Scene]:
+        return self.scenes[-1] if self.scenes else None
+
+    def _show(self, scene: Scene) -> None:
+        self.root.childs.add(scene.canvas)
+        self.root.force_redraw = True
+        scene.canvas.force_redraw = True
+
+    def _hide(self, scene: Scene) -> None:
+        self.root.childs.pop(scene.canvas.name)
+        # the focus is recomputed on the next events, from the new tree
+        self.root.last_mouse_focused_offsprings = tcp_event.MouseFocus(
+            {}, {}, {})
+        self.root.last_kbd_focused_offspring = None
+
+    def push(self, scene: Scene) -> None:
+        """suspend the current Scene, if any, and show scene"""
+        below = self.current
+        if below is not None:
+            self._hide(below)
+            below.on_suspend()
+        self._enter(scene)
+
+    def pop(self) -> Scene:
+        """hide the current Scene and resume the one below, if any
+
+        Returns:
+            Scene: the Scene popped
+        """
+        scene = self._exit()
+        below = self.current
+        if below is not None:
+            self._show(below)
+            below.on_resume()
+        return scene
+
+    def switch(self, scene: Scene) -> Scene:
+        """replace the current Scene with scene
+
+        Returns:
+            Scene: the Scene replaced
+        """
+        replaced = self._exit()
+        self._enter(scene)
+        return replaced
+
+    def clear(self) -> None:
+        """pop every Scene, without resuming any"""
+        while self.scenes:
+            self._exit()
+
+    def _enter(self, scene: Scene) -> None:
+        scene.manager = self
+        self.scenes.append(scene)
+        self._show(scene)
+        scene.on_enter()
+
+    def _exit(self) -> Scene:
+        scene = self.scenes.pop()
+        self._hide(scene)
+        scene.on_exit()
+        scene.manager = None
+        return scene
+
+    def prepare(self, factory: Callable[[], Scene]) -> Future:
+        """build a Scene with factory on a worker thread, and draw it off
+        screen, while the current Scene is shown
+
+        factory must not touch the Scenes on the stack: it runs
+        concurrently with them.
+
+        Returns:
+            Future: the Scene, to push once it is done
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                1, thread_name_prefix="scene")
+        return self._executor.submit(self._prepare, factory)
+
+    def _prepare(self, factory: Callable[[], Scene]) -> Scene:
+        scene = factory()
+        self.prerender(scene)
+        return scene
+
+    def prerender(self, scene: Scene) -> None:
+        """lay out and draw the tree of scene as if it was shown
+
+        The tree is attached to a stand-in for the RootCanvas, with the
+        same geometry, so that showing it later only blits its consoles.
+        """
+        stage = Canvas(style=self.root.style)
+        stage._geom = self.root.geometry
+        stage.childs.add(scene.canvas)
+        try:
+            with unbounded():
+                scene.canvas.refresh()
+        finally:
+            stage.childs.pop(scene.canvas.name)
+
+    def handle_events(self) -> None:
+        """dispatch the pending events to the current Scene, then its tree"""
+        for event in tcod.event.get():
+            scene = self.current
+            if scene is None:
+                return
+            if event.type == "QUIT":
+                self.clear()
+                return
+            if not scene.handle_event(event) and scene is self.current:
+                self.root.handle_focus_event(event)
+
+    def step(self) -> None:
+        """run a frame: update, refresh, flush then handle the events"""
+        self.current.update()
+        # update() may have emptied the stack
+        if self.current is not None:
+            self.root.refresh()
+            tcod.console_flush()
+            self.handle_events()
+
+    def run(self, fps: int = 60) -> None:
+        """run frames until the stack is empty or the window closed"""
+        tcod.sys_set_fps(fps)
+        try:
+            while self.scenes and not tcod.console_is_window_closed():
+                self.step()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """pop every Scene and wait for the Scenes being prepared"""
+        self.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
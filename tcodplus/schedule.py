@@ -0,0 +1,98 @@
+"""Spread the updates of many IUpdatable childs over several frames.
+
+When a Canvas has a scheduler, its refresh() no longer runs every pending
+update of its childs at once. The UpdateScheduler runs them by priority,
+the first ones first, until its budget for the frame is spent, and defers
+the others. A deferred child keeps should_update and is not drawn: the
+placeholder, if any, is drawn instead, until a later frame updates it.
+"""
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, \
+    Optional, Set, Tuple
+
+import tcodplus.style as tcp_style
+from tcodplus.interfaces import IUpdatable
+
+if TYPE_CHECKING:
+    from tcodplus.canvas import Canvas
+
+# seconds of updates per refresh, see UpdateScheduler
+UPDATE_BUDGET = 0.004
+
+_local = threading.local()
+
+
+@contextmanager
+def unbounded() -> Iterator[None]:
+    """run every pending update, on the current thread, while in the
+    context, e.g. to draw a tree that is not shown yet"""
+    previous = getattr(_local, "unbounded", False)
+    _local.unbounded = True
+    try:
+        yield
+    finally:
+        _local.unbounded = previous
+
+
+def displayed_first(child: Canvas) -> Tuple[bool, int]:
+    """the default priority: the displayed childs, then the nearest to the
+    center of their parent"""
+    style = child.styles()
+    hidden = not style.visible or style.display == tcp_style.Display.NONE
+    _, _, x, y, width, height, _, _ = child.geometry
+    p_width, p_height = child.parent.geometry[6:]
+    distance = abs(2*x + width - p_width) + abs(2*y + height - p_height)
+    return hidden, distance
+
+
+class UpdateScheduler:
+    """Run the pending updates of the childs of a Canvas within a budget
+
+    Args:
+        budget: float: the seconds spent on updates per refresh. The first
+            pending update always runs, so that every update runs at last.
+        priority: Callable[[Canvas], Any]: the sort key of a pending child,
+            the lowest first
+        placeholder: Callable[[Canvas], None]: draws a deferred child on
+            its parent, None not to draw anything
+        deferred: int: the number of updates deferred at the last refresh
+    """
+
+    def __init__(self, budget: float = UPDATE_BUDGET,
+                 priority: Callable[[Canvas], Any] = displayed_first,
+                 placeholder: Optional[Callable[[Canvas], None]] = None
+                 ) -> None:
+        self.budget = budget
+        self.priority = priority
+        self.placeholder = placeholder
+        self.deferred = 0
+
+    def refresh(self, childs: Iterable[Canvas]) -> Tuple[bool, Set[str]]:
+        """refresh childs, the pending updates within the budget
+
+        Returns:
+            Tuple[bool, Set[str]]: whether a child had to refresh itself,
+                and the names of the childs deferred
+        """
+        up = False
+        pending = []
+        for c in childs:
+            if isinstance(c, IUpdatable) and c.should_update:
+                pending.append(c)
+            else:
+                up = c.refresh() or up
+
+        pending.sort(key=self.priority)
+        deadline = time.perf_counter() + self.budget
+        bounded = not getattr(_local, "unbounded", False)
+        deferred: Set[str] = set()
+        for i, c in enumerate(pending):
+            if i and bounded and time.perf_counter() >= deadline:
+                deferred = {c.name for c in pending[i:]}
+                break
+            up = c.refresh() or up
+        self.deferred = len(deferred)
+        return up, deferred